@@ -7,11 +7,17 @@ from __future__ import absolute_import, division, print_function
 from .version import __version__  # noqa
 from .materialflow import *
 from .depcode import *
+from .zaid import *
+from .serpent_output import *
 from .serpent_depcode import *
+from .openmc_output import *
+from .openmc_session import *
 from .openmc_depcode import *
 from .simulation import *
+from .expression import *
 from .process import *
 from .reactor import *
 from .sparger import *
 from .separator import *
+from .flowsheet import *
 from .results import *
@@ -12,7 +12,8 @@ import gc
 import networkx as nx
 
 from saltproc import SerpentDepcode, OpenMCDepcode, Simulation, Reactor
-from saltproc import Process, Sparger, Separator, Materialflow
+from saltproc import CompactMaterialflow, NuclideIndex
+from saltproc import Flowsheet, get_extraction_processes, get_feeds
 
 # Validator that fills defualt values of JSON schema before validating
 from saltproc._schema_default import DefaultFillingValidator
@@ -47,76 +48,99 @@ def run():
 
     # Check: Restarting previous simulation or starting new?
     failed_step = simulation.check_restart()
+    # Reprocessing state reused between depletion steps
+    nuclide_index = NuclideIndex()
+    flowsheet = Flowsheet(process_file, dot_file)
+    # Keep the database open for the whole run
+    simulation.start_session()
     # Run sequence
     # Start sequence
-    for step_idx in range(failed_step, len(msr.depletion_timesteps)):
-        print("\n\n\nStep #%i has been started" % (step_idx + 1))
-        simulation.sim_depcode.write_runtime_input(msr,
-                                                   step_idx,
-                                                   simulation.restart_flag)
-
-        if rebuild_saltproc_results:
-            simulation.sim_depcode.rebuild_simulation_files(step_idx)
-        else:
-            depcode.run_depletion_step(mpi_args, threads)
-        if step_idx == 0 and simulation.restart_flag is False:  # First step
-            # Read general simulation data which never changes
-            simulation.store_depcode_metadata()
-            # Parse and store data for initial state (beginning of step_idx)
-            mats = depcode.read_depleted_materials(False)
-            simulation.store_mat_data(mats, step_idx - 1, False)
-        # Finish of First step
-        # Main sequence
-        mats = depcode.read_depleted_materials(True)
-        simulation.store_mat_data(mats, step_idx, False)
-        simulation.store_step_neutronics_parameters()
-        simulation.store_step_metadata()
-
-        # Reprocessing here
-        if run_without_reprocessing:
-            waste_and_feed_streams = None
-            waste_streams = None
-            extracted_mass = None
-        else:
-            for key in mats.keys():
-                print('\nMass and volume of '
-                      f'{key} before reproc: {mats[key].mass} g, ',
-                      f'{mats[key].volume} cm3')
-            waste_streams, extracted_mass = reprocess_materials(mats,
-                                                                process_file,
-                                                                dot_file)
-            for key in mats.keys():
-                print('\nMass and volume of '
-                      f'{key} after reproc: {mats[key].mass} g, ',
-                      f'{mats[key].volume} cm3')
-
-            waste_and_feed_streams = refill_materials(mats,
-                                                      extracted_mass,
-                                                      waste_streams,
-                                                      process_file)
-            for key in mats.keys():
-                print('\nMass and volume of '
-                      f'{key} after refill: {mats[key].mass} g, ',
-                      f'{mats[key].volume} cm3')
-
-            print("Removed mass [g]:", extracted_mass)
-
-         # Store in DB after reprocessing and refill (right before next depl)
-        simulation.store_after_repr(mats, waste_and_feed_streams, step_idx)
-        depcode.update_depletable_materials(mats, simulation.burn_time)
-
-        # Preserve depletion and transport result and input files
-        if not rebuild_saltproc_results:
-            depcode.preserve_simulation_files(step_idx)
-
-        del mats, waste_streams, waste_and_feed_streams, extracted_mass
-        gc.collect()
-        # Switch to another geometry?
-        if simulation.adjust_geo and simulation.read_k_eds_delta(step_idx):
-            depcode.switch_to_next_geometry()
-        print("\nTime at the end of current depletion step: %fd" %
-              simulation.burn_time)
-        print("Simulation succeeded.\n")
+    # Close the depletion code and the database even if a step fails
+    try:
+        for step_idx in range(failed_step, len(msr.depletion_timesteps)):
+            print("\n\n\nStep #%i has been started" % (step_idx + 1))
+            simulation.sim_depcode.write_runtime_input(msr,
+                                                       step_idx,
+                                                       simulation.restart_flag)
+
+            if rebuild_saltproc_results:
+                simulation.sim_depcode.rebuild_simulation_files(step_idx)
+            else:
+                depcode.run_depletion_step(mpi_args, threads)
+            if step_idx == 0 and simulation.restart_flag is False:  # First step
+                # Read general simulation data which never changes
+                simulation.store_depcode_metadata()
+                # Parse and store data for initial state (beginning of step_idx)
+                mats = depcode.read_depleted_materials(False)
+                simulation.store_mat_data(mats, step_idx - 1, False)
+            # Finish of First step
+            # Main sequence
+            mats = depcode.read_depleted_materials(True)
+            simulation.store_mat_data(mats, step_idx, False)
+            simulation.store_step_neutronics_parameters()
+            simulation.store_step_metadata()
+
+            # Reprocessing here
+            if run_without_reprocessing:
+                waste_and_feed_streams = None
+                waste_streams = None
+                extracted_mass = None
+            else:
+                for key in mats.keys():
+                    print('\nMass and volume of '
+                          f'{key} before reproc: {mats[key].mass} g, ',
+                          f'{mats[key].volume} cm3')
+                mats = {key: CompactMaterialflow.from_materialflow(
+                            mat, nuclide_index)
+                        for key, mat in mats.items()}
+                waste_streams, extracted_mass = reprocess_materials(
+                    mats,
+                    process_file,
+                    dot_file,
+                    flowsheet=flowsheet,
+                    t=simulation.burn_time)
+                for key in mats.keys():
+                    print('\nMass and volume of '
+                          f'{key} after reproc: {mats[key].mass} g, ',
+                          f'{mats[key].volume} cm3')
+
+                waste_and_feed_streams = refill_materials(mats,
+                                                          extracted_mass,
+                                                          waste_streams,
+                                                          process_file,
+                                                          flowsheet=flowsheet)
+                for key in mats.keys():
+                    print('\nMass and volume of '
+                          f'{key} after refill: {mats[key].mass} g, ',
+                          f'{mats[key].volume} cm3')
+                mats = {key: mat.to_materialflow()
+                        for key, mat in mats.items()}
+
+                print("Removed mass [g]:", extracted_mass)
+
+             # Store in DB after reprocessing and refill (right before next depl)
+            simulation.store_after_repr(mats, waste_and_feed_streams, step_idx)
+            simulation.flush()
+            depcode.update_depletable_materials(mats, simulation.burn_time)
+            depcode.close_step_output()
+
+            # Preserve depletion and transport result and input files
+            if not rebuild_saltproc_results:
+                depcode.preserve_simulation_files(step_idx)
+
+            del mats, waste_streams, waste_and_feed_streams, extracted_mass
+            gc.collect()
+            # Switch to another geometry?
+            if simulation.adjust_geo and simulation.read_k_eds_delta(step_idx):
+                depcode.switch_to_next_geometry()
+            print("\nTime at the end of current depletion step: %fd" %
+                  simulation.burn_time)
+            print("Simulation succeeded.\n")
+    finally:
+        try:
+            depcode.close()
+        finally:
+            simulation.end_session()
 
 def parse_arguments():
     """Parses arguments from command line.
@@ -393,12 +417,16 @@ def _scale_depletion_timesteps(timestep_units, depletion_timesteps, codename):
 
     return depletion_timesteps
 
-def reprocess_materials(mats, process_file, dot_file):
+def reprocess_materials(mats, process_file, dot_file, flowsheet=None, t=0.0):
     """Applies extraction reprocessing scheme to burnable materials.
 
+    :class:`saltproc.materialflow.CompactMaterialflow` materials are
+    reprocessed with a :class:`saltproc.flowsheet.FlowsheetOperator`
+    instead of walking every extraction path.
+
     Parameters
     ----------
-    mats : dict of str to Materialflow
+    mats : dict of str to Materialflow or CompactMaterialflow
         Dictionary that contains :class:`saltproc.materialflow.Materialflow`
         objects with burnable material data right after irradiation in the
         core.
@@ -406,6 +434,12 @@ def reprocess_materials(mats, process_file, dot_file):
         Path to the `.json` file describing the fuel reprocessing components.
     dot_file : str
         Path to the `.dot` describing the fuel reprocessing paths.
+    flowsheet : Flowsheet, optional
+        Parsed reprocessing inputs reused between depletion steps. If not
+        given, `process_file` and `dot_file` are parsed on every call.
+    t : float
+        Cumulative simulation time [d] passed to time-dependent efficiency
+        functions.
 
     Returns
     -------
@@ -428,9 +462,13 @@ def reprocess_materials(mats, process_file, dot_file):
     waste_streams = OrderedDict()
     thru_flows = OrderedDict()
 
-    extraction_processes = get_extraction_processes(process_file)
-    material_for_extraction, extraction_process_paths = \
-        get_extraction_process_paths(dot_file)
+    if flowsheet is None:
+        flowsheet = Flowsheet(process_file, dot_file)
+    else:
+        flowsheet.refresh()
+    extraction_processes = flowsheet.extraction_processes
+    material_for_extraction = flowsheet.material_for_extraction
+    extraction_process_paths = flowsheet.extraction_process_paths
 
     # iterate over materials
     for mat_name, processes in extraction_processes.items():
@@ -442,7 +480,14 @@ def reprocess_materials(mats, process_file, dot_file):
         print(f"Mass of material '{mat_name}' before reprocessing: "
               f"{inmass[mat_name]} g")
 
-        if mat_name == material_for_extraction:
+        if mat_name == material_for_extraction \
+                and isinstance(initial_material, CompactMaterialflow):
+            operator = flowsheet.get_operator(mat_name,
+                                              initial_material.nuclide_index)
+            mats[mat_name], waste_streams[mat_name] = \
+                operator.apply(initial_material, t)
+
+        elif mat_name == material_for_extraction:
             for i, path in enumerate(extraction_process_paths):
                 thru_flows[mat_name].append(initial_material)
 
@@ -473,58 +518,11 @@ def reprocess_materials(mats, process_file, dot_file):
 
     # Clear memory
     del extraction_processes, inmass, mat_name, processes, thru_flows
-    del material_for_extraction, extraction_process_paths, divisor
-    del thru_flow, waste_stream
+    del material_for_extraction, extraction_process_paths
 
     return waste_streams, extracted_mass
 
 
-def get_extraction_processes(process_file):
-    """Parses ``extraction_processes`` objects from the `.json` file describing
-    processing system objects.
-
-    ``extraction_processes`` objects describe components that would perform
-    fuel processing in a real reactor, such as a gas sparger or a nickel
-    filter.
-
-    Parameters
-    ----------
-    process_file : str
-        Path to the `.json` file describing the fuel reprocessing components.
-
-    Returns
-    -------
-    extraction_processes : dict of str to dict
-        Dictionary mapping material names to extraction processes.
-
-        ``key``
-            Name of burnable material.
-        ``value``
-            Dictionary mapping process names to
-            :class:`saltproc.process.Process` objects.
-
-    """
-    extraction_processes = OrderedDict()
-    with open(process_file) as f:
-        j = json.load(f)
-        for mat_name, procs in j.items():
-            extraction_processes[mat_name] = OrderedDict()
-            for proc_name, proc_data in procs['extraction_processes'].items():
-                st = proc_data['efficiency']
-                if proc_name == 'sparger' and st == "self":
-                    extraction_processes[mat_name][proc_name] = \
-                        Sparger(**proc_data)
-                elif proc_name == 'entrainment_separator' and st == "self":
-                    extraction_processes[mat_name][proc_name] = \
-                        Separator(**proc_data)
-                else:
-                    extraction_processes[mat_name][proc_name] = \
-                        Process(**proc_data)
-
-        gc.collect()
-        return extraction_processes
-
-
 def get_extraction_process_paths(dot_file):
     """Reads directed graph that describes fuel reprocessing system structure
     from a `*.dot` file.
@@ -555,15 +553,21 @@ def get_extraction_process_paths(dot_file):
     return mat_name, extraction_process_paths
 
 
-def refill_materials(mats, extracted_mass, waste_streams, process_file):
+def refill_materials(mats,
+                     extracted_mass,
+                     waste_streams,
+                     process_file,
+                     flowsheet=None):
     """Makes up material loss in removal processes by adding fresh fuel.
 
     Parameters
     ----------
-    mats : dict of str to Materialflow
+    mats : dict of str to Materialflow or CompactMaterialflow
         Dicitionary mapping material names to
         :class:`saltproc.materialflow.Materialflow` objects that have already
-        been reprocessed by `reprocess_materials`.
+        been reprocessed by `reprocess_materials`. Feeds are converted to
+        :class:`saltproc.materialflow.CompactMaterialflow` when refilling
+        compact materials.
     extracted_mass : dict of str to float
         Dictionary mapping material names to the mass in [g] of that material
         removed via reprocessing.
@@ -578,6 +582,9 @@ def refill_materials(mats, extracted_mass, waste_streams, process_file):
             waste streams.
     process_file : str
         Path to the `.json` file describing the fuel reprocessing components.
+    flowsheet : Flowsheet, optional
+        Parsed reprocessing inputs reused between depletion steps. If not
+        given, the feeds are read from `process_file`.
 
     Returns
     -------
@@ -587,12 +594,23 @@ def refill_materials(mats, extracted_mass, waste_streams, process_file):
         representing those material feed streams.
 
     """
-    feeds = get_feeds(process_file)
+    if flowsheet is None:
+        feeds = get_feeds(process_file)
+    else:
+        flowsheet.refresh()
+        feeds = flowsheet.feeds
     refill_mats = OrderedDict()
     # Get feed group for each material
     for mat, mat_feeds in feeds.items():
         # Get each feed in the feed group
         for feed_name, feed in mat_feeds.items():
+            if isinstance(mats[mat], CompactMaterialflow):
+                if flowsheet is None:
+                    feed = CompactMaterialflow.from_materialflow(
+                        feed, mats[mat].nuclide_index)
+                else:
+                    feed = flowsheet.get_compact_feed(
+                        mat, feed_name, mats[mat].nuclide_index)
             scale = extracted_mass[mat] / feed.mass
             refill_mats[mat] = scale * feed
             waste_streams[mat]['feed_' + str(feed_name)] = refill_mats[mat]
@@ -600,41 +618,3 @@ def refill_materials(mats, extracted_mass, waste_streams, process_file):
         print('Refilled fresh material: %s %f g' %
               (mat, refill_mats[mat].mass))
     return waste_streams
-
-
-def get_feeds(process_file):
-    """Parses ``feed`` objects from `.json` file describing processing system
-    objects.
-
-    ``feed`` objects describe material flows that replace nuclides needed to
-    keep the reactor operating that were removed during reprocessing.
-
-    Parameters
-    ----------
-    process_file : str
-        Path to the `.json` file describing the fuel reprocessing components.
-
-    Returns
-    -------
-    feeds : dict of str to dict
-        Dictionary that maps material names to material flows
-
-        ``key``
-            Name of burnable material.
-        ``value``
-            Dictionary mapping material flow names to
-            :class:`saltproc.materialflow.Materialflow` objects representing
-            material feeds.
-
-    """
-    feeds = OrderedDict()
-    with open(process_file) as f:
-        j = json.load(f)
-        for mat in j:
-            feeds[mat] = OrderedDict()
-            for feed_name, feed_data in j[mat]['feeds'].items():
-                comp = feed_data['comp']
-                feeds[mat][feed_name] = Materialflow(comp=comp,
-                                                     density=feed_data['density'],
-                                                     volume=feed_data['volume'])
-        return feeds
@@ -119,6 +119,22 @@ class Depcode(ABC):
                 :class:`Materialflow` object holding material composition and properties.
 
         """
+
+    def close_step_output(self):
+        """Release depletion step output that the reader methods cached for
+        the current depletion step. Called once all results of the step
+        have been read."""
+
+    def remove_runtime_exchange_files(self):
+        """Remove files that pass data between depletion steps, left in the
+        output directory by a previous run. Called when a simulation starts
+        from the first depletion step."""
+
+    def close(self):
+        """Release resources kept across depletion steps, such as an
+        in-process depletion session. Called at the end of the
+        simulation."""
+
     def run_depletion_step(self, mpi_args, args):
         """Runs a depletion step as a subprocess with the given parameters.
 
@@ -260,9 +276,7 @@ class Depcode(ABC):
             file_path.rename(step_results_dir / fname)
 
         for file_path, fname in zip(input_paths, self._INPUTFILE_NAMES):
-            lines = self.read_plaintext_file(file_path)
-            with open(step_results_dir / fname, 'w') as out_file:
-                out_file.writelines(lines)
+            shutil.copyfile(file_path, step_results_dir / fname)
 
     def rebuild_simulation_files(self, step_idx):
         """Move simulation input and output files
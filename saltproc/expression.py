@@ -0,0 +1,136 @@
+"""Expression module"""
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+
+# Functions and constants available in efficiency expressions. NumPy
+# versions are used so that expressions accept array-valued variables.
+EXPRESSION_FUNCTIONS = {
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sqrt': np.sqrt,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'arctan': np.arctan,
+    'tanh': np.tanh,
+    'abs': np.abs,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'pi': np.pi,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.Compare, ast.IfExp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+class EfficiencyExpression():
+    """Efficiency function (eps(x,m,t,P,L)) parsed and compiled once.
+
+    The expression may only contain numbers, arithmetic and comparison
+    operators, the functions in ``EXPRESSION_FUNCTIONS`` and variable names.
+    Variables are supplied on evaluation and may be NumPy arrays, in which
+    case the expression is evaluated elementwise.
+
+    Parameters
+    ----------
+    expression : str
+        Efficiency function, e.g. ``'0.95*(1-exp(-t/tau))'``.
+
+    Attributes
+    ----------
+    variables : frozenset of str
+        Names in `expression` that must be supplied on evaluation.
+
+    """
+
+    def __init__(self, expression):
+        """ Initializes the EfficiencyExpression object.
+
+        """
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as err:
+            raise ValueError(
+                f'Invalid efficiency expression: {expression}') from err
+        names = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError(
+                    f'{type(node).__name__} is not allowed in efficiency '
+                    f'expression: {expression}')
+            if isinstance(node, ast.Call) \
+                    and not (isinstance(node.func, ast.Name)
+                             and callable(EXPRESSION_FUNCTIONS.get(
+                                 node.func.id))):
+                raise ValueError(
+                    f'Unsupported function call in efficiency expression: '
+                    f'{expression}')
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+        self.variables = frozenset(names.difference(EXPRESSION_FUNCTIONS))
+        self._code = compile(tree, '<efficiency>', 'eval')
+
+    def __call__(self, **variables):
+        """Evaluate the expression.
+
+        Parameters
+        ----------
+        variables : dict
+            Values of the variables in the expression. Extra entries are
+            ignored.
+
+        Returns
+        -------
+        value : float or numpy.ndarray
+
+        """
+        return self.evaluate(variables)
+
+    def evaluate(self, namespace):
+        """Evaluate the expression with variables taken from `namespace`.
+
+        Parameters
+        ----------
+        namespace : dict of str to object
+            Mapping containing at least the names in :attr:`variables`.
+
+        Returns
+        -------
+        value : float or numpy.ndarray
+
+        """
+        missing = self.variables.difference(namespace)
+        if missing:
+            raise NameError(f'Undefined variables {sorted(missing)} in '
+                            f'efficiency expression: {self.expression}')
+        local_vars = {name: namespace[name] for name in self.variables}
+        return eval(self._code,
+                    {'__builtins__': {}, **EXPRESSION_FUNCTIONS},
+                    local_vars)
+
+
+@lru_cache(maxsize=None)
+def compile_expression(expression):
+    """Return the cached :class:`EfficiencyExpression` for `expression`.
+
+    Parameters
+    ----------
+    expression : str
+        Efficiency function.
+
+    Returns
+    -------
+    EfficiencyExpression
+
+    """
+    return EfficiencyExpression(expression)
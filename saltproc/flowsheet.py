@@ -0,0 +1,457 @@
+"""Flowsheet module"""
+import os
+import re
+import gc
+import json
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from saltproc import Materialflow, CompactMaterialflow
+from saltproc import Process, Sparger, Separator
+
+
+def get_extraction_processes(process_file):
+    """Parses ``extraction_processes`` objects from the `.json` file describing
+    processing system objects.
+
+    ``extraction_processes`` objects describe components that would perform
+    fuel processing in a real reactor, such as a gas sparger or a nickel
+    filter.
+
+    Parameters
+    ----------
+    process_file : str
+        Path to the `.json` file describing the fuel reprocessing components.
+
+    Returns
+    -------
+    extraction_processes : dict of str to dict
+        Dictionary mapping material names to extraction processes.
+
+        ``key``
+            Name of burnable material.
+        ``value``
+            Dictionary mapping process names to
+            :class:`saltproc.process.Process` objects.
+
+    """
+    extraction_processes = OrderedDict()
+    with open(process_file) as f:
+        j = json.load(f)
+        for mat_name, procs in j.items():
+            extraction_processes[mat_name] = OrderedDict()
+            for proc_name, proc_data in procs['extraction_processes'].items():
+                st = proc_data['efficiency']
+                if proc_name == 'sparger' and st == "self":
+                    extraction_processes[mat_name][proc_name] = \
+                        Sparger(**proc_data)
+                elif proc_name == 'entrainment_separator' and st == "self":
+                    extraction_processes[mat_name][proc_name] = \
+                        Separator(**proc_data)
+                else:
+                    extraction_processes[mat_name][proc_name] = \
+                        Process(**proc_data)
+
+        gc.collect()
+        return extraction_processes
+
+
+def get_feeds(process_file):
+    """Parses ``feed`` objects from `.json` file describing processing system
+    objects.
+
+    ``feed`` objects describe material flows that replace nuclides needed to
+    keep the reactor operating that were removed during reprocessing.
+
+    Parameters
+    ----------
+    process_file : str
+        Path to the `.json` file describing the fuel reprocessing components.
+
+    Returns
+    -------
+    feeds : dict of str to dict
+        Dictionary that maps material names to material flows
+
+        ``key``
+            Name of burnable material.
+        ``value``
+            Dictionary mapping material flow names to
+            :class:`saltproc.materialflow.Materialflow` objects representing
+            material feeds.
+
+    """
+    feeds = OrderedDict()
+    with open(process_file) as f:
+        j = json.load(f)
+        for mat in j:
+            feeds[mat] = OrderedDict()
+            for feed_name, feed_data in j[mat]['feeds'].items():
+                comp = feed_data['comp']
+                feeds[mat][feed_name] = Materialflow(comp=comp,
+                                                     density=feed_data['density'],
+                                                     volume=feed_data['volume'])
+        return feeds
+
+
+class FlowsheetOperator():
+    """Reprocessing flowsheet compiled into a linear map acting on nuclide
+    mass vectors.
+
+    Walking every path from ``core_outlet`` to ``core_inlet`` and applying
+    each :class:`~saltproc.process.Process` in turn is equivalent, for a
+    fixed set of removal efficiencies, to multiplying the inflow mass vector
+    elementwise by one diagonal operator for the thru flow and one for each
+    waste stream. The operator is compiled once and only recompiled when the
+    nuclide index grows or when a time-dependent efficiency is evaluated at
+    a new time.
+
+    Parameters
+    ----------
+    processes : dict of str to Process
+        Dictionary mapping process names to
+        :class:`saltproc.process.Process` objects for a single material.
+    paths : list of list of str
+        All paths between ``core_outlet`` and ``core_inlet``.
+    nuclide_index : NuclideIndex
+        Index of the material flows the operator is applied to.
+
+    Attributes
+    ----------
+    thru_operator : numpy.ndarray
+        Fraction of each nuclide's inflow mass that returns to the core.
+    waste_operator : numpy.ndarray
+        2D array whose rows hold the fraction of each nuclide's inflow mass
+        that ends up in the waste stream of a process.
+    waste_names : list of str
+        Process names matching the rows of `waste_operator`.
+    flowrate_factor : float
+        Fraction of the inflow mass flow rate that returns to the core.
+
+    """
+
+    def __init__(self, processes, paths, nuclide_index):
+        """ Initializes the FlowsheetOperator object.
+
+        """
+        self.processes = processes
+        self.paths = paths
+        self.nuclide_index = nuclide_index
+        self.time_dependent = any(processes[proc].time_dependent
+                                  for path in paths for proc in path)
+        self._t = None
+        self._n_nucs = -1
+        self.compile()
+
+    def compile(self, t=0.0):
+        """Build the thru flow and waste stream operators.
+
+        Parameters
+        ----------
+        t : float
+            Simulation time passed to time-dependent efficiency functions.
+
+        """
+        n_nucs = len(self.nuclide_index)
+        outlet_flowrate = self.processes['core_outlet'].mass_flowrate
+        thru_operator = np.zeros(n_nucs)
+        waste_rows = {}
+        flowrate_factor = 0.0
+        for path in self.paths:
+            path_operator = np.ones(n_nucs)
+            path_flowrate = 1.0
+            for proc in path:
+                process = self.processes[proc]
+                # Fraction of the flow going to the process proc
+                divisor = float(process.mass_flowrate / outlet_flowrate)
+                efficiency = process.get_efficiency_vector(self.nuclide_index,
+                                                           t)
+                path_operator *= divisor
+                path_flowrate *= divisor
+                # Waste streams shared between paths hold the last path
+                waste_rows[proc] = path_operator * efficiency
+                path_operator = path_operator - waste_rows[proc]
+            thru_operator += path_operator
+            flowrate_factor += path_flowrate
+
+        self.thru_operator = thru_operator
+        self.waste_names = list(waste_rows.keys())
+        if waste_rows:
+            self.waste_operator = np.vstack(list(waste_rows.values()))
+        else:
+            self.waste_operator = np.zeros((0, n_nucs))
+        self.flowrate_factor = flowrate_factor
+        self._t = t
+        self._n_nucs = n_nucs
+
+    def update(self, t=0.0):
+        """Recompile the operator if the nuclide index grew or if a
+        time-dependent efficiency must be evaluated at a new time.
+
+        Parameters
+        ----------
+        t : float
+            Simulation time passed to time-dependent efficiency functions.
+
+        """
+        if len(self.nuclide_index) != self._n_nucs \
+                or (self.time_dependent and t != self._t):
+            self.compile(t)
+
+    def apply(self, inflow, t=0.0):
+        """Reprocess a material flow.
+
+        Parameters
+        ----------
+        inflow : CompactMaterialflow
+            Material flowing out of the core.
+        t : float
+            Simulation time passed to time-dependent efficiency functions.
+
+        Returns
+        -------
+        thru_flow : CompactMaterialflow
+            Material returning to the core.
+        waste_streams : dict of str to CompactMaterialflow
+            Dictionary mapping waste stream names (``'waste_' + process``)
+            to the material removed by that process.
+
+        """
+        self.update(t)
+        masses = inflow._aligned_masses()
+        density = inflow.density
+        thru_masses = self.thru_operator * masses
+        waste_masses = self.waste_operator * masses
+
+        waste_streams = {}
+        for proc, proc_masses in zip(self.waste_names, waste_masses):
+            waste_streams['waste_' + proc] = CompactMaterialflow(
+                masses=proc_masses,
+                nuclide_index=self.nuclide_index,
+                density=density,
+                volume=_volume(proc_masses.sum(), density, 0.0))
+        thru_flow = CompactMaterialflow(
+            masses=thru_masses,
+            nuclide_index=self.nuclide_index,
+            density=density,
+            volume=_volume(thru_masses.sum(), density, inflow.volume),
+            mass_flowrate=inflow.mass_flowrate * self.flowrate_factor,
+            void_frac=inflow.void_frac,
+            burnup=inflow.burnup)
+        return thru_flow, waste_streams
+
+
+def _volume(mass, density, default):
+    """Volume of `mass` at `density`, or `default` if the density is
+    unknown."""
+    if density:
+        return float(mass) / density
+    return default
+
+
+class Flowsheet():
+    """Reprocessing system inputs parsed once and reused between depletion
+    steps.
+
+    Holds the extraction processes, extraction paths and feeds read from the
+    process and path files, plus the
+    :class:`~saltproc.flowsheet.FlowsheetOperator` objects and compact feeds
+    built from them. A file is parsed again only when its modification time
+    changes and its content hash differs from the one last parsed. The path
+    file is read with a lightweight DOT reader instead of pydot.
+
+    Parameters
+    ----------
+    process_file : str
+        Path to the `.json` file describing the fuel reprocessing components.
+    dot_file : str
+        Path to the `.dot` describing the fuel reprocessing paths.
+
+    Attributes
+    ----------
+    extraction_processes : dict of str to dict
+        Output of :func:`get_extraction_processes`.
+    material_for_extraction : str
+        Name of burnable material which the reprocessing scheme applies to.
+    extraction_process_paths : list of list of str
+        All paths between `core_outlet` and `core_inlet`.
+    feeds : dict of str to dict
+        Output of :func:`get_feeds`.
+
+    """
+
+    def __init__(self, process_file, dot_file):
+        """ Initializes the Flowsheet object.
+
+        """
+        self.process_file = process_file
+        self.dot_file = dot_file
+        self._signatures = {}
+        self._operators = {}
+        self._compact_feeds = {}
+        self._load_processes()
+        self._load_paths()
+
+    def _file_changed(self, path):
+        """Return `True` if `path` differs from when it was last loaded.
+
+        The file is hashed only if its modification time or size changed.
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        signature = self._signatures.get(path)
+        if signature is not None and signature[0] == stamp:
+            return False
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._signatures[path] = (stamp, digest)
+        return signature is None or signature[1] != digest
+
+    def _load_processes(self):
+        self._file_changed(self.process_file)
+        self.extraction_processes = get_extraction_processes(self.process_file)
+        self.feeds = get_feeds(self.process_file)
+        self._operators = {}
+        self._compact_feeds = {}
+
+    def _load_paths(self):
+        self._file_changed(self.dot_file)
+        self.material_for_extraction, self.extraction_process_paths = \
+            read_dot_paths(self.dot_file)
+        self._operators = {}
+
+    def refresh(self):
+        """Parse the process and path files again if they changed on
+        disk."""
+        if self._file_changed(self.process_file):
+            self._load_processes()
+        if self._file_changed(self.dot_file):
+            self._load_paths()
+
+    def get_operator(self, mat_name, nuclide_index):
+        """Return the compiled flowsheet operator for a material.
+
+        Parameters
+        ----------
+        mat_name : str
+            Name of burnable material.
+        nuclide_index : NuclideIndex
+            Index of the material flows the operator is applied to.
+
+        Returns
+        -------
+        FlowsheetOperator
+
+        """
+        operator = self._operators.get(mat_name)
+        if operator is None or operator.nuclide_index is not nuclide_index:
+            operator = FlowsheetOperator(self.extraction_processes[mat_name],
+                                         self.extraction_process_paths,
+                                         nuclide_index)
+            self._operators[mat_name] = operator
+        return operator
+
+    def get_compact_feed(self, mat_name, feed_name, nuclide_index):
+        """Return a feed as a
+        :class:`~saltproc.materialflow.CompactMaterialflow` over
+        `nuclide_index`.
+
+        Parameters
+        ----------
+        mat_name : str
+            Name of burnable material.
+        feed_name : str
+            Name of the feed.
+        nuclide_index : NuclideIndex
+            Index to register the feed nuclides in.
+
+        Returns
+        -------
+        CompactMaterialflow
+
+        """
+        key = (mat_name, feed_name)
+        feed = self._compact_feeds.get(key)
+        if feed is None or feed.nuclide_index is not nuclide_index:
+            feed = CompactMaterialflow.from_materialflow(
+                self.feeds[mat_name][feed_name], nuclide_index)
+            self._compact_feeds[key] = feed
+        return feed
+
+
+_DOT_ID = r'"(?:[^"\\]|\\.)*"|[\w.]+'
+_DOT_COMMENT = re.compile(r'/\*.*?\*/|//[^\n]*|^\s*#[^\n]*',
+                          re.S | re.M)
+_DOT_GRAPH = re.compile(r'^\s*(?:strict\s+)?digraph\s*(%s)?\s*{' % _DOT_ID,
+                        re.I)
+_DOT_EDGE = re.compile(r'(%s)((?:\s*->\s*(?:%s))+)' % (_DOT_ID, _DOT_ID))
+_DOT_EDGE_TARGET = re.compile(r'->\s*(%s)' % _DOT_ID)
+
+
+def _dot_id(token):
+    """Strip the quotes from a DOT identifier."""
+    if token.startswith('"'):
+        return token[1:-1]
+    return token
+
+
+def read_dot_paths(dot_file, source='core_outlet', target='core_inlet'):
+    """Reads the extraction paths from a `*.dot` file without pydot.
+
+    Only the graph name and the edge statements (``a -> b`` chains, with
+    optional attribute lists) are read. Paths are returned in the same
+    order as :func:`saltproc.app.get_extraction_process_paths`.
+
+    Parameters
+    ----------
+    dot_file : str
+        Path to the `.dot` describing the fuel reprocessing paths.
+    source : str
+        Name of the node all paths start from.
+    target : str
+        Name of the node all paths end at.
+
+    Returns
+    -------
+    mat_name : str
+        Name of burnable material which the reprocessing scheme applies to.
+    extraction_process_paths : list
+        List of lists containing all possible paths between `source` and
+        `target`.
+
+    """
+    with open(dot_file) as f:
+        text = _DOT_COMMENT.sub('', f.read())
+    graph = _DOT_GRAPH.search(text)
+    if graph is None:
+        raise ValueError(f'{dot_file} does not describe a directed graph.')
+    mat_name = _dot_id(graph.group(1)) if graph.group(1) else ''
+
+    # Drop attribute lists so their values are not mistaken for nodes
+    text = re.sub(r'\[[^\]]*\]', '', text[graph.end():])
+    successors = {}
+    for edge in _DOT_EDGE.finditer(text):
+        nodes = [_dot_id(edge.group(1))] + \
+            [_dot_id(node) for node in _DOT_EDGE_TARGET.findall(edge.group(2))]
+        for u, v in zip(nodes[:-1], nodes[1:]):
+            successors.setdefault(u, []).append(v)
+
+    # Depth-first search visiting successors in file order
+    extraction_process_paths = []
+    if source not in successors:
+        return mat_name, extraction_process_paths
+    path = [source]
+    stack = [iter(successors[source])]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            path.pop()
+        elif node == target:
+            extraction_process_paths.append(path + [node])
+        elif node not in path:
+            path.append(node)
+            stack.append(iter(successors.get(node, [])))
+    return mat_name, extraction_process_paths
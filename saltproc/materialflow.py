@@ -1,6 +1,7 @@
 """Materialflow module"""
 import copy
 import math
+import re
 from collections import Counter
 
 import numpy as np
@@ -284,3 +285,462 @@ class Materialflow(Material):
             return result
         else:
             NotImplemented
+
+
+class NuclideIndex():
+    """Append-only map between nuclide names and positions in a mass vector.
+
+    A single :class:`NuclideIndex` is meant to be shared by every
+    :class:`CompactMaterialflow` taking part in the same calculation so
+    that their mass vectors line up and can be combined elementwise.
+
+    Parameters
+    ----------
+    nuclides : iterable of str, optional
+        Nuclide names (e.g. ``'U235'``, ``'Am242_m1'``) to register.
+
+    """
+
+    def __init__(self, nuclides=None):
+        """Initializes the NuclideIndex object.
+
+        """
+        self._nuclides = []
+        self._elements = []
+        self._element_array = np.array([], dtype=str)
+        self._positions = {}
+        if nuclides is not None:
+            self.add(nuclides)
+
+    def __len__(self):
+        return len(self._nuclides)
+
+    def __contains__(self, nuc):
+        return nuc in self._positions
+
+    def __iter__(self):
+        return iter(self._nuclides)
+
+    @property
+    def nuclides(self):
+        """list of str : Registered nuclide names in index order."""
+        return list(self._nuclides)
+
+    @property
+    def elements(self):
+        """numpy.ndarray of str : Element symbol of each registered nuclide
+        in index order."""
+        if len(self._element_array) != len(self._elements):
+            self._element_array = np.array(self._elements, dtype=str)
+        return self._element_array
+
+    def add(self, nuclides):
+        """Register nuclides that are not already in the index and return
+        the positions of all of them.
+
+        Parameters
+        ----------
+        nuclides : iterable of str
+            Nuclide names.
+
+        Returns
+        -------
+        positions : numpy.ndarray of int
+            Position of each nuclide in the index.
+
+        """
+        positions = self._positions
+        idx = []
+        for nuc in nuclides:
+            pos = positions.get(nuc)
+            if pos is None:
+                pos = len(self._nuclides)
+                positions[nuc] = pos
+                self._nuclides.append(nuc)
+                match = re.match(r"([A-Z]+)([0-9]+)", nuc, re.I)
+                self._elements.append(
+                    match.groups()[0] if match is not None else nuc)
+            idx.append(pos)
+        return np.array(idx, dtype=int)
+
+    def position(self, nuc):
+        """Return the position of a single nuclide, or `None` if it is not
+        in the index."""
+        return self._positions.get(nuc)
+
+
+class CompactMaterialflow():
+    """Material flow stored as a vector of nuclide masses over a shared
+    :class:`NuclideIndex`.
+
+    Provides the attributes and arithmetic of :class:`Materialflow` that are
+    used during reprocessing, without the cost of maintaining an
+    :class:`openmc.Material`. Use :meth:`to_materialflow` to build one when
+    it is actually needed.
+
+    Parameters
+    ----------
+    masses : numpy.ndarray, optional
+        Nuclide masses [g] ordered as in `nuclide_index`. May be shorter than
+        the index; missing entries are zero.
+    nuclide_index : NuclideIndex, optional
+        Index shared by material flows that are combined with each other.
+        A new, empty index is created if not given.
+    density : float
+        Material density [g/cm^3]
+    volume : float
+        Material volume [cm^3]
+    mass_flowrate : float
+        mass flow rate of the material flow [g/s]
+    void_frac : float
+        void fraction in the material [%]
+    burnup : float
+        material burnup at the end of depletion step [MWd/kgU]
+
+    """
+
+    # Let numpy scalars defer to __rmul__ instead of broadcasting
+    __array_ufunc__ = None
+
+    def __init__(
+            self,
+            masses=None,
+            nuclide_index=None,
+            density=None,
+            volume=1.0,
+            mass_flowrate=0.0,
+            void_frac=0.0,
+            burnup=0.0):
+        """ Initializes the CompactMaterialflow object.
+
+        """
+        if nuclide_index is None:
+            nuclide_index = NuclideIndex()
+        self.nuclide_index = nuclide_index
+        if masses is None:
+            masses = np.zeros(len(nuclide_index))
+        self.masses = np.asarray(masses, dtype=np.float64)
+        self.volume = volume
+        if density is None:
+            mass = self.mass
+            density = mass / volume if (mass and volume) else 0.0
+        self.density = density
+        self.mass_flowrate = mass_flowrate
+        self.void_frac = void_frac
+        self.burnup = burnup
+
+    @classmethod
+    def from_comp(cls,
+                  comp,
+                  nuclide_index=None,
+                  comp_is_density=False,
+                  density=None,
+                  volume=1.0,
+                  **kwargs):
+        """Create a compact material flow from a composition dictionary.
+
+        Parameters
+        ----------
+        comp : dict of str to float
+            Dictionary mapping nuclide names to their weight fraction, or to
+            their mass density [g/cm^3] if `comp_is_density` is `True`.
+        nuclide_index : NuclideIndex, optional
+            Index to register the nuclides in.
+        comp_is_density : bool
+            Whether `comp` holds mass densities rather than weight fractions.
+        density : float
+            Material density [g/cm^3]
+        volume : float
+            Material volume [cm^3]
+        kwargs : dict
+            Remaining keyword arguments for :class:`CompactMaterialflow`.
+
+        Returns
+        -------
+        CompactMaterialflow
+
+        """
+        if nuclide_index is None:
+            nuclide_index = NuclideIndex()
+        positions = nuclide_index.add(comp.keys())
+        values = np.fromiter(comp.values(), dtype=np.float64, count=len(comp))
+        if comp_is_density:
+            values = values * volume
+        else:
+            values = values * (density * volume)
+        masses = np.zeros(len(nuclide_index))
+        np.add.at(masses, positions, values)
+        return cls(masses=masses,
+                   nuclide_index=nuclide_index,
+                   density=density,
+                   volume=volume,
+                   **kwargs)
+
+    @classmethod
+    def from_materialflow(cls, matflow, nuclide_index=None):
+        """Create a compact material flow from a :class:`Materialflow`.
+
+        Parameters
+        ----------
+        matflow : Materialflow
+            Material flow to convert.
+        nuclide_index : NuclideIndex, optional
+            Index to register the nuclides in.
+
+        Returns
+        -------
+        CompactMaterialflow
+
+        """
+        if isinstance(matflow, CompactMaterialflow):
+            return matflow.copy()
+        if nuclide_index is None:
+            nuclide_index = NuclideIndex()
+        positions = nuclide_index.add(matflow.comp.keys())
+        masses = np.zeros(len(nuclide_index))
+        values = np.fromiter(matflow.comp.values(),
+                             dtype=np.float64,
+                             count=len(matflow.comp))
+        np.add.at(masses, positions, values * matflow.mass)
+        return cls(masses=masses,
+                   nuclide_index=nuclide_index,
+                   density=matflow.get_density(),
+                   volume=matflow.volume,
+                   mass_flowrate=matflow.mass_flowrate,
+                   void_frac=matflow.void_frac,
+                   burnup=matflow.burnup)
+
+    def to_materialflow(self):
+        """Build the equivalent :class:`Materialflow`.
+
+        Returns
+        -------
+        Materialflow
+
+        """
+        comp = self.comp
+        if comp:
+            density = self.mass / self.volume
+        else:
+            density = self.density
+        matflow = Materialflow(comp=comp,
+                               density=density,
+                               volume=self.volume,
+                               mass_flowrate=self.mass_flowrate,
+                               void_frac=self.void_frac,
+                               burnup=self.burnup)
+        return matflow
+
+    def copy(self):
+        """Return a copy of the material flow sharing the same nuclide
+        index."""
+        return CompactMaterialflow(masses=self.masses.copy(),
+                                   nuclide_index=self.nuclide_index,
+                                   density=self.density,
+                                   volume=self.volume,
+                                   mass_flowrate=self.mass_flowrate,
+                                   void_frac=self.void_frac,
+                                   burnup=self.burnup)
+
+    def _aligned_masses(self):
+        """Mass vector padded with zeros to the current index length."""
+        n = len(self.nuclide_index)
+        if len(self.masses) < n:
+            self.masses = np.concatenate(
+                (self.masses, np.zeros(n - len(self.masses))))
+        return self.masses
+
+    @property
+    def mass(self):
+        """float : Total mass of the material flow [g]"""
+        return float(self.masses.sum())
+
+    @property
+    def mass_fractions(self):
+        """numpy.ndarray : Nuclide weight fractions ordered as in the nuclide
+        index."""
+        mass = self.mass
+        if mass == 0.0:
+            return np.zeros_like(self.masses)
+        return self.masses / mass
+
+    @property
+    def comp(self):
+        """dict of str to float : Weight fraction of each nuclide with a
+        non-zero mass."""
+        mass = self.mass
+        nonzero = np.flatnonzero(self.masses)
+        if len(nonzero) == 0:
+            return {}
+        nuclides = self.nuclide_index._nuclides
+        fractions = self.masses[nonzero] / mass
+        return dict(zip([nuclides[i] for i in nonzero], fractions.tolist()))
+
+    def get_mass(self, nuc=None):
+        """Return the mass [g] of a nuclide, or the total mass if `nuc` is not
+        given."""
+        if nuc is None:
+            return self.mass
+        pos = self.nuclide_index.position(nuc)
+        if pos is None or pos >= len(self.masses):
+            return 0.0
+        return float(self.masses[pos])
+
+    def get_density(self):
+        return self.density
+
+    def print_attr(self):
+        """Prints various attributes of CompactMaterialflow object.
+        """
+        print("Volume %f cm3" % self.volume)
+        print("Mass %f g" % self.mass)
+        print("Density %f g/cm3" % self.density)
+        print("Mass flowrate %f g/s" % self.mass_flowrate)
+        print("Void fraction %f " % self.void_frac)
+        print("Burnup %f MWd/kgU" % self.burnup)
+
+    def scale_matflow(self, f=1.0):
+        """Returns nuclide vector dictionary of masses scaled by factor.
+
+        Parameters
+        ----------
+        f : float
+            Scaling factor.
+
+        Returns
+        -------
+        new_mat_comp : dict of str to float
+            Dictionary mapping nuclide names to scaled mass [g].
+
+        """
+        nonzero = np.flatnonzero(self.masses)
+        nuclides = self.nuclide_index._nuclides
+        return dict(zip([nuclides[i] for i in nonzero],
+                        (f * self.masses[nonzero]).tolist()))
+
+    def scale(self, f):
+        """Scale the mass, volume and mass flowrate in place.
+
+        Parameters
+        ----------
+        f : float
+            Scaling factor.
+
+        Returns
+        -------
+        CompactMaterialflow
+            `self`
+
+        """
+        self.masses *= f
+        self.volume *= f
+        self.mass_flowrate *= f
+        return self
+
+    def normalize(self, mass=1.0):
+        """Rescale the composition in place so that the total mass equals
+        `mass`, keeping the density constant.
+
+        Parameters
+        ----------
+        mass : float
+            Target total mass [g].
+
+        Returns
+        -------
+        CompactMaterialflow
+            `self`
+
+        """
+        current_mass = self.mass
+        if current_mass == 0.0:
+            raise ValueError('Cannot normalize a material flow with no mass.')
+        self.masses *= mass / current_mass
+        if self.density:
+            self.volume = mass / self.density
+        return self
+
+    def _check_index(self, other):
+        if self.nuclide_index is not other.nuclide_index:
+            raise ValueError('CompactMaterialflow objects must share the '
+                             'same NuclideIndex to be combined.')
+
+    def __eq__(self, other):
+        """Overrides Python ``=`` operation to compare two
+        CompactMaterialflow objects. Compares objects total mass, volume,
+        and mass flowrate.
+
+        """
+        if not isinstance(other, CompactMaterialflow):
+            return NotImplemented
+
+        value = math.isclose(self.mass,
+                             other.mass,
+                             abs_tol=1e-15) \
+            and self.volume == other.volume \
+            and self.mass_flowrate == other.mass_flowrate
+
+        return value
+
+    def __iadd__(self, other):
+        """Adds the nuclide masses of `other` to `self` in place.
+
+        The density of `self` is kept, the volume follows from the combined
+        mass, the mass flowrates add, and burnup and void fraction are
+        averaged by mass and volume respectively.
+
+        """
+        if not isinstance(other, CompactMaterialflow):
+            return NotImplemented
+        self._check_index(other)
+        other_mass = other.mass
+        if other_mass == 0.0 or other.volume == 0.0:
+            return self
+        mass = self.mass
+        if mass == 0.0 or self.volume == 0.0:
+            self.masses = other._aligned_masses().copy()
+            self.density = other.density
+            self.volume = other.volume
+            self.mass_flowrate = other.mass_flowrate
+            self.void_frac = other.void_frac
+            self.burnup = other.burnup
+            return self
+
+        density = mass / self.volume
+        masses = self._aligned_masses()
+        other_masses = other._aligned_masses()
+        masses += other_masses
+        result_mass = mass + other_mass
+        result_volume = result_mass / density
+        self.void_frac = (self.void_frac * self.volume
+                          + other.void_frac * other.volume) / result_volume
+        self.burnup = (self.burnup * mass
+                       + other.burnup * other_mass) / result_mass
+        self.mass_flowrate += other.mass_flowrate
+        self.density = density
+        self.volume = result_volume
+        return self
+
+    def __add__(self, other):
+        """Overrides Python adding operation for CompactMaterialflow
+        objects. Returns a new object; see :meth:`__iadd__`."""
+        if not isinstance(other, CompactMaterialflow):
+            return NotImplemented
+        result = self.copy()
+        result += other
+        return result
+
+    def __imul__(self, scaling_factor):
+        if isinstance(scaling_factor, (int, float, np.number)):
+            return self.scale(scaling_factor)
+        return NotImplemented
+
+    def __mul__(self, scaling_factor):
+        """Overrides Python multiplication operation for CompactMaterialflow
+        objects. Returns a new object with the mass of each nuclide, volume
+        and mass flowrate scaled by `scaling_factor`."""
+        if isinstance(scaling_factor, (int, float, np.number)):
+            return self.copy().scale(scaling_factor)
+        return NotImplemented
+
+    __rmul__ = __mul__
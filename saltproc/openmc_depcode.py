@@ -2,18 +2,21 @@ import subprocess
 import os
 import re
 import json
+import shutil
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 
-from uncertainties import unumpy
 import openmc
 
-from saltproc import Materialflow
+from saltproc import Materialflow, OpenMCDepletionSession, OpenMCStepOutput
+from saltproc import get_zaid_table
+from saltproc import atomic_masses, names_to_zams
 from saltproc.depcode import Depcode
 from openmc.deplete.abc import _SECONDS_PER_DAY
-from openmc.deplete import Results, Chain
+from openmc.deplete import Chain
 from openmc.mgxs import Beta, DecayRate, EnergyGroups
-from openmc.data import atomic_mass, DataLibrary, JOULE_PER_EV
+from openmc.data import AVOGADRO, DataLibrary, JOULE_PER_EV
 
 
 _FISSILE_NUCLIDES = ['U233', 'U235', 'Pu239', 'Pu241']
@@ -22,6 +25,87 @@ _KG_PER_G = 1e-3
 _MW_PER_W = 1e-6
 _DELAYED_ENERGY_BOUNDS = (0,20e7) # eV
 _N_DELAYED_GROUPS = 6
+_OUTPUTFILE_NAMES = ('depletion_results.h5', 'openmc_simulation_n0.h5',
+                     'openmc_simulation_n1.h5', 'summary.h5', 'tallies.out')
+# Depletion steps without transport only write depletion results
+_INDEPENDENT_OUTPUTFILE_NAMES = ('depletion_results.h5',)
+# Neutronics parameters with their own tallies
+_TALLIED_QUANTITIES = ('breeding_ratio', 'delayed_neutrons', 'power')
+
+
+@lru_cache(maxsize=None)
+def _load_chain(chain_file_path, mtime_ns):
+    return Chain.from_xml(chain_file_path)
+
+
+def get_chain(chain_file_path):
+    """Return the depletion chain in `chain_file_path`, parsed once per file
+    version.
+
+    Parameters
+    ----------
+    chain_file_path : str
+        Path to depletion chain file.
+
+    Returns
+    -------
+    openmc.deplete.Chain
+
+    """
+    path = Path(chain_file_path).resolve()
+    return _load_chain(str(path), path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def _load_nuclides_with_data(cross_sections):
+    data_lib = DataLibrary.from_xml(cross_sections)
+    nuclides_with_data = set()
+    for library in data_lib.libraries:
+        if library['type'] == 'neutron':
+            nuclides_with_data.update(library['materials'])
+    return frozenset(nuclides_with_data)
+
+
+def get_nuclides_with_data():
+    """Return the nuclides with neutron data in the cross section library
+    given by ``OPENMC_CROSS_SECTIONS``, read once per library.
+
+    Returns
+    -------
+    frozenset of str
+
+    """
+    return _load_nuclides_with_data(os.environ.get('OPENMC_CROSS_SECTIONS'))
+
+
+@lru_cache(maxsize=None)
+def _get_burnable_nuclides(chain_file_path, mtime_ns, cross_sections):
+    chain = _load_chain(chain_file_path, mtime_ns)
+    nuclides_with_data = _load_nuclides_with_data(cross_sections)
+    return tuple(nuc.name for nuc in chain.nuclides
+                 if nuc.name in nuclides_with_data)
+
+
+def get_burnable_nuclides(chain_file_path):
+    """Return the nuclides of the depletion chain in `chain_file_path` that
+    have neutron data in the cross section library, computed once per chain
+    file and library.
+
+    Parameters
+    ----------
+    chain_file_path : str
+        Path to depletion chain file.
+
+    Returns
+    -------
+    tuple of str
+
+    """
+    path = Path(chain_file_path).resolve()
+    return _get_burnable_nuclides(str(path),
+                                  path.stat().st_mtime_ns,
+                                  os.environ.get('OPENMC_CROSS_SECTIONS'))
+
 
 class OpenMCDepcode(Depcode):
     """Interface for running depletion steps in OpenMC, as well as obtaining
@@ -46,6 +130,40 @@ class OpenMCDepcode(Depcode):
          Keyword arguments to pass to :func:`openmc.model.deplete()`.
      chain_file_path : str
          Path to depletion chain file
+    persistent : bool, optional
+        Run depletion steps in-process in an :class:`OpenMCDepletionSession`
+        that keeps the model, depletion operator and :mod:`openmc.lib` alive
+        across steps, instead of running the depletion script as a
+        subprocess.
+    composition_exchange : str, optional
+        How reprocessed compositions are passed to the depletion script.
+
+        'xml' - The runtime material file is rewritten.
+
+        'npz' - Atom densities of the depletable materials are written to a
+        NumPy ``.npz`` file that the depletion script applies to the
+        materials it loaded; the runtime material file keeps the
+        compositions of the last model load.
+    tally_cadence : dict of str to int or str, optional
+        How often the tallies of each neutronics parameter are added to the
+        transport runs. Keys are ``'breeding_ratio'``, ``'delayed_neutrons'``
+        (:math:`\\beta` and :math:`\\lambda` of the delayed neutron
+        precursors) and ``'power'`` (fission energy and heating). Values are
+        a number of depletion steps `N`, to tally the quantity at every
+        `N`-th step starting from the first, or ``'boc_eoc'``, to tally it at
+        the first and last depletion steps only. Quantities not given are
+        tallied at every step. Quantities that are not tallied in a step are
+        reported as NaN.
+    transport_interval : int, optional
+        Maximum number of depletion steps between two transport solves.
+        Depletion steps in between are depleted with the one-group
+        microscopic cross sections of the last transport solve. Transport is
+        run at every step if neither `transport_interval` nor
+        `composition_change_threshold` is given.
+    composition_change_threshold : float, optional
+        Relative change of the nuclide mass densities of any depletable
+        material, since the beginning of the last transport step, above
+        which a transport solve is run.
 
     Attributes
     ----------
@@ -70,6 +188,13 @@ class OpenMCDepcode(Depcode):
         Number of active cycles.
     inactive_cycles : int
         Number of inactive cycles.
+    tallied_quantities : frozenset of str
+        Neutronics parameters tallied in the current depletion step.
+    transport_step : bool
+        Whether the current depletion step runs transport solves.
+    runtime_microxsfile : str
+        Path to the reaction rates per atom of the last transport solve,
+        used to deplete the steps without transport.
 
     """
 
@@ -79,7 +204,12 @@ class OpenMCDepcode(Depcode):
                  template_input_file_path,
                  geo_file_paths,
                  depletion_settings,
-                 chain_file_path
+                 chain_file_path,
+                 persistent=False,
+                 composition_exchange='xml',
+                 tally_cadence=None,
+                 transport_interval=None,
+                 composition_change_threshold=None
                  ):
         """Initialize a OpenMCDepcode object.
 
@@ -93,6 +223,43 @@ class OpenMCDepcode(Depcode):
 
         self.depletion_settings = depletion_settings
         self.chain_file_path = chain_file_path
+        self.persistent = persistent
+        if composition_exchange not in ('xml', 'npz'):
+            raise ValueError(
+                f'Unknown composition exchange: {composition_exchange}')
+        self.composition_exchange = composition_exchange
+        self.runtime_compositionfile = \
+            str((output_path / 'compositions.npz').resolve())
+        self._session = None
+        self._step_output = None
+        # In-memory model of the run and the runtime files it must rewrite
+        self._materials = None
+        self._material_names = None
+        self._geometry = None
+        self._settings = None
+        self._stale_files = set()
+        self._stale_tallies = True
+        self.tally_cadence = dict.fromkeys(_TALLIED_QUANTITIES, 1)
+        for quantity, cadence in (tally_cadence or {}).items():
+            if quantity not in self.tally_cadence:
+                raise ValueError(f'Unknown tallied quantity: {quantity}')
+            if cadence != 'boc_eoc' and \
+                    not (isinstance(cadence, int) and cadence >= 1):
+                raise ValueError(
+                    f'Invalid tally cadence for {quantity}: {cadence}')
+            self.tally_cadence[quantity] = cadence
+        self.tallied_quantities = frozenset(_TALLIED_QUANTITIES)
+        self._tally_ids = {}
+        self.transport_interval = transport_interval
+        self.composition_change_threshold = composition_change_threshold
+        self.runtime_microxsfile = \
+            str((output_path / 'microxs.npz').resolve())
+        self.transport_step = True
+        self._depletion_step = None
+        self._last_transport_step = None
+        # Nuclide mass densities at the beginning of the last transport step
+        self._reference_densities = None
+        self._composition_change = 0.0
 
         super().__init__("openmc",
                          output_path,
@@ -106,9 +273,7 @@ class OpenMCDepcode(Depcode):
 
         self._check_for_material_names(self.template_input_file_path['materials'])
 
-        self._OUTPUTFILE_NAMES = ('depletion_results.h5', 'openmc_simulation_n0.h5',
-                                 'openmc_simulation_n1.h5', 'summary.h5',
-                                 'tallies.out')
+        self._OUTPUTFILE_NAMES = _OUTPUTFILE_NAMES
         self._INPUTFILE_NAMES = ('materials.xml', 'geometry.xml', 'tallies.xml')
 
     def _check_for_material_names(self, filename):
@@ -134,10 +299,9 @@ class OpenMCDepcode(Depcode):
         """Reads OpenMC's depletion step metadata and stores it in the
         :class:`OpenMCDepcode` object's :attr:`step_metadata` attribute.
         """
-        sp0 = openmc.StatePoint(self.output_path / 'openmc_simulation_n0.h5')
+        sp0 = self._get_step_output().get_statepoint(0)
 
         depcode_name, depcode_ver = self.codename, ".".join(list(map(str,sp0.version)))
-        sp0.close()
 
         self.depcode_metadata['depcode_name'] = depcode_name
         self.depcode_metadata['depcode_version'] = depcode_ver
@@ -158,18 +322,19 @@ class OpenMCDepcode(Depcode):
         """Reads OpenMC's depletion step metadata and stores it in the
         :class:`OpenMCDepcode` object's :attr:`step_metadata` attribute.
         """
-        sp0 = openmc.StatePoint(self.output_path / 'openmc_simulation_n0.h5')
-        sp1 = openmc.StatePoint(self.output_path / 'openmc_simulation_n1.h5')
-        res = Results(self.output_path / 'depletion_results.h5')
+        step_output = self._get_step_output()
+        depletion = step_output.depletion
 
-        execution_time = sp0.runtime['simulation'] + sp1.runtime['simulation'] + res[0].proc_time + res[1].proc_time
-        sp0.close()
-        sp1.close()
+        execution_time = depletion.proc_time[0] + depletion.proc_time[1]
+        if step_output.has_transport:
+            execution_time += \
+                step_output.get_statepoint(0).runtime['simulation'] \
+                + step_output.get_statepoint(1).runtime['simulation']
 
         self.step_metadata['OMP_threads'] = -1
         self.step_metadata['MPI_tasks'] = -1
         self.step_metadata['memory_optimization_mode'] = -1
-        self.step_metadata['depletion_timestep_size'] = res[1].time[0]
+        self.step_metadata['depletion_timestep_size'] = depletion.time[1, 0]
         self.step_metadata['step_execution_time'] = execution_time
         self.step_metadata['step_memory_usage'] = -1
 
@@ -178,80 +343,93 @@ class OpenMCDepcode(Depcode):
         in :class:`OpenMCDepcode` object's :attr:`neutronics_parameters`
         attribute.
         """
-        sp0 = openmc.StatePoint(self.output_path / 'openmc_simulation_n0.h5')
-        sp1 = openmc.StatePoint(self.output_path / 'openmc_simulation_n1.h5')
-        res = Results(self.output_path / 'depletion_results.h5')
-
-        self.neutronics_parameters['keff_bds'] = res[0].k[0]
-        self.neutronics_parameters['keff_eds'] = res[1].k[0]
-        self.neutronics_parameters['breeding_ratio_bds'] = self._calculate_breeding_ratio(sp0)
-        self.neutronics_parameters['breeding_ratio_eds'] = self._calculate_breeding_ratio(sp1)
-        self.neutronics_parameters['burn_days'] = res[1].time[0] / _SECONDS_PER_DAY
-        self.neutronics_parameters['power_level'] = res[1].source_rate
-        self.neutronics_parameters['beta_eff_bds'] = self._calculate_delayed_quantity(sp0, self._beta)
-        self.neutronics_parameters['beta_eff_eds'] = self._calculate_delayed_quantity(sp1, self._beta)
-        self.neutronics_parameters['delayed_neutrons_lambda_bds'] = \
-            self._calculate_delayed_quantity(sp0, self._delayed_lambda)
-        self.neutronics_parameters['delayed_neutrons_lambda_eds'] = \
-            self._calculate_delayed_quantity(sp1, self._delayed_lambda)
-        init_fission_mass, final_fission_mass = self._calculate_fission_masses(res)
+        step_output = self._get_step_output()
+        depletion = step_output.depletion
+
+        # Steps depleted with cached cross sections have no transport data
+        if step_output.has_transport:
+            tallied_quantities = self.tallied_quantities
+            self.neutronics_parameters['keff_bds'] = depletion.eigenvalues[0]
+            self.neutronics_parameters['keff_eds'] = depletion.eigenvalues[1]
+        else:
+            tallied_quantities = frozenset()
+            self.neutronics_parameters['keff_bds'] = np.full(2, np.nan)
+            self.neutronics_parameters['keff_eds'] = np.full(2, np.nan)
+        if 'breeding_ratio' in tallied_quantities:
+            self.neutronics_parameters['breeding_ratio_bds'] = \
+                self._calculate_breeding_ratio(step_output.get_tally(0, 'breeding_ratio_tally'))
+            self.neutronics_parameters['breeding_ratio_eds'] = \
+                self._calculate_breeding_ratio(step_output.get_tally(1, 'breeding_ratio_tally'))
+        else:
+            self.neutronics_parameters['breeding_ratio_bds'] = np.full(2, np.nan)
+            self.neutronics_parameters['breeding_ratio_eds'] = np.full(2, np.nan)
+        self.neutronics_parameters['burn_days'] = \
+            depletion.time[1, 0] / _SECONDS_PER_DAY
+        self.neutronics_parameters['power_level'] = depletion.source_rate[1]
+        if 'delayed_neutrons' in tallied_quantities:
+            sp0 = step_output.get_statepoint(0)
+            sp1 = step_output.get_statepoint(1)
+            self.neutronics_parameters['beta_eff_bds'] = self._calculate_delayed_quantity(sp0, self._beta)
+            self.neutronics_parameters['beta_eff_eds'] = self._calculate_delayed_quantity(sp1, self._beta)
+            self.neutronics_parameters['delayed_neutrons_lambda_bds'] = \
+                self._calculate_delayed_quantity(sp0, self._delayed_lambda)
+            self.neutronics_parameters['delayed_neutrons_lambda_eds'] = \
+                self._calculate_delayed_quantity(sp1, self._delayed_lambda)
+        else:
+            # Total and group-wise values
+            skipped = np.full((_N_DELAYED_GROUPS + 1, 2), np.nan)
+            for key in ('beta_eff_bds', 'beta_eff_eds',
+                        'delayed_neutrons_lambda_bds',
+                        'delayed_neutrons_lambda_eds'):
+                self.neutronics_parameters[key] = skipped.copy()
+        init_fission_mass, final_fission_mass = \
+            self._calculate_fission_masses(step_output)
         self.neutronics_parameters['fission_mass_bds'] = init_fission_mass
         self.neutronics_parameters['fission_mass_eds'] = final_fission_mass
-        del sp0, sp1
 
-    def _calculate_breeding_ratio(self, sp):
+    def _calculate_breeding_ratio(self, breeding_ratio_tally):
         """Fissile material produces / fissile material destroyed"""
-
-        breeding_ratio_tally = sp.get_tally(name='breeding_ratio_tally')
-        frame = breeding_ratio_tally.get_pandas_dataframe().set_index('score')
-        n_gamma_frame = frame.loc['(n,gamma)'].set_index('nuclide')
-        absorption_frame = frame.loc['absorption'].set_index('nuclide')
-
-        n_gamma_vals = self._get_values_with_uncertainties(n_gamma_frame)
-        absorption_vals = self._get_values_with_uncertainties(absorption_frame)
-
-        n_gamma_series = dict(zip(n_gamma_frame.index, n_gamma_vals))
-        absorption_series = dict(zip(absorption_frame.index, absorption_vals))
-
-        fissionable_production_rate = np.sum([n_gamma_series[nuc] for nuc in self._fertile_nucs])
-        fissionable_destruction_rate = np.sum([absorption_series[nuc] for nuc in self._fissile_nucs])
-
-        breeding_ratio = fissionable_production_rate / fissionable_destruction_rate
-
-        return np.array([breeding_ratio.n, breeding_ratio.s])
+        production, production_std = self._sum_tally_values(
+            breeding_ratio_tally, '(n,gamma)', sorted(self._fertile_nucs))
+        destruction, destruction_std = self._sum_tally_values(
+            breeding_ratio_tally, 'absorption', sorted(self._fissile_nucs))
+
+        breeding_ratio = production / destruction
+        # Error propagation for the ratio of independent quantities
+        breeding_ratio_std = np.abs(breeding_ratio) * np.sqrt(
+            (production_std / production) ** 2
+            + (destruction_std / destruction) ** 2)
+
+        return np.array([breeding_ratio, breeding_ratio_std])
+
+    def _sum_tally_values(self, tally, score, nuclides):
+        """Sum of the mean values of `score` over `nuclides`, and its
+        standard deviation"""
+        mean = tally.get_values(scores=[score], nuclides=nuclides,
+                                value='mean')
+        std_dev = tally.get_values(scores=[score], nuclides=nuclides,
+                                   value='std_dev')
+        return np.sum(mean), np.sqrt(np.sum(std_dev ** 2))
 
     def _calculate_delayed_quantity(self, sp, mgxs):
         # group-wise delayed quantity
         mgxs.load_from_statepoint(sp)
-        frame = mgxs.get_pandas_dataframe()
-        vals = self._get_values_with_uncertainties(frame)
-        tot = vals.sum()
-        vals = [[v.n, v.s] for v in vals]
-        tot = np.array([[tot.n, tot.s]])
-
-        return np.concatenate([tot, vals])
+        mean = np.ravel(mgxs.get_xs(value='mean'))
+        std_dev = np.ravel(mgxs.get_xs(value='std_dev'))
+        tot = np.array([[mean.sum(), np.sqrt(np.sum(std_dev ** 2))]])
 
-    def _get_values_with_uncertainties(self, frame):
-        vals = np.array(list(zip(frame['mean'], frame['std. dev.'])))
-        return unumpy.uarray(frame['mean'], frame['std. dev.'])
+        return np.concatenate([tot, np.column_stack([mean, std_dev])])
 
-    def _calculate_fission_masses(self, res):
+    def _calculate_fission_masses(self, step_output):
         """Calculate the fission mass [kg] before and after material depletion"""
-        init_fission_mass = 0
-        final_fission_mass = 0
-        init_mats = res.export_to_materials(0)
-        final_mats = res.export_to_materials(1)
-        for init_mat, final_mat in zip(init_mats, final_mats):
-            if init_mat.depletable:
-                init_fission_mass += init_mat.fissionable_mass
-            if final_mat.depletable:
-                final_fission_mass += final_mat.fissionable_mass
+        depletion = step_output.depletion
+        init_fission_mass = depletion.get_fissionable_masses(0).sum()
+        final_fission_mass = depletion.get_fissionable_masses(1).sum()
 
         # Convert g to kg
         init_fission_mass *= _KG_PER_G
         final_fission_mass *= _KG_PER_G
 
-        del init_mat, final_mat, init_mats, final_mats
         return init_fission_mass, final_fission_mass
 
     def read_depleted_materials(self, read_at_end=False):
@@ -283,44 +461,71 @@ class OpenMCDepcode(Depcode):
         else:
             moment = 0
 
-        results_file = Path(self.output_path / 'depletion_results.h5')
-        depleted_materials = {}
-        results = Results(results_file)
-
-        # Get decay and transport nuclides
-        nucs = list(results[-1].index_nuc.keys())
-        depleted_openmc_materials = results.export_to_materials(moment, nuc_with_data=nucs)
+        depletion = self._get_step_output().depletion
+        material_names = self._get_material_names()
+        masses = depletion.get_masses(moment)
         if read_at_end:
-            _nucs = list(results[0].index_nuc.keys())
-            starting_openmc_materials = results.export_to_materials(0, nuc_with_data=_nucs)
-        else:
-            # placeholder for starting materials
-            starting_openmc_materials = np.zeros(len(depleted_openmc_materials))
-
-        openmc_materials = zip(starting_openmc_materials, depleted_openmc_materials)
+            heavy_metal_masses = \
+                depletion.get_fissionable_masses(0) * _KG_PER_G
+            power = depletion.source_rate[1] * _MW_PER_W
+            days = depletion.time[1, 1] / _SECONDS_PER_DAY
 
         depleted_materials = {}
-        for starting_material, depleted_material in openmc_materials:
-            if depleted_material.depletable:
-                volume = depleted_material.volume
-                density = depleted_material.get_mass_density()
-                comp = self._create_mass_percents_dictionary(depleted_material)
-                name = depleted_material.name
-                if read_at_end:
-                    sp0 = openmc.StatePoint(self.output_path / 'openmc_simulation_n0.h5')
-                    heavy_metal_mass = starting_material.fissionable_mass * _KG_PER_G
-                    power = results[1].source_rate * _MW_PER_W
-                    days = results[1].time[1] / _SECONDS_PER_DAY
-                    burnup = power * days / heavy_metal_mass
-                else:
-                    burnup = 0
-                depleted_materials[name] = Materialflow(comp=comp,
-                                                        density=density,
-                                                        volume=volume,
-                                                        burnup=burnup)
-        del openmc_materials, depleted_openmc_materials, starting_openmc_materials
+        for mat_idx, mat_id in enumerate(depletion.material_ids):
+            mat_masses = masses[mat_idx]
+            present = np.nonzero(mat_masses > 0.0)[0]
+            total_mass = mat_masses[present].sum()
+            volume = depletion.volumes[mat_idx]
+            comp = dict(zip([depletion.nuclides[i] for i in present],
+                            mat_masses[present] / total_mass))
+            if read_at_end:
+                burnup = power * days / heavy_metal_masses[mat_idx]
+            else:
+                burnup = 0
+            depleted_materials[material_names[mat_id]] = Materialflow(
+                comp=comp,
+                density=total_mass / volume,
+                volume=volume,
+                burnup=burnup)
         return depleted_materials
 
+    def _get_material_names(self):
+        """Dictionary mapping material IDs to names in the in-memory model,
+        built once per model load."""
+        if self._material_names is None:
+            if self._materials is None:
+                openmc.reset_auto_ids()
+                self._materials = \
+                    openmc.Materials.from_xml(self.runtime_matfile)
+            self._material_names = {str(material.id): material.name
+                                    for material in self._materials}
+        return self._material_names
+
+    def _get_step_output(self):
+        """Get the output files of the current depletion step.
+
+        The files are opened once per depletion step and shared by
+        :meth:`read_depleted_materials`, :meth:`read_depcode_metadata`,
+        :meth:`read_step_metadata` and :meth:`read_neutronics_parameters`.
+        They are opened again if they changed on disk.
+
+        Returns
+        -------
+        step_output : OpenMCStepOutput
+
+        """
+        key = OpenMCStepOutput.get_key(self.output_path)
+        if self._step_output is None or self._step_output.key != key:
+            self.close_step_output()
+            self._step_output = OpenMCStepOutput(self.output_path)
+        return self._step_output
+
+    def close_step_output(self):
+        """Close the output files of the current depletion step."""
+        if self._step_output is not None:
+            self._step_output.close()
+            self._step_output = None
+
     def _create_mass_percents_dictionary(self, mat, percent_type='ao'):
         """Creates a dicitonary with nuclide codes
         in zzaaam formate as keys, and material composition
@@ -339,11 +544,10 @@ class OpenMCDepcode(Depcode):
         """
         percents = np.zeros(len(mat.nuclides))
         nucs = []
-        at_mass = np.zeros(len(mat.nuclides))
         for i, (nuc, pt, tp) in enumerate(mat.nuclides):
             nucs.append(nuc)
             percents[i] = pt
-            at_mass[i] = atomic_mass(nuc)
+        at_mass = atomic_masses(names_to_zams(nucs))
 
         if percent_type == 'ao':
             mass_percents = percents*at_mass / np.dot(percents, at_mass)
@@ -366,11 +570,7 @@ class OpenMCDepcode(Depcode):
         return nuc
 
     def name_to_nuclide_code(self, nucname):
-        z, a, m = openmc.data.zam(nucname)
-        code = z * 1000 + a
-        if m != 0:
-            code += 300 + 100 * m
-        return code
+        return int(get_zaid_table('mcnp').names_to_codes([nucname])[0])
 
     def run_depletion_step(self, mpi_args=None, threads=None):
         """Runs a depletion step in OpenMC as a subprocess
@@ -395,22 +595,179 @@ class OpenMCDepcode(Depcode):
                 str(self.runtime_inputfile['tallies']),
                 '--directory',
                 str(self.output_path)]
+        if self.composition_exchange == 'npz' \
+                and os.path.exists(self.runtime_compositionfile):
+            args += ['--compositions', self.runtime_compositionfile]
+        if not self.transport_step:
+            args += ['--microxs', self.runtime_microxsfile]
         if mpi_args is not None:
             args = mpi_args + args
 
-        super().run_depletion_step(mpi_args, args)
+        if self.persistent:
+            self._run_session_step(threads)
+        else:
+            super().run_depletion_step(mpi_args, args)
+
+        if self.transport_step and self._reuses_microxs():
+            self._write_microxs()
+            self._last_transport_step = self._depletion_step
+
+    def _reuses_microxs(self):
+        """Whether depletion steps may reuse the cross sections of the last
+        transport solve."""
+        return self.transport_interval is not None \
+            or self.composition_change_threshold is not None
+
+    def _needs_transport(self, step_idx):
+        """Whether depletion step `step_idx` must run transport solves.
+
+        Parameters
+        ----------
+        step_idx : int
+            Current depletion step.
+
+        Returns
+        -------
+        bool
+
+        """
+        if not self._reuses_microxs() or self._last_transport_step is None \
+                or not os.path.exists(self.runtime_microxsfile):
+            return True
+        if self.transport_interval is not None and \
+                step_idx - self._last_transport_step >= self.transport_interval:
+            return True
+        return self.composition_change_threshold is not None and \
+            self._composition_change > self.composition_change_threshold
+
+    def _write_microxs(self):
+        """Write the reaction rates per atom at the end of the transport
+        step, used as one-group microscopic cross sections of the depletion
+        steps without transport, and keep the nuclide mass densities at the
+        beginning of the step to measure composition changes."""
+        step_output = self._get_step_output()
+        depletion = step_output.depletion
+        depletion.write_reaction_rates(self.runtime_microxsfile,
+                                       len(depletion.time) - 1)
+
+        material_names = self._get_material_names()
+        # g/cm^3
+        densities = depletion.get_masses(0) / depletion.volumes[:, None]
+        self._reference_densities = (
+            {nuc: i for i, nuc in enumerate(depletion.nuclides)},
+            {material_names[mat_id]: row for mat_id, row
+             in zip(depletion.material_ids, densities)})
+        self._composition_change = 0.0
+
+    def _get_composition_change(self, mats):
+        """Largest relative change of the nuclide mass densities of a
+        depletable material since the beginning of the last transport step.
+
+        Parameters
+        ----------
+        mats : dict of str to Materialflow
+            Reprocessed materials.
+
+        Returns
+        -------
+        float
+
+        """
+        if self._reference_densities is None:
+            return 0.0
+        nuc_index, reference = self._reference_densities
+        change = 0.0
+        for name, mat in mats.items():
+            ref_densities = reference.get(name)
+            if ref_densities is None:
+                continue
+            densities = np.zeros_like(ref_densities)
+            # Nuclides the depletion chain does not hold
+            missing = 0.0
+            for nuc, mass_fraction in mat.comp.items():
+                idx = nuc_index.get(nuc)
+                if idx is None:
+                    missing += mass_fraction * mat.density
+                else:
+                    densities[idx] = mass_fraction * mat.density
+            difference = np.abs(densities - ref_densities).sum() + missing
+            change = max(change, difference / ref_densities.sum())
+        return change
+
+    def _run_session_step(self, threads=None):
+        """Runs a depletion step in the in-process depletion session, which
+        is created on the first call.
+
+        Parameters
+        ----------
+        threads : int
+            Threads to use for shared-memory parallelism
+
+        """
+        print('Running %s' % (self.codename))
+        settings = self.depletion_settings
+        if not self.transport_step:
+            self._session.run_independent_step(
+                self.runtime_microxsfile,
+                settings['timesteps'],
+                method=settings.get('method', 'predictor'),
+                final_step=settings.get('final_step', True),
+                **settings['integrator_kwargs'])
+            print(f'Finished {self.codename.upper()} Run')
+            return
+        if self._session is None:
+            # The runtime material file does not hold the reprocessed
+            # compositions of the 'npz' exchange
+            if self.composition_exchange == 'npz' \
+                    and os.path.exists(self.runtime_compositionfile):
+                compositions_path = self.runtime_compositionfile
+            else:
+                compositions_path = None
+            self._session = OpenMCDepletionSession(
+                self.runtime_matfile,
+                self.runtime_inputfile['geometry'],
+                self.runtime_inputfile['settings'],
+                self.runtime_inputfile['tallies'],
+                self.output_path,
+                settings['operator_kwargs'],
+                threads=threads,
+                compositions_path=compositions_path)
+        tally_ids = [tally_id for quantity in _TALLIED_QUANTITIES
+                     for tally_id in self._tally_ids.get(quantity, [])]
+        active_ids = [tally_id for quantity in self.tallied_quantities
+                      for tally_id in self._tally_ids.get(quantity, [])]
+        self._session.set_active_tallies(tally_ids, active_ids)
+        self._session.run_step(settings['timesteps'],
+                               method=settings.get('method', 'predictor'),
+                               final_step=settings.get('final_step', True),
+                               output=settings.get('output', True),
+                               **settings['integrator_kwargs'])
+        print(f'Finished {self.codename.upper()} Run')
+
+    def close(self):
+        """Finalize the in-process depletion session, if any."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def switch_to_next_geometry(self):
         """Switches the geometry file for the OpenMC depletion simulation to
         the next geometry file in `geo_file_paths`.
         """
-        openmc.reset_auto_ids()
-        mats = openmc.Materials.from_xml(self.runtime_matfile)
-        next_geometry = openmc.Geometry.from_xml(
+        if self._geometry is None:
+            self._load_model(self.runtime_matfile,
+                             self.runtime_inputfile['geometry'],
+                             self.runtime_inputfile['settings'])
+        self._geometry = openmc.Geometry.from_xml(
             path=self.geo_file_paths.pop(0),
-            materials=mats)
-        next_geometry.export_to_xml(path=self.runtime_inputfile['geometry'])
-        del mats, next_geometry
+            materials=self._materials)
+        self._stale_files.add('geometry')
+        self._stale_tallies = True
+        self._export_model()
+        # The in-process session must rebuild the model with the new geometry
+        self.close()
+        # Cross sections of the old geometry cannot be reused
+        self._last_transport_step = None
 
     def write_runtime_input(self, reactor, depletion_step, restart):
         """Write OpenMC runtime input files for running depletion step.
@@ -427,33 +784,104 @@ class OpenMCDepcode(Depcode):
         """
 
         if depletion_step == 0 and not restart:
-            geo_file = self.geo_file_paths.pop(0)
-            openmc.reset_auto_ids()
-            materials = openmc.Materials.from_xml(
-                self.template_input_file_path['materials'])
-            geometry = openmc.Geometry.from_xml(
-                geo_file, materials=materials)
-            settings = openmc.Settings.from_xml(
-                self.template_input_file_path['settings'])
-
-        else:
-            openmc.reset_auto_ids()
-            materials = openmc.Materials.from_xml(self.runtime_matfile)
-            geometry = openmc.Geometry.from_xml(
-                self.runtime_inputfile['geometry'], materials=materials)
-            settings = openmc.Settings.from_xml(
-                self.runtime_inputfile['settings'])
-
+            self._load_model(self.template_input_file_path['materials'],
+                             self.geo_file_paths.pop(0),
+                             self.template_input_file_path['settings'])
+        elif self._geometry is None:
+            self._load_model(self.runtime_matfile,
+                             self.runtime_inputfile['geometry'],
+                             self.runtime_inputfile['settings'])
+
+        settings = self._settings
         self.npop = settings.particles
         self.inactive_cycles = settings.inactive
         self.active_cycles = settings.batches - self.inactive_cycles
 
-        materials.export_to_xml(self.runtime_matfile)
-        geometry.export_to_xml(self.runtime_inputfile['geometry'])
-        settings.export_to_xml(self.runtime_inputfile['settings'])
+        self._export_model()
         self.write_depletion_settings(reactor, depletion_step)
-        self.write_saltproc_openmc_tallies(materials, geometry, _DELAYED_ENERGY_BOUNDS, _N_DELAYED_GROUPS)
-        del materials, geometry, settings
+        tallied_quantities = self._get_tallied_quantities(
+            depletion_step, len(reactor.depletion_timesteps))
+        # The in-process session keeps every tally and only activates the
+        # ones of the current step
+        if self.persistent:
+            quantities = frozenset(_TALLIED_QUANTITIES)
+        else:
+            quantities = tallied_quantities
+        if self._stale_tallies or 'tallies' not in self.runtime_inputfile \
+                or quantities != frozenset(self._tally_ids):
+            self.write_saltproc_openmc_tallies(self._materials,
+                                               self._geometry,
+                                               _DELAYED_ENERGY_BOUNDS,
+                                               _N_DELAYED_GROUPS,
+                                               quantities)
+            self._stale_tallies = False
+        self._depletion_step = depletion_step
+        self.transport_step = self._needs_transport(depletion_step)
+        if self.transport_step:
+            self.tallied_quantities = tallied_quantities
+            self._OUTPUTFILE_NAMES = _OUTPUTFILE_NAMES
+        else:
+            self.tallied_quantities = frozenset()
+            self._OUTPUTFILE_NAMES = _INDEPENDENT_OUTPUTFILE_NAMES
+
+    def _get_tallied_quantities(self, step_idx, n_steps):
+        """Neutronics parameters to tally at depletion step `step_idx` of
+        `n_steps`, according to :attr:`tally_cadence`.
+
+        Parameters
+        ----------
+        step_idx : int
+            Current depletion step.
+        n_steps : int
+            Number of depletion steps.
+
+        Returns
+        -------
+        frozenset of str
+
+        """
+        quantities = []
+        for quantity, cadence in self.tally_cadence.items():
+            if cadence == 'boc_eoc':
+                tallied = step_idx in (0, n_steps - 1)
+            else:
+                tallied = step_idx % cadence == 0
+            if tallied:
+                quantities.append(quantity)
+        return frozenset(quantities)
+
+    def _load_model(self, materials_path, geometry_path, settings_path):
+        """Read the model kept in memory for the rest of the run.
+
+        Parameters
+        ----------
+        materials_path : str
+            Path to the OpenMC materials file.
+        geometry_path : str
+            Path to the OpenMC geometry file.
+        settings_path : str
+            Path to the OpenMC settings file.
+
+        """
+        openmc.reset_auto_ids()
+        self._materials = openmc.Materials.from_xml(materials_path)
+        self._material_names = None
+        self._geometry = openmc.Geometry.from_xml(geometry_path,
+                                                  materials=self._materials)
+        self._settings = openmc.Settings.from_xml(settings_path)
+        self._stale_files.update(('materials', 'geometry', 'settings'))
+        self._stale_tallies = True
+
+    def _export_model(self):
+        """Write the runtime files whose in-memory objects changed since
+        they were last written."""
+        if 'materials' in self._stale_files:
+            self._materials.export_to_xml(self.runtime_matfile)
+        if 'geometry' in self._stale_files:
+            self._geometry.export_to_xml(self.runtime_inputfile['geometry'])
+        if 'settings' in self._stale_files:
+            self._settings.export_to_xml(self.runtime_inputfile['settings'])
+        self._stale_files.clear()
 
     def write_depletion_settings(self, reactor, step_idx):
         """Write the depeletion settings for the ``openmc.deplete``
@@ -497,6 +925,13 @@ class OpenMCDepcode(Depcode):
             depletion_settings_json = json.dumps(self.depletion_settings, indent=4)
             f.write(depletion_settings_json)
 
+    def remove_runtime_exchange_files(self):
+        """Remove the composition and reaction rate files of a previous
+        run."""
+        for path in (self.runtime_compositionfile, self.runtime_microxsfile):
+            if os.path.exists(path):
+                os.remove(path)
+
     def update_depletable_materials(self, mats, dep_end_time):
         """Updates material file with reprocessed material compositions.
 
@@ -513,10 +948,19 @@ class OpenMCDepcode(Depcode):
             Current time at the end of the depletion step (d).
 
         """
-        openmc.reset_auto_ids()
-        runtime_materials = openmc.Materials.from_xml(self.runtime_matfile)
+        if self.composition_change_threshold is not None:
+            self._composition_change = self._get_composition_change(mats)
+        if self._session is not None:
+            self._session.update_materials(mats)
+        if self.composition_exchange == 'npz':
+            self._write_compositions(mats)
+            return
+
+        if self._materials is None:
+            openmc.reset_auto_ids()
+            self._materials = openmc.Materials.from_xml(self.runtime_matfile)
 
-        for material in runtime_materials:
+        for material in self._materials:
             # depletable materials only
             if material.name in mats.keys():
                 components = {}
@@ -529,12 +973,82 @@ class OpenMCDepcode(Depcode):
                     material.remove_element(element)
                 material.add_components(components, percent_type='wo')
 
-        runtime_materials.export_to_xml(path=self.runtime_matfile)
-        del runtime_materials
-        del material
+        self._stale_files.add('materials')
+        self._export_model()
+
+    def _write_compositions(self, mats):
+        """Write the atom densities of reprocessed materials to the
+        composition file read by the depletion script.
+
+        Parameters
+        ----------
+        mats : dict of str to Materialflow
+            Reprocessed materials.
+
+        """
+        material_ids = {name: int(mat_id) for mat_id, name
+                        in self._get_material_names().items()}
+        nuclides = list(dict.fromkeys(
+            nuc for mat in mats.values() for nuc, mass_fraction
+            in mat.comp.items() if mass_fraction != 0.0))
+        nuc_index = {nuc: i for i, nuc in enumerate(nuclides)}
+        masses = atomic_masses(names_to_zams(nuclides))
+        atom_densities = np.zeros((len(mats), len(nuclides)))
+        for row, mat in zip(atom_densities, mats.values()):
+            idx = [nuc_index[nuc] for nuc in mat.comp if nuc in nuc_index]
+            mass_fractions = np.array([mat.comp[nuclides[i]] for i in idx])
+            # atom/b-cm
+            row[idx] = mass_fractions * mat.density * AVOGADRO \
+                / masses[idx] * 1e-24
+
+        tmp_file = self.runtime_compositionfile + '.tmp.npz'
+        np.savez(tmp_file,
+                 material_ids=np.array([material_ids[name] for name in mats]),
+                 nuclides=np.array(nuclides, dtype=str),
+                 atom_densities=atom_densities,
+                 volumes=np.array([mat.volume for mat in mats.values()]))
+        os.replace(tmp_file, self.runtime_compositionfile)
+
+    def preserve_simulation_files(self, step_idx):
+        """Move simulation input and output files
+        to unique a directory
+
+        Parameters
+        ----------
+        step_idx : int
+
+        """
+        super().preserve_simulation_files(step_idx)
+        for path in (self.runtime_compositionfile, self.runtime_microxsfile):
+            if os.path.exists(path):
+                shutil.copy2(path, self.output_path / f'step_{step_idx}_data')
+
+    def rebuild_simulation_files(self, step_idx):
+        """Move simulation input and output files
+        from unique directory to runtime directory
 
+        Parameters
+        ----------
+        step_idx : int
 
-    def write_saltproc_openmc_tallies(self, materials, geometry, energy_bounds, n_delayed_groups):
+        """
+        step_results_dir = self.output_path / f'step_{step_idx}_data'
+        if (step_results_dir / _OUTPUTFILE_NAMES[1]).exists():
+            self._OUTPUTFILE_NAMES = _OUTPUTFILE_NAMES
+        else:
+            self._OUTPUTFILE_NAMES = _INDEPENDENT_OUTPUTFILE_NAMES
+            # Transport output of an earlier rebuilt step
+            for fname in _OUTPUTFILE_NAMES[1:]:
+                (self.output_path / fname).unlink(missing_ok=True)
+        super().rebuild_simulation_files(step_idx)
+        for path in (self.runtime_compositionfile, self.runtime_microxsfile):
+            step_file = step_results_dir / Path(path).name
+            if step_file.exists():
+                shutil.copy2(step_file, path)
+
+
+    def write_saltproc_openmc_tallies(self, materials, geometry, energy_bounds, n_delayed_groups,
+                                      quantities=_TALLIED_QUANTITIES):
         """
         Write tallies for calculating burnup and delayed neutron
         parameters.
@@ -553,60 +1067,62 @@ class OpenMCDepcode(Depcode):
             Number of delayed groups for calculating :math:`\\beta`, the delayed
             neutron fraction, and :math:`\\lambda`, the decay rate for delayed
             neutron precursors.
+        quantities : iterable of str, optional
+            Neutronics parameters to write tallies for (``'breeding_ratio'``,
+            ``'delayed_neutrons'``, ``'power'``).
 
         """
-
-        ff_nuclides = self._get_fissile_fertile_nuclides()
-        energy_groups = EnergyGroups(energy_bounds)
-        delayed_groups = np.arange(1, n_delayed_groups + 1, 1).tolist()
-
-        delayed_kwargs = {'domain': geometry.root_universe,
-                          'domain_type': 'universe',
-                          'energy_groups': energy_groups,
-                          'delayed_groups': delayed_groups}
-
-        delayed_lambda = DecayRate(**delayed_kwargs)
-        beta = Beta(**delayed_kwargs)
-
-        self._delayed_lambda = delayed_lambda
-        self._beta = beta
-
         tallies = openmc.Tallies()
-        tallies += list(delayed_lambda.tallies.values())
-        tallies += list(beta.tallies.values())
-
-        tally = openmc.Tally(name='breeding_ratio_tally')
-        tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
-        tally.scores = ['(n,gamma)', 'absorption']
-        tally.nuclides = ff_nuclides
-        tallies.append(tally)
-
-        tally = openmc.Tally(name='fission_energy')
-        tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
-        tally.scores = ['kappa-fission']
-        tallies.append(tally)
-
-        tally = openmc.Tally(name='heating')
-        tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
-        tally.scores = ['heating']
-        tallies.append(tally)
+        self._tally_ids = {}
+
+        if 'delayed_neutrons' in quantities:
+            energy_groups = EnergyGroups(energy_bounds)
+            delayed_groups = np.arange(1, n_delayed_groups + 1, 1).tolist()
+
+            delayed_kwargs = {'domain': geometry.root_universe,
+                              'domain_type': 'universe',
+                              'energy_groups': energy_groups,
+                              'delayed_groups': delayed_groups}
+
+            delayed_lambda = DecayRate(**delayed_kwargs)
+            beta = Beta(**delayed_kwargs)
+
+            self._delayed_lambda = delayed_lambda
+            self._beta = beta
+
+            delayed_tallies = list(delayed_lambda.tallies.values()) \
+                + list(beta.tallies.values())
+            tallies += delayed_tallies
+            self._tally_ids['delayed_neutrons'] = \
+                [tally.id for tally in delayed_tallies]
+
+        if 'breeding_ratio' in quantities:
+            tally = openmc.Tally(name='breeding_ratio_tally')
+            tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
+            tally.scores = ['(n,gamma)', 'absorption']
+            tally.nuclides = self._get_fissile_fertile_nuclides()
+            tallies.append(tally)
+            self._tally_ids['breeding_ratio'] = [tally.id]
+
+        if 'power' in quantities:
+            power_tallies = []
+            tally = openmc.Tally(name='fission_energy')
+            tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
+            tally.scores = ['kappa-fission']
+            power_tallies.append(tally)
+
+            tally = openmc.Tally(name='heating')
+            tally.filters = [openmc.UniverseFilter(geometry.root_universe)]
+            tally.scores = ['heating']
+            power_tallies.append(tally)
+            tallies += power_tallies
+            self._tally_ids['power'] = [tally.id for tally in power_tallies]
 
         self.runtime_inputfile['tallies'] = self.output_path / 'tallies.xml'
         tallies.export_to_xml(self.runtime_inputfile['tallies'])
 
     def _get_fissile_fertile_nuclides(self):
-        nuclides_with_data = set()
-        data_lib = DataLibrary.from_xml()
-        for library in data_lib.libraries:
-            if library['type'] != 'neutron':
-                continue
-            for name in library['materials']:
-                if name not in nuclides_with_data:
-                    nuclides_with_data.add(name)
-
-        chain = Chain.from_xml(self.chain_file_path)
-        burnable_nucs = [nuc.name for nuc in chain.nuclides
-                         if nuc.name in nuclides_with_data]
+        burnable_nucs = get_burnable_nuclides(self.chain_file_path)
 
         self._fissile_nucs = set([nuc for nuc in _FISSILE_NUCLIDES if nuc in burnable_nucs])
         self._fertile_nucs = set([nuc for nuc in _FERTILE_NUCLIDES if nuc in burnable_nucs])
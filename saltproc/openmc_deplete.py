@@ -1,9 +1,12 @@
 import argparse
 import json
+import os
 
 import openmc
 import openmc.deplete as od
 
+from saltproc import apply_compositions, independent_operator
+
 
 def parse_arguments():
     """Parses arguments from command line.
@@ -22,6 +25,11 @@ def parse_arguments():
         Directory to write the XML files to.
     depletion_settings : str
         Path to the OpenMCDepcode depletion_settings file
+    compositions : str
+        Path to the `.npz` file with reprocessed material compositions
+    microxs : str
+        Path to the `.npz` file with reaction rates per atom of an earlier
+        transport solve. The step is depleted without transport if given.
 
     """
     parser = argparse.ArgumentParser()
@@ -45,6 +53,15 @@ def parse_arguments():
                         type=str,
                         default=None,
                         help='path to output directory')
+    parser.add_argument('--compositions',
+                        type=str,
+                        default=None,
+                        help='path to reprocessed material compositions')
+    parser.add_argument('--microxs',
+                        type=str,
+                        default=None,
+                        help='path to reaction rates per atom used as '
+                        'one-group cross sections')
     args = parser.parse_args()
     return args
 
@@ -53,6 +70,8 @@ args = parse_arguments()
 
 # Initalize OpenMC objects
 materials = openmc.Materials.from_xml(path=args.materials)
+if args.compositions is not None:
+    apply_compositions(materials, args.compositions)
 geometry = openmc.Geometry.from_xml(path=args.geometry, materials=materials)
 settings = openmc.Settings.from_xml(args.settings)
 tallies = openmc.Tallies.from_xml(args.tallies)
@@ -73,6 +92,17 @@ if not(fission_q is None):
     depletion_settings['operator_kwargs']['fission_q'] = fission_q
 
 integrator_kwargs = depletion_settings.pop('integrator_kwargs')
-model.deplete(timesteps, **depletion_settings, **integrator_kwargs)
+if args.microxs is None:
+    model.deplete(timesteps, **depletion_settings, **integrator_kwargs)
+else:
+    operator = independent_operator(
+        {material.id: material for material in materials},
+        args.microxs,
+        depletion_settings['operator_kwargs'])
+    integrator_class = od.integrators.integrator_by_name[
+        depletion_settings.get('method', 'cecm')]
+    integrator = integrator_class(operator, timesteps, **integrator_kwargs)
+    os.chdir(args.directory)
+    integrator.integrate(depletion_settings.get('final_step', True))
 
 del materials, geometry, settings, tallies, model
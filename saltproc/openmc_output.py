@@ -0,0 +1,303 @@
+"""OpenMC output module"""
+import os
+from pathlib import Path
+
+import numpy as np
+import tables as tb
+import openmc
+from openmc.data import AVOGADRO
+
+from saltproc import atomic_masses, names_to_zams
+
+
+_STEP_OUTPUT_FILES = ('openmc_simulation_n0.h5',
+                      'openmc_simulation_n1.h5',
+                      'depletion_results.h5')
+
+
+class OpenMCDepletionArrays():
+    """Atom numbers of the depletable materials in an OpenMC
+    ``depletion_results.h5`` file, read as arrays.
+
+    Only the index of nuclides and materials, the times, source rates,
+    eigenvalues and processing times are read on creation. The atom numbers of one step are read as a
+    hyperslab of the ``/number`` dataset on first use and cached.
+
+    Parameters
+    ----------
+    path : str
+        Path to the depletion results file.
+
+    Attributes
+    ----------
+    nuclides : list of str
+        Nuclide names in atom number order.
+    zams : numpy.ndarray
+        ZAM codes (``Z * 10000 + A * 10 + m``) of `nuclides`.
+    atomic_masses : numpy.ndarray
+        Atomic masses [amu] of `nuclides`.
+    material_ids : list of str
+        Material IDs in atom number order.
+    volumes : numpy.ndarray
+        Volumes [cm^3] of the materials.
+    time : numpy.ndarray
+        Start and end time [s] of each step.
+    source_rate : numpy.ndarray
+        Source rate [W] of each step.
+    eigenvalues : numpy.ndarray
+        Multiplication factor and its uncertainty at each step.
+    proc_time : numpy.ndarray
+        Time [s] spent depleting each step, or NaN if it was not recorded.
+    reaction_nuclides : list of str
+        Nuclide names in reaction rate order.
+    reactions : list of str
+        Reaction names in reaction rate order.
+
+    """
+
+    def __init__(self, path):
+        """Initializes the OpenMCDepletionArrays object.
+
+        """
+        self.path = str(path)
+        with tb.open_file(self.path, mode='r') as f:
+            nuclides = {}
+            reaction_nuclides = {}
+            for group in f.get_node('/nuclides')._f_iter_nodes():
+                if 'atom number index' in group._v_attrs:
+                    nuclides[group._v_name] = \
+                        group._v_attrs['atom number index']
+                if 'reaction rate index' in group._v_attrs:
+                    reaction_nuclides[group._v_name] = \
+                        group._v_attrs['reaction rate index']
+            reactions = {group._v_name: group._v_attrs['index']
+                         for group in f.get_node('/reactions')._f_iter_nodes()}
+            materials = {group._v_name: (group._v_attrs['index'],
+                                         group._v_attrs['volume'])
+                         for group in f.get_node('/materials')._f_iter_nodes()}
+            self.time = f.root.time[:]
+            self.source_rate = f.root.source_rate[:, 0]
+            self.eigenvalues = f.root.eigenvalues[:, 0]
+            self.proc_time = np.full(len(self.time), np.nan)
+            if '/depletion time' in f:
+                proc_time = f.get_node('/depletion time')[:len(self.time)]
+                self.proc_time[:len(proc_time)] = proc_time
+        self.nuclides = sorted(nuclides, key=nuclides.get)
+        self.reaction_nuclides = sorted(reaction_nuclides,
+                                        key=reaction_nuclides.get)
+        self.reactions = sorted(reactions, key=reactions.get)
+        self.material_ids = sorted(materials, key=lambda m: materials[m][0])
+        self.volumes = np.array([materials[m][1] for m in self.material_ids],
+                                dtype=np.float64)
+        self.zams = names_to_zams(self.nuclides)
+        self.atomic_masses = atomic_masses(self.zams)
+        self._atoms = {}
+
+    def get_atoms(self, step):
+        """Get the atom numbers at the beginning of `step`.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step.
+
+        Returns
+        -------
+        atoms : numpy.ndarray
+            2D array of atom numbers, one row per material.
+
+        """
+        if step not in self._atoms:
+            with tb.open_file(self.path, mode='r') as f:
+                self._atoms[step] = f.root.number[step, 0]
+        return self._atoms[step]
+
+    def get_reaction_rates(self, step):
+        """Get the reaction rates per atom at the beginning of `step`.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step.
+
+        Returns
+        -------
+        rates : numpy.ndarray
+            3D array of reaction rates [1/s] indexed by material,
+            :attr:`reaction_nuclides` and :attr:`reactions`.
+
+        """
+        with tb.open_file(self.path, mode='r') as f:
+            return f.get_node('/reaction rates')[step, 0]
+
+    def write_reaction_rates(self, path, step):
+        """Write the reaction rates per atom and the multiplication factor
+        at the beginning of `step` to a ``.npz`` file read by
+        :func:`~saltproc.independent_operator`.
+
+        Parameters
+        ----------
+        path : str
+            Path to the ``.npz`` file.
+        step : int
+            Index of the step.
+
+        """
+        tmp_file = str(path) + '.tmp.npz'
+        np.savez(tmp_file,
+                 material_ids=np.array(self.material_ids, dtype=int),
+                 nuclides=np.array(self.reaction_nuclides, dtype=str),
+                 reactions=np.array(self.reactions, dtype=str),
+                 rates=self.get_reaction_rates(step),
+                 keff=self.eigenvalues[step])
+        os.replace(tmp_file, path)
+
+    def get_masses(self, step):
+        """Get the nuclide masses at the beginning of `step`.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step.
+
+        Returns
+        -------
+        masses : numpy.ndarray
+            2D array of masses [g], one row per material.
+
+        """
+        return self.get_atoms(step) * self.atomic_masses / AVOGADRO
+
+    def get_fissionable_masses(self, step):
+        """Get the mass of nuclides with Z >= 90 at the beginning of `step`.
+
+        Parameters
+        ----------
+        step : int
+            Index of the step.
+
+        Returns
+        -------
+        masses : numpy.ndarray
+            Fissionable mass [g] of each material.
+
+        """
+        return self.get_masses(step)[:, self.zams >= 900000].sum(axis=1)
+
+
+class OpenMCStepOutput():
+    """Output files of one OpenMC depletion step, each opened once.
+
+    The statepoints at the beginning and end of the step and the depletion
+    results are opened on first access and shared by all
+    :class:`~saltproc.OpenMCDepcode` readers. Tallies are cached.
+    :meth:`close` releases every open file.
+
+    Parameters
+    ----------
+    output_path : str
+        Directory holding the output files of the depletion step.
+
+    Attributes
+    ----------
+    key : tuple
+        Output directory, and modification time and size of each output
+        file when the object was created, used to detect a new depletion
+        step.
+
+    """
+
+    def __init__(self, output_path):
+        """Initializes the OpenMCStepOutput object.
+
+        """
+        self.output_path = Path(output_path)
+        self.key = self.get_key(output_path)
+        self._statepoints = {}
+        self._depletion = None
+        self._tallies = {}
+
+    @staticmethod
+    def get_key(output_path):
+        """Modification time and size of the output files in `output_path`.
+
+        Parameters
+        ----------
+        output_path : str
+            Directory holding the output files of the depletion step.
+
+        Returns
+        -------
+        key : tuple
+
+        """
+        key = [str(output_path)]
+        for fname in _STEP_OUTPUT_FILES:
+            try:
+                stat = os.stat(Path(output_path) / fname)
+                key.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def get_statepoint(self, moment):
+        """Get the statepoint at the beginning (``0``) or end (``1``) of the
+        depletion step.
+
+        Parameters
+        ----------
+        moment : int
+            ``0`` or ``1``.
+
+        Returns
+        -------
+        openmc.StatePoint
+
+        """
+        if moment not in self._statepoints:
+            self._statepoints[moment] = openmc.StatePoint(
+                self.output_path / _STEP_OUTPUT_FILES[moment])
+        return self._statepoints[moment]
+
+    @property
+    def has_transport(self):
+        """bool : Whether the step ran transport solves and wrote
+        statepoints."""
+        return (self.output_path / _STEP_OUTPUT_FILES[0]).exists()
+
+    @property
+    def depletion(self):
+        """OpenMCDepletionArrays : Atom number arrays of the depletion
+        results of the step."""
+        if self._depletion is None:
+            self._depletion = OpenMCDepletionArrays(
+                self.output_path / _STEP_OUTPUT_FILES[2])
+        return self._depletion
+
+    def get_tally(self, moment, name):
+        """Get a tally from the statepoint at `moment`.
+
+        Parameters
+        ----------
+        moment : int
+            ``0`` or ``1``.
+        name : str
+            Tally name.
+
+        Returns
+        -------
+        openmc.Tally
+
+        """
+        if (moment, name) not in self._tallies:
+            self._tallies[moment, name] = \
+                self.get_statepoint(moment).get_tally(name=name)
+        return self._tallies[moment, name]
+
+    def close(self):
+        """Close the statepoints and drop the cached data."""
+        for statepoint in self._statepoints.values():
+            statepoint.close()
+        self._statepoints = {}
+        self._depletion = None
+        self._tallies = {}
@@ -0,0 +1,350 @@
+"""OpenMC session module"""
+import json
+import os
+
+import numpy as np
+import openmc
+import openmc.deplete as od
+import openmc.lib
+from openmc.data import AVOGADRO
+
+from saltproc import atomic_masses, names_to_zams
+
+
+class OpenMCDepletionSession():
+    """In-process OpenMC depletion session kept alive across depletion steps.
+
+    The model is built from the runtime XML files and the depletion operator
+    is created once; :mod:`openmc.lib` stays initialized between steps, so
+    the depletion chain and nuclear data are loaded once per simulation and
+    the operator tallies are created once.
+    Reprocessed compositions are pushed into the operator's atom number
+    array before the next step.
+
+    Parameters
+    ----------
+    materials_path : str
+        Path to the OpenMC materials file.
+    geometry_path : str
+        Path to the OpenMC geometry file.
+    settings_path : str
+        Path to the OpenMC settings file.
+    tallies_path : str
+        Path to the OpenMC tallies file.
+    directory : str
+        Directory the depletion results are written to.
+    operator_kwargs : dict
+        Keyword arguments passed to :class:`openmc.deplete.CoupledOperator`.
+        ``fission_q`` may be a path to a JSON file of fission Q values.
+    threads : int, optional
+        Threads to use for shared-memory parallelism.
+    compositions_path : str, optional
+        Path to a composition file written by
+        :class:`~saltproc.OpenMCDepcode`, applied to the materials read from
+        `materials_path`.
+
+    Attributes
+    ----------
+    model : openmc.model.Model
+        Model of the depletion simulation.
+    operator : openmc.deplete.CoupledOperator
+        Depletion operator shared by all depletion steps.
+
+    """
+
+    def __init__(self,
+                 materials_path,
+                 geometry_path,
+                 settings_path,
+                 tallies_path,
+                 directory,
+                 operator_kwargs,
+                 threads=None,
+                 compositions_path=None):
+        """Initializes the OpenMCDepletionSession object.
+
+        """
+        self.directory = str(directory)
+        openmc.reset_auto_ids()
+        materials = openmc.Materials.from_xml(materials_path)
+        if compositions_path is not None:
+            apply_compositions(materials, compositions_path)
+        geometry = openmc.Geometry.from_xml(geometry_path,
+                                            materials=materials)
+        settings = openmc.Settings.from_xml(settings_path)
+        tallies = openmc.Tallies.from_xml(tallies_path)
+        self.model = openmc.model.Model(materials=materials,
+                                        geometry=geometry,
+                                        settings=settings,
+                                        tallies=tallies)
+
+        operator_kwargs = dict(operator_kwargs)
+        fission_q = operator_kwargs.get('fission_q')
+        if fission_q is not None:
+            with open(fission_q, 'r') as f:
+                operator_kwargs['fission_q'] = json.load(f)
+
+        with _working_directory(self.directory):
+            self.operator = _SessionOperator(self.model, **operator_kwargs)
+            # Keep openmc.lib initialized after each depletion step
+            self.operator.cleanup_when_done = False
+            if not openmc.lib.is_initialized:
+                # openmc.lib reads the model from the working directory
+                self.operator.export_model()
+                args = None if threads is None else ['-s', str(threads)]
+                openmc.lib.init(args=args)
+        self._material_index = {
+            material.name: self.operator.number.index_mat[str(material.id)]
+            for material in self.model.materials
+            if str(material.id) in self.operator.number.index_mat}
+        self._operator_kwargs = operator_kwargs
+
+    def run_step(self, timesteps, method='predictor', final_step=True,
+                 output=True, **integrator_kwargs):
+        """Deplete the materials over one SaltProc depletion step.
+
+        Parameters
+        ----------
+        timesteps : list of float
+            Depletion timesteps.
+        method : str, optional
+            Name of the integration method.
+        final_step : bool, optional
+            Run a transport solve at the end of the last timestep.
+        output : bool, optional
+            Show OpenMC output.
+        integrator_kwargs : dict
+            Keyword arguments for the integrator, such as ``power`` and
+            ``timestep_units``.
+
+        """
+        integrator_class = od.integrators.integrator_by_name[method]
+        integrator = integrator_class(self.operator,
+                                      timesteps,
+                                      **integrator_kwargs)
+        with _working_directory(self.directory):
+            with openmc.lib.quiet_dll(output):
+                integrator.integrate(final_step)
+
+    def run_independent_step(self, microxs_path, timesteps,
+                             method='predictor', final_step=True,
+                             **integrator_kwargs):
+        """Deplete the materials over one SaltProc depletion step with the
+        one-group cross sections of an earlier transport solve, without
+        transport.
+
+        Parameters
+        ----------
+        microxs_path : str
+            Path to the ``.npz`` file of reaction rates per atom written by
+            :class:`~saltproc.OpenMCDepcode`.
+        timesteps : list of float
+            Depletion timesteps.
+        method : str, optional
+            Name of the integration method.
+        final_step : bool, optional
+            Evaluate the reaction rates at the end of the last timestep.
+        integrator_kwargs : dict
+            Keyword arguments for the integrator, such as ``power`` and
+            ``timestep_units``.
+
+        """
+        number = self.operator.number
+        nuclides = sorted(number.index_nuc, key=number.index_nuc.get)
+        materials = {}
+        for material in self.model.materials:
+            mat_idx = number.index_mat.get(str(material.id))
+            if mat_idx is None:
+                continue
+            # atom/b-cm
+            atom_densities = number.number[mat_idx] \
+                / number.volume[mat_idx] * 1e-24
+            for nuc in material.get_nuclides():
+                material.remove_nuclide(nuc)
+            for idx in np.nonzero(atom_densities)[0]:
+                material.add_nuclide(nuclides[idx], atom_densities[idx], 'ao')
+            material.set_density('sum')
+            material.volume = number.volume[mat_idx]
+            materials[material.id] = material
+
+        operator = independent_operator(materials, microxs_path,
+                                        self._operator_kwargs)
+        integrator_class = od.integrators.integrator_by_name[method]
+        integrator = integrator_class(operator, timesteps, **integrator_kwargs)
+        with _working_directory(self.directory):
+            integrator.integrate(final_step)
+
+    def set_active_tallies(self, tally_ids, active_ids):
+        """Activate or deactivate tallies for the next depletion step.
+
+        Parameters
+        ----------
+        tally_ids : iterable of int
+            IDs of the tallies to activate or deactivate. Tallies of the
+            depletion operator must not be included.
+        active_ids : iterable of int
+            IDs of the tallies to activate.
+
+        """
+        active_ids = set(active_ids)
+        for tally_id in tally_ids:
+            openmc.lib.tallies[tally_id].active = tally_id in active_ids
+
+    def update_materials(self, mats):
+        """Set burnable material compositions and volumes.
+
+        Parameters
+        ----------
+        mats : dict of str to Materialflow
+            Reprocessed materials. Nuclides that are not in the depletion
+            chain are left out.
+
+        """
+        number = self.operator.number
+        for name, mat in mats.items():
+            mat_idx = self._material_index[name]
+            number.volume[mat_idx] = mat.volume
+            number.number[mat_idx, :] = 0.0
+            nucs = [nuc for nuc, mass_fraction in mat.comp.items()
+                    if nuc in number.index_nuc and mass_fraction != 0.0]
+            if not nucs:
+                continue
+            mass_fractions = np.array([mat.comp[nuc] for nuc in nucs])
+            # atom/cm^3
+            atom_densities = mass_fractions * mat.density * AVOGADRO \
+                / atomic_masses(names_to_zams(nucs))
+            for nuc, atom_density in zip(nucs, atom_densities):
+                number.set_atom_density(mat_idx, nuc, atom_density)
+
+    def close(self):
+        """Finalize :mod:`openmc.lib`."""
+        if openmc.lib.is_initialized:
+            openmc.lib.finalize()
+
+
+def apply_compositions(materials, path):
+    """Replaces the compositions and volumes of materials with those in a
+    composition file written by :class:`~saltproc.OpenMCDepcode`.
+
+    Parameters
+    ----------
+    materials : openmc.Materials
+        Materials of the model.
+    path : str
+        Path to the `.npz` file holding material IDs, nuclide names,
+        atom densities [atom/b-cm] and volumes [cm^3].
+
+    """
+    with np.load(path) as data:
+        nuclides = data['nuclides'].tolist()
+        compositions = zip(data['material_ids'].tolist(),
+                           data['atom_densities'],
+                           data['volumes'].tolist())
+        materials_by_id = {material.id: material for material in materials}
+        for mat_id, atom_densities, volume in compositions:
+            material = materials_by_id[mat_id]
+            for nuc in material.get_nuclides():
+                material.remove_nuclide(nuc)
+            for idx in np.nonzero(atom_densities)[0]:
+                material.add_nuclide(nuclides[idx], atom_densities[idx], 'ao')
+            material.set_density('sum')
+            material.volume = volume
+
+
+def independent_operator(materials, microxs_path, operator_kwargs):
+    """Create a transport-independent depletion operator from reaction
+    rates per atom written by
+    :meth:`~saltproc.OpenMCDepletionArrays.write_reaction_rates`.
+
+    The depletion results store reaction rates per atom :math:`r` [1/s],
+    already normalized to the power of the transport step. They are given
+    to :class:`openmc.deplete.MicroXS` in place of one-group cross sections
+    in barns, and the material volume :math:`V` [cm^3] in place of the flux
+    in n-cm/src. The operator computes reaction rates per atom as
+    :math:`\\sigma \\phi / V`, which gives back :math:`r` times a factor
+    common to all materials, nuclides and reactions. ``'fission-q'``
+    normalization then rescales the rates to the power of the depletion
+    step, so the factor cancels and the relative rates of the transport
+    solve are kept.
+
+    Parameters
+    ----------
+    materials : dict of int to openmc.Material
+        Depletable materials by ID.
+    microxs_path : str
+        Path to the ``.npz`` file of reaction rates per atom.
+    operator_kwargs : dict
+        Keyword arguments of the transport-coupled operator. The chain file,
+        fission Q values and chain reduction options are used.
+
+    Returns
+    -------
+    openmc.deplete.IndependentOperator
+
+    """
+    with np.load(microxs_path) as data:
+        material_ids = data['material_ids'].tolist()
+        nuclides = data['nuclides'].tolist()
+        reactions = data['reactions'].tolist()
+        rates = data['rates']
+        keff = data['keff']
+    materials = openmc.Materials([materials[mat_id]
+                                  for mat_id in material_ids])
+    micros = [od.MicroXS(mat_rates[:, :, np.newaxis], nuclides, reactions)
+              for mat_rates in rates]
+    fluxes = [np.array([material.volume]) for material in materials]
+    kwargs = {key: operator_kwargs[key]
+              for key in ('fission_q', 'reduce_chain', 'reduce_chain_level')
+              if operator_kwargs.get(key) is not None}
+    return od.IndependentOperator(materials,
+                                  fluxes,
+                                  micros,
+                                  chain_file=operator_kwargs['chain_file'],
+                                  keff=keff,
+                                  normalization_mode='fission-q',
+                                  **kwargs)
+
+
+class _SessionOperator(od.CoupledOperator):
+    """:class:`openmc.deplete.CoupledOperator` that creates its
+    :mod:`openmc.lib` tallies only once and can write its model files before
+    :mod:`openmc.lib` is initialized.
+
+    Each integration calls :meth:`initial_condition`, which creates a new set
+    of reaction rate (and, depending on the options, normalization and
+    fission yield) tallies. Later depletion steps of a session reuse the
+    tallies created for the first one.
+
+    """
+
+    _tallies_created = False
+
+    def export_model(self):
+        """Write the model files read by :func:`openmc.lib.init` to the
+        working directory, as :meth:`initial_condition` does."""
+        self.model.geometry.export_to_xml()
+        self.model.settings.export_to_xml()
+        if self.model.tallies:
+            self.model.tallies.export_to_xml()
+        self._generate_materials_xml()
+
+    def initial_condition(self):
+        if self._tallies_created:
+            return list(self.number.get_mat_slice(np.s_[:]))
+        initial_condition = super().initial_condition()
+        self._tallies_created = True
+        return initial_condition
+
+
+class _working_directory():
+    """Context manager changing the working directory."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._cwd = os.getcwd()
+        os.chdir(self.path)
+
+    def __exit__(self, *exc):
+        os.chdir(self._cwd)
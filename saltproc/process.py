@@ -1,10 +1,9 @@
 """Process module"""
 import re
 from copy import deepcopy
-from math import exp
 import numpy as np
 
-from saltproc import Materialflow
+from saltproc import Materialflow, CompactMaterialflow, compile_expression
 
 
 class Process():
@@ -37,24 +36,29 @@ class Process():
         """ Initializes the Process object.
 
         """
+        self._efficiency_vector_cache = None
         for dictionary in initial_data:
             for key in dictionary:
                 setattr(self, key, dictionary[key])
         for key in kwargs:
             setattr(self, key, kwargs[key])
 
-    def calculate_removal_efficiency(self, nuc_name):
+    def calculate_removal_efficiency(self, nuc_name, t=0.0):
         """Calculate the value of the removal efficiency for a given nuclide
         in this process.
 
         If the efficiency is a str describing efficiency as a
-        function (eps(x,m,t,P,L)), then construct the function and evaluate it.
-        Otherwise, it is a float and can be returned.
+        function (eps(x,m,t,P,L)), then evaluate its compiled form (see
+        :class:`saltproc.expression.EfficiencyExpression`) with the process
+        attributes and `t`. Otherwise, it is a float and can be returned.
 
         Parameters
         ----------
         nuc_name : str
             Name of target nuclide to be removed.
+        t : float
+            Simulation time at which to evaluate the efficiency. Available
+            as ``t`` in efficiency functions.
 
         Returns
         -------
@@ -64,13 +68,119 @@ class Process():
         """
         eps = self.efficiency[nuc_name]
         if isinstance(eps, str):
-            for attr, value in self.__dict__.items():
-                if attr in eps:
-                    eps = eps.replace(attr, "self." + str(attr))
+            return compile_expression(eps).evaluate(
+                self._expression_namespace(t))
+        return eps
+
+    def calculate_removal_efficiencies(self, elements, t=0.0):
+        """Calculate the removal efficiencies of several elements, at one or
+        several times, in a single vectorized evaluation per distinct
+        efficiency function.
+
+        Parameters
+        ----------
+        elements : array_like of str
+            Element names. Elements without an efficiency in this process
+            have zero efficiency.
+        t : float or array_like of float
+            Simulation time(s) at which to evaluate the efficiencies.
+
+        Returns
+        -------
+        efficiencies : numpy.ndarray
+            Array of shape ``np.shape(t) + (len(elements),)``.
+
+        """
+        elements = np.asarray(elements, dtype=str)
+        t = np.asarray(t, dtype=np.float64)
+        efficiencies = np.zeros(t.shape + elements.shape)
+        expressions = {}
+        for elem, eps in self.efficiency.items():
+            mask = elements == elem
+            if not mask.any():
+                continue
+            if isinstance(eps, str):
+                expressions.setdefault(eps, []).append(mask)
+            else:
+                efficiencies[..., mask] = \
+                    self.calculate_removal_efficiency(elem)
+        if expressions:
+            namespace = self._expression_namespace(t)
+            for eps, masks in expressions.items():
+                value = np.asarray(compile_expression(eps).evaluate(namespace),
+                                   dtype=np.float64)
+                if value.ndim > t.ndim:
+                    raise ValueError(f'Efficiency function {eps} must '
+                                     'evaluate to a scalar per time.')
+                value = np.broadcast_to(value, t.shape)[..., np.newaxis]
+                for mask in masks:
+                    efficiencies[..., mask] = value
+        return efficiencies
+
+    def _expression_namespace(self, t):
+        """Variables available to efficiency functions: the process
+        attributes and the time ``t``."""
+        namespace = dict(self.__dict__)
+        namespace['t'] = t
+        return namespace
+
+    @property
+    def time_dependent(self):
+        """bool : Whether any efficiency function depends on time ``t``."""
+        return any(isinstance(eps, str)
+                   and 't' in compile_expression(eps).variables
+                   for eps in self.efficiency.values())
+
+    def get_efficiency_vector(self, nuclide_index, t=0.0):
+        """Return the removal efficiency of every nuclide in `nuclide_index`
+        as a vector aligned to the index.
+
+        The vector is built once per index (and per time `t` for
+        time-dependent processes) and only extended for nuclides added to
+        the index since the last call. Call :meth:`clear_efficiency_cache`
+        after changing :attr:`efficiency`.
+
+        Parameters
+        ----------
+        nuclide_index : NuclideIndex
+            Index of the material flows this process is applied to.
+        t : float
+            Simulation time passed to time-dependent efficiency functions.
+
+        Returns
+        -------
+        efficiency_vector : numpy.ndarray
+            Removal efficiency of each nuclide in the index.
+
+        """
+        n_nucs = len(nuclide_index)
+        time_dependent = self.time_dependent
+        if not time_dependent:
+            t = None
+        cache = self._efficiency_vector_cache
+        if cache is not None and cache[0] is nuclide_index and cache[1] == t:
+            efficiency_vector = cache[2]
+            if len(efficiency_vector) == n_nucs:
+                return efficiency_vector
         else:
-            eps = str(eps)
-        efficiency = eval(eps)
-        return efficiency
+            efficiency_vector = np.zeros(0)
+
+        start = len(efficiency_vector)
+        elements, inverse = np.unique(nuclide_index.elements[start:],
+                                      return_inverse=True)
+        new_efficiencies = np.zeros(n_nucs - start)
+        if bool(self.efficiency) and len(elements) > 0:
+            new_efficiencies = self.calculate_removal_efficiencies(
+                elements, 0.0 if t is None else t)[inverse]
+        efficiency_vector = np.concatenate((efficiency_vector,
+                                            new_efficiencies))
+        self._efficiency_vector_cache = (nuclide_index, t, efficiency_vector)
+        return efficiency_vector
+
+    def clear_efficiency_cache(self):
+        """Discard efficiency vectors built by
+        :meth:`get_efficiency_vector`."""
+        self._efficiency_vector_cache = None
 
     def check_mass_conservation(self):
         """Checking that Process.outflow + Process.waste_stream is equal
@@ -85,9 +195,14 @@ class Process():
         nuclides with specific efficiencies in single component of fuel
         reprocessing system and returns waste stream Materialflow object.
 
+        If `inflow` is a :class:`CompactMaterialflow`, the removal is a single
+        elementwise multiplication with the vector from
+        :meth:`get_efficiency_vector`, and the returned flows are
+        :class:`CompactMaterialflow` objects.
+
         Parameters
         ----------
-        inflow : Materialflow obj
+        inflow : Materialflow or CompactMaterialflow obj
             Material flowing into the processing system component.
 
         Returns
@@ -99,6 +214,9 @@ class Process():
             reprocessing system component.
 
         """
+        if isinstance(inflow, CompactMaterialflow):
+            return self._process_compact_material(inflow)
+
         waste_mass = {}
         thru_mass = {}
 
@@ -107,19 +225,17 @@ class Process():
 
         if bool(self.efficiency):
             process_elements = list(self.efficiency.keys())
-            process_nucs = [nuc for nuc in inflow.comp.keys() \
-                            if re.match(r"([A-Z]+)([0-9]+)", nuc, re.I).groups()[0] \
-                            in process_elements]
-            thru_nucs = list(set(inflow.comp.keys()).difference(set(process_nucs)))
-
             efficiency = [self.calculate_removal_efficiency(elem) \
                           for elem in process_elements]
             efficiency = dict(zip(process_elements, efficiency))
 
             nuc_efficiency = {}
-            for nuc in process_nucs:
+            for nuc in inflow.comp.keys():
                 elem = re.match(r"([A-Z]+)([0-9]+)", nuc, re.I).groups()[0]
-                nuc_efficiency[nuc] = efficiency[elem]
+                if elem in efficiency:
+                    nuc_efficiency[nuc] = efficiency[elem]
+            process_nucs = list(nuc_efficiency.keys())
+            thru_nucs = list(set(inflow.comp.keys()).difference(set(process_nucs)))
 
             thru_mass = np.array([inflow.get_mass(nuc) * \
                                   (1.0 - nuc_efficiency[nuc]) \
@@ -161,3 +277,51 @@ class Process():
         del thru_mass, waste_mass
 
         return thru_flow, waste_stream
+
+    def _process_compact_material(self, inflow):
+        """Vectorized :meth:`process_material` for
+        :class:`CompactMaterialflow` objects.
+
+        Both returned flows keep the density of `inflow`, and their volumes
+        follow from their masses.
+
+        Parameters
+        ----------
+        inflow : CompactMaterialflow obj
+            Material flowing into the processing system component.
+
+        Returns
+        -------
+        thru_flow : CompactMaterialflow object
+            Remaining material flow that will pass through the
+            reprocessing system component.
+        waste_stream : CompactMaterialflow object
+            Waste stream from the reprocessing system component.
+
+        """
+        nuclide_index = inflow.nuclide_index
+        masses = inflow._aligned_masses()
+        efficiency = self.get_efficiency_vector(nuclide_index)
+        waste_masses = masses * efficiency
+        thru_masses = masses - waste_masses
+
+        density = inflow.density
+        if density:
+            waste_volume = waste_masses.sum() / density
+            thru_volume = thru_masses.sum() / density
+        else:
+            waste_volume = 0.0
+            thru_volume = inflow.volume
+
+        waste_stream = CompactMaterialflow(masses=waste_masses,
+                                           nuclide_index=nuclide_index,
+                                           density=density,
+                                           volume=waste_volume)
+        thru_flow = CompactMaterialflow(masses=thru_masses,
+                                        nuclide_index=nuclide_index,
+                                        density=density,
+                                        volume=thru_volume,
+                                        mass_flowrate=inflow.mass_flowrate,
+                                        void_frac=inflow.void_frac,
+                                        burnup=inflow.burnup)
+        return thru_flow, waste_stream
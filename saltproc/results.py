@@ -3,15 +3,27 @@ import numpy as np
 import pandas as pd
 import uncertainties.unumpy as unp
 
+from saltproc import read_nuclide_map
+
 class Results():
     """Interface class for reading SaltProc results.
 
+    By default every composition, material parameter and waste stream is
+    loaded into memory when the object is created. With ``lazy=True`` only
+    the simulation parameters, metadata, material parameters and nuclide maps
+    are loaded; the results file stays open and compositions are read on
+    demand, one hyperslab per material, nuclide subset and time range. Use
+    :meth:`close` (or a ``with`` block) to release the file.
+
     Parameters
     ----------
     path : str
         Path of results file
     load_in_out_streams : bool
         Switch on whether or not to load waste streams.
+    lazy : bool
+        Keep the results file open and read compositions on demand instead
+        of loading them all at once.
 
     Attributes
     ----------
@@ -42,18 +54,19 @@ class Results():
         A dictionary mapping nuclide name as a string to index.
     material_composition : dict of str to numpy.ndarray
        A dictionary mapping material name as a string to nuclide composition
-       over time.
+       over time. `None` if `lazy` is `True`.
     material_parameters : dict of str to object
         A dictionary mapping material name as a string to material parameters
         (density, volume, burnup, etc.)
     waste_streams : dict of str to dict
         A dictionary mapping material name as a string to a dictionary mapping
         waste stream names as a string to the waste streams mass [g] as a
-        timeseries.
+        timeseries. `None` if `lazy` is `True`.
 
     """
-    def __init__(self, path, load_in_out_streams=True):
+    def __init__(self, path, load_in_out_streams=True, lazy=False):
         f = tb.open_file(path, mode='r')
+        self._file = f
         root = f.root
         sim_params = root.simulation_parameters
         self.time_at_eds = sim_params.col('cumulative_time_at_eds')
@@ -75,12 +88,37 @@ class Results():
 
         # Materials
         materials = root.materials
-        nuclide_idx, material_composition, material_parameters, waste_streams = self._collect_material_params(materials, load_in_out_streams)
-        self.nuclide_idx = nuclide_idx
-        self.material_composition = material_composition
-        self.material_parameters = material_parameters
-        self.waste_streams = waste_streams
-        f.close()
+        if lazy:
+            self.nuclide_idx = {}
+            self.material_parameters = {}
+            for mat_name in materials._v_groups.keys():
+                material = materials[mat_name]
+                self.nuclide_idx[mat_name] = \
+                    read_nuclide_map(material.before_reproc)
+                self.material_parameters[mat_name] = \
+                    self._collect_material_parameters(material)
+            self.material_composition = None
+            self.waste_streams = None
+        else:
+            nuclide_idx, material_composition, material_parameters, waste_streams = self._collect_material_params(materials, load_in_out_streams)
+            self.nuclide_idx = nuclide_idx
+            self.material_composition = material_composition
+            self.material_parameters = material_parameters
+            self.waste_streams = waste_streams
+            self.close()
+
+    def close(self):
+        """Close the results file. Only needed if the object was created with
+        ``lazy=True``."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def _collect_eds_bds_params(self, sim_params, col, errors=False, multidim=False):
         col_eds = sim_params.col(f'{col}_eds').tolist()
@@ -123,10 +161,8 @@ class Results():
             nuclide_idx[mat_name], material_composition[mat_name] = self._collect_material_comp(material)
 
             # material parameters
-            material_parameters[mat_name] = {}
-            for property_name in material.before_reproc.parameters.colnames:
-                material_parameters[mat_name][property_name] = \
-                    self._collect_material_properties(material, property_name)
+            material_parameters[mat_name] = \
+                self._collect_material_parameters(material)
 
             # in and out streams
             waste_streams[mat_name] = {}
@@ -139,47 +175,167 @@ class Results():
 
         return nuclide_idx, material_composition, material_parameters, waste_streams
 
-    # MAKE THIS COLLECT IT INTO A TABLE/2D ARRAY
     def _collect_material_comp(self, material):
-        nuc_map = material.before_reproc.nuclide_map
-        nucs = list(map(bytes.decode, nuc_map.col('nuclide')))
-        nuc_map = dict(zip(nucs, nuc_map.col('index')))
-        arr_dim = (len(nuc_map), len(material.before_reproc.comp) + \
-                   len(material.after_reproc.comp))
-        material_comp = np.empty(arr_dim)
-        for nuc in nucs:
-            nuc_comp_br = material.before_reproc.comp[:, nuc_map[nuc]]
-            nuc_comp_ar = material.after_reproc.comp[:, nuc_map[nuc]]
-            nuc_comp_0 = nuc_comp_br.pop(0)
-            nuc_comp = []
-            for c1, c2 in zip(nuc_comp_br, nuc_comp_ar):
-                nuc_comp = nuc_comp + [c1, c2]
-            nuc_comp = [nuc_comp_0] + nuc_comp
-            material_comp[nuc_map[nuc], :] = nuc_comp
+        nuc_map = read_nuclide_map(material.before_reproc)
+        n_nucs = max(nuc_map.values()) + 1 if nuc_map else 0
+        material_comp = self._read_composition(material, slice(0, n_nucs))
         return nuc_map, material_comp
 
-    def _collect_material_properties(self, material, col):
-        col_br = material.before_reproc.parameters.col(col).tolist()
-        col_ar = material.after_reproc.parameters.col(col).tolist()
-        col_0 = col_br.pop(0)
-        col_values = []
-        for c1, c2 in zip(col_br, col_ar):
-            col_values = col_values + [c1, c2]
-        col_values = [col_0] + col_values
-        return col_values
+    def _collect_material_parameters(self, material):
+        before = material.before_reproc.parameters
+        after = material.after_reproc.parameters
+        time_idx, is_before, rows = _interleaved_rows(before.nrows,
+                                                      after.nrows)
+        material_parameters = {}
+        for col in before.colnames:
+            col_br = before.col(col)
+            col_ar = after.col(col)
+            col_values = np.empty(len(time_idx), dtype=col_br.dtype)
+            col_values[is_before] = col_br[rows[is_before]]
+            col_values[~is_before] = col_ar[rows[~is_before]]
+            material_parameters[col] = col_values.tolist()
+        return material_parameters
+
+    def _read_composition(self, material, columns=None, timesteps=None):
+        """Read nuclide masses of a material with before and after
+        reprocessing steps interleaved as in :attr:`time_total`.
+
+        Each of the before and after reprocessing arrays is read with a
+        single hyperslab selection covering the requested rows and columns.
+
+        Parameters
+        ----------
+        material : tables.Group
+            Material group in the results file.
+        columns : slice or list of int, optional
+            Columns (nuclide indices) to read. All columns if `None`.
+        timesteps : int or slice, optional
+            Indices of :attr:`time_total` to read. All times if `None`.
+
+        Returns
+        -------
+        comp : numpy.ndarray
+            2D array of nuclide masses [g] with one row per column in
+            `columns` and one column per selected time.
+
+        """
+        before = material.before_reproc.comp
+        after = material.after_reproc.comp
+        time_idx, is_before, rows = _interleaved_rows(len(before), len(after),
+                                                      timesteps)
+        if columns is None:
+            columns = slice(None)
+        if isinstance(columns, slice):
+            n_cols = len(range(*columns.indices(before.shape[1])))
+            inverse = None
+        else:
+            # Point selections must be sorted and unique
+            columns, inverse = np.unique(np.asarray(columns, dtype=int),
+                                         return_inverse=True)
+            n_cols = len(inverse)
+            columns = columns.tolist()
+
+        comp = np.zeros((n_cols, len(time_idx)))
+        for earr, mask in ((before, is_before), (after, ~is_before)):
+            if not np.any(mask) or n_cols == 0:
+                continue
+            start = rows[mask].min()
+            stop = rows[mask].max() + 1
+            block = np.asarray(earr[start:stop, columns], dtype=float)
+            if inverse is not None:
+                block = block[:, inverse]
+            comp[:, mask] = block[rows[mask] - start].T
+        return comp
 
+    def _get_material_node(self, material):
+        if self._file is None:
+            raise ValueError('Results file is closed')
+        return self._file.root.materials[material]
 
     def _collect_waste_streams(self, waste_stream, stream_name):
-        nuc_map = waste_stream.nuclide_map
-        nucs = list(map(bytes.decode, nuc_map.col('nuclide')))
-        nuc_map = dict(zip(nucs, nuc_map.col('index')))
+        nuc_map = read_nuclide_map(waste_stream)
+        shared_axis = 'zam' in waste_stream.nuclide_map.colnames
+        comp = np.asarray(waste_stream.comp[:], dtype=float)
+        if len(comp) == 0:
+            comp = np.zeros((0, waste_stream.comp.shape[1]))
         waste_stream_comp = {}
-        for nuc in nucs:
-            nuc_comp = waste_stream.comp[:, nuc_map[nuc]]
+        for nuc, idx in nuc_map.items():
+            nuc_comp = comp[:, idx]
+            # The shared nuclide axis includes nuclides never in the stream
+            if shared_axis and not np.any(nuc_comp):
+                continue
             waste_stream_comp[nuc] = nuc_comp
         return waste_stream_comp
 
     # methods to get timeseries of various values
+    def get_waste_stream(self, material, stream_name):
+        """Get the nuclide masses of a waste stream as timeseries.
+
+        Parameters
+        ----------
+        material : str
+            Material name
+        stream_name : str
+            Waste stream name (e.g. ``'waste_sparger'``)
+
+        Returns
+        -------
+        waste_stream : dict of str to numpy.ndarray
+            Dictionary mapping nuclide names to the waste stream mass [g]
+            at each depletion step.
+
+        """
+        if self.waste_streams is not None \
+                and stream_name in self.waste_streams.get(material, {}):
+            return self.waste_streams[material][stream_name]
+        waste_stream = \
+            self._get_material_node(material).in_out_streams[stream_name]
+        return self._collect_waste_streams(waste_stream, stream_name)
+
+    def get_material_composition(self, material, nuclides=None,
+                                 time_range=None):
+        """Get the masses of a subset of nuclides over a time range.
+
+        Parameters
+        ----------
+        material : str
+            Material name
+        nuclides : list of str, optional
+            Nuclide names (e.g. ``['U235', 'Pu239']``). All nuclides in
+            :attr:`nuclide_idx` if `None`.
+        time_range : tuple of float, optional
+            Start and end time [d], inclusive. All times if `None`.
+
+        Returns
+        -------
+        composition : numpy.ndarray
+            2D array of nuclide masses [g] with one row per nuclide and one
+            column per time.
+        times : numpy.ndarray
+            Times [d] from :attr:`time_total` matching the columns of
+            `composition`.
+
+        """
+        nucmap = self.nuclide_idx[material]
+        if nuclides is None:
+            nuclides = list(nucmap.keys())
+        columns = [nucmap[nuc] for nuc in nuclides]
+        if time_range is None:
+            timesteps = slice(None)
+        else:
+            timesteps = slice(
+                np.searchsorted(self.time_total, time_range[0], side='left'),
+                np.searchsorted(self.time_total, time_range[1], side='right'))
+        return self._get_composition(material, columns, timesteps), \
+            self.time_total[timesteps]
+
+    def _get_composition(self, material, columns, timesteps):
+        if self.material_composition is not None:
+            return self.material_composition[material][columns, timesteps]
+        return self._read_composition(self._get_material_node(material),
+                                      columns,
+                                      timesteps)
+
     def get_nuclide_mass(self, material, nuclide, timestep=None):
         """Get nuclide mass as a timeseries. If :attr:`timestep` is `None`,
         then return the mass at all times.
@@ -199,8 +355,108 @@ class Results():
 
         """
         nucmap = self.nuclide_idx[material]
-        comp = self.material_composition[material]
-        nuclide_mass = comp[nucmap[nuclide]]
-        if timestep is not None:
-            nuclide_mass = nuclide_mass[timestep]
+        if self.material_composition is not None:
+            comp = self.material_composition[material]
+            nuclide_mass = comp[nucmap[nuclide]]
+            if timestep is not None:
+                nuclide_mass = nuclide_mass[timestep]
+            return nuclide_mass
+        nuclide_mass = self._read_composition(
+            self._get_material_node(material),
+            [nucmap[nuclide]],
+            timestep)[0]
+        if timestep is not None and not isinstance(timestep, slice):
+            nuclide_mass = nuclide_mass[0]
         return nuclide_mass
+
+    def interpolate_nuclide_mass(self, material, nuclides, times):
+        """Linearly interpolate nuclide masses at arbitrary times.
+
+        At a time where reprocessing took place the mass after
+        reprocessing is returned.
+
+        Parameters
+        ----------
+        material : str
+            Material name
+        nuclides : str or list of str
+            Nuclide name or names
+        times : float or array_like
+            Times [d] between 0 and the end of the simulation.
+
+        Returns
+        -------
+        nuclide_mass : numpy.ndarray
+            Masses [g] with shape ``(len(nuclides), len(times))``. The first
+            dimension is dropped if `nuclides` is a single name, the last one
+            if `times` is a scalar.
+
+        """
+        single_nuclide = isinstance(nuclides, str)
+        if single_nuclide:
+            nuclides = [nuclides]
+        times = np.asarray(times, dtype=float)
+        t = np.atleast_1d(times)
+        time_total = self.time_total
+        if np.any(t < time_total[0]) or np.any(t > time_total[-1]):
+            raise ValueError(f'Times must be between {time_total[0]} and '
+                             f'{time_total[-1]} days')
+
+        # Last stored time not after t (after reprocessing at a step)
+        upper = np.searchsorted(time_total, t, side='right')
+        lower = upper - 1
+        upper = np.minimum(upper, len(time_total) - 1)
+        t_lower = time_total[lower]
+        t_upper = time_total[upper]
+        span = t_upper - t_lower
+        weight = np.divide(t - t_lower, span, out=np.zeros_like(t),
+                           where=span > 0)
+
+        start = lower.min()
+        nucmap = self.nuclide_idx[material]
+        comp = self._get_composition(material,
+                                     [nucmap[nuc] for nuc in nuclides],
+                                     slice(start, upper.max() + 1))
+        lower = lower - start
+        upper = upper - start
+        nuclide_mass = comp[:, lower] * (1 - weight) + comp[:, upper] * weight
+        if times.ndim == 0:
+            nuclide_mass = nuclide_mass[:, 0]
+        if single_nuclide:
+            nuclide_mass = nuclide_mass[0]
+        return nuclide_mass
+
+
+def _interleaved_rows(n_before, n_after, timesteps=None):
+    """Map indices of :attr:`Results.time_total` to rows of the before and
+    after reprocessing arrays.
+
+    The times are ordered as ``[br0, br1, ar0, br2, ar1, ...]``.
+
+    Parameters
+    ----------
+    n_before : int
+        Number of rows before reprocessing.
+    n_after : int
+        Number of rows after reprocessing.
+    timesteps : int or slice, optional
+        Time indices to map. All times if `None`.
+
+    Returns
+    -------
+    time_idx : numpy.ndarray
+        Selected time indices.
+    is_before : numpy.ndarray
+        Boolean mask of the times stored before reprocessing.
+    rows : numpy.ndarray
+        Row of each time in its array.
+
+    """
+    n_steps = min(n_before - 1, n_after)
+    n_times = 2 * n_steps + 1 if n_before > 0 else 0
+    time_idx = np.arange(n_times)
+    if timesteps is not None:
+        time_idx = np.atleast_1d(time_idx[timesteps])
+    is_before = (time_idx == 0) | (time_idx % 2 == 1)
+    rows = np.where(is_before, (time_idx + 1) // 2, time_idx // 2 - 1)
+    return time_idx, is_before, rows
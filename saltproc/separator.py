@@ -33,10 +33,6 @@ class Separator(Process):
         Default: 900
     area : float
         contactor cross-section (m^2)
-    jl : float
-        liquid superficial velocity (m/s)
-    alpha : float
-        void fraction
 
     Attributes
     ----------
@@ -93,6 +89,7 @@ class Separator(Process):
         """ Initializes the Separator object.
 
         """
+        self._eff_cache = {}
         super().__init__(*initial_data, **kwargs)
         self.q_salt = q_salt
         self.q_he = q_he
@@ -102,8 +99,6 @@ class Separator(Process):
         self.dp = dp
         self.temp_salt = temp_salt
         self.area = np.pi * (self.dp / 2) ** 2
-        self.alpha = self.q_he / (self.q_he + self.q_salt)
-        self.jl = self.q_salt / self.area
         self.efficiency = self.eff()
 
     def calculate_removal_efficiency(self, nuc_name):
@@ -162,12 +157,35 @@ class Separator(Process):
 
         return plt_dict
 
-    def eff(self):
+    def eff(self, q_salt=None, q_he=None, do=None, dp=None, db=None,
+            deltap=None, temp_salt=None):
         """ Evaluates gas/bubble separation efficiency from Jiaqi's correlation
 
+        Parameters left as `None` take the value of the matching attribute.
+        Any parameter may be an array, in which case the efficiency is
+        evaluated over the broadcast parameter grid. Results for scalar
+        parameters are cached.
+
+        Parameters
+        ----------
+        q_salt : float or array_like, optional
+            volumetric salt flow rate (m^3/s)
+        q_he : float or array_like, optional
+            volumetric helium flow rate (m^3/s)
+        do : float or array_like, optional
+            gas outlet diameter (m)
+        dp : float or array_like, optional
+            pipe diameter (m). The cross-section is recomputed when given.
+        db : float or array_like, optional
+            bubble diameter (m)
+        deltap : float or array_like, optional
+            Pressure difference between the inlet and the gas outlet (Pa)
+        temp_salt : float or array_like, optional
+            salt temperature (K)
+
         Returns
         -------
-        rem_eff : dict of str to float
+        rem_eff : dict of str to float or numpy.ndarray
             Dictionary that contains removal efficiency of each target
             element.
 
@@ -176,21 +194,47 @@ class Separator(Process):
             ``value``
                 removal efficiency.
         """
-
-        dc = 3.41 * self.do
-        mu = 1.076111581e-2 * (self.temp_salt / 1000)**(-4.833549134)
-        rho = (6.105 - 0.001272 * self.temp_salt) * 1000
+        q_salt = self.q_salt if q_salt is None else q_salt
+        q_he = self.q_he if q_he is None else q_he
+        do = self.do if do is None else do
+        db = self.db if db is None else db
+        deltap = self.deltap if deltap is None else deltap
+        temp_salt = self.temp_salt if temp_salt is None else temp_salt
+        if dp is None:
+            dp = self.dp
+            area = self.area
+        else:
+            area = np.pi * (np.asarray(dp) / 2) ** 2
+
+        params = (q_salt, q_he, do, dp, db, deltap, temp_salt, area)
+        key = None
+        if all(np.ndim(p) == 0 for p in params):
+            key = tuple(float(p) for p in params) + (self.k,)
+            if key in self._eff_cache:
+                return dict(self._eff_cache[key])
+        else:
+            params = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64)
+                                           for p in params))
+            q_salt, q_he, do, dp, db, deltap, temp_salt, area = params
+
+        alpha = q_he / (q_he + q_salt)
+        jl = q_salt / area
+        dc = 3.41 * do
+        mu = 1.076111581e-2 * (temp_salt / 1000)**(-4.833549134)
+        rho = (6.105 - 0.001272 * temp_salt) * 1000
         nu = mu / rho
-        vl = self.q_salt / self.area
-        number_re = self.dp * vl / nu
-        etha = 1 / (3.2 * rho * self.jl**2 * dc**2 /
-                    (self.do**2 * self.deltap) + 1)
-        dvoid = (4.89 * self.dp * (self.dp / self.db)**1.27) /\
+        vl = q_salt / area
+        number_re = dp * vl / nu
+        etha = 1 / (3.2 * rho * jl**2 * dc**2 /
+                    (do**2 * deltap) + 1)
+        dvoid = (4.89 * dp * (dp / db)**1.27) /\
                 (1 + self.k**4 * number_re)
-        df = self.do / (self.do + dvoid / (100 * self.alpha)**0.5)
+        df = do / (do + dvoid / (100 * alpha)**0.5)
         sep_eff = df / (1 + 0.23 * etha) + 3.26 * etha * (1 - df) * df
         rem_eff = {'Xe': sep_eff, 'Kr': sep_eff, 'H': sep_eff}
 
+        if key is not None:
+            self._eff_cache[key] = dict(rem_eff)
         return rem_eff
 
 
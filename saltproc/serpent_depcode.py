@@ -3,15 +3,20 @@ import os
 import shutil
 import re
 
-import serpentTools
 import openmc
-import openmc.data
-from math import floor
 import numpy as np
 
-from saltproc import Materialflow
+from saltproc import Materialflow, SerpentStepOutput, XsdataIndex
+from saltproc import SerpentRestartFile
+from saltproc import get_zaid_table, names_to_zams, zams_to_names
+from saltproc import atomic_masses
 from saltproc.depcode import Depcode
 
+# '<nuclide> <fraction>' line of a material composition, with an optional
+# trailing comment
+_COMPOSITION_LINE = re.compile(
+    r'^\s*\S+\s+[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*(%.*)?$')
+
 class SerpentDepcode(Depcode):
     """Interface for running depletion steps in Serpent, as well as obtaining
     depletion step results.
@@ -39,6 +44,22 @@ class SerpentDepcode(Depcode):
 
         'nndc' - Identical to 'mcnp', except Am242m1 is 95242 and Am242
         is 95642
+    mass_fraction_cutoff : float, optional
+        Nuclides with a mass fraction below this value are left out of the
+        runtime material file.
+    write_changed_materials_only : bool, optional
+        Reuse the previously written material card of each burnable material
+        whose composition, density and volume did not change.
+    coupling : str, optional
+        How burnable material compositions are exchanged with Serpent2.
+
+        'text' - Compositions are read from the ``*_dep.m`` output file and
+        written to the runtime material file.
+
+        'binary' - Compositions are read from and written to Serpent2 binary
+        restart files (``set rfw``/``set rfr``). The runtime material file
+        keeps the nuclide lists of the template material file and only has
+        its densities and volumes updated.
 
     Attributes
     ----------
@@ -57,6 +78,9 @@ class SerpentDepcode(Depcode):
     runtime_matfile : str
         Path to Serpent2 material file containing burnable materials used to
         run depletion step, and modified after fuel reprocessing.
+    runtime_restartfile : str
+        Path to the Serpent2 binary restart file holding the reprocessed
+        burnable material compositions when `coupling` is ``'binary'``.
     npop : int
         Size of neutron population per cycle
     active_cycles : int
@@ -71,7 +95,10 @@ class SerpentDepcode(Depcode):
                  exec_path,
                  template_input_file_path,
                  geo_file_paths,
-                 zaid_convention):
+                 zaid_convention,
+                 mass_fraction_cutoff=0.0,
+                 write_changed_materials_only=False,
+                 coupling='text'):
         """Initialize a SerpentDepcode object.
 
         """
@@ -84,10 +111,24 @@ class SerpentDepcode(Depcode):
                          str((output_path / 'runtime_input.serpent').resolve())
         self.runtime_matfile = str((output_path / 'runtime_mat.ini').resolve())
         self.zaid_convention = zaid_convention
+        self.mass_fraction_cutoff = mass_fraction_cutoff
+        self.write_changed_materials_only = write_changed_materials_only
+        if coupling not in ('text', 'binary'):
+            raise ValueError(f'Unknown coupling: {coupling}')
+        self.coupling = coupling
+        self.runtime_restartfile = \
+            str((output_path / 'runtime_restart.wrk').resolve())
         self._OUTPUTFILE_NAMES = ('runtime_input.serpent_res.m', 'runtime_input.serpent_dep.m',
                                  'runtime_input.serpent.seed', 'runtime_input.serpent.out',
                                  'runtime_input.serpent.dep')
         self._INPUTFILE_NAMES = ('runtime_mat.ini', 'runtime_input.serpent')
+        if coupling == 'binary':
+            self._OUTPUTFILE_NAMES += ('runtime_input.serpent.wrk',)
+            self._INPUTFILE_NAMES += ('runtime_restart.wrk',)
+        self._step_output = None
+        self._xsdata_index = None
+        self._nuclide_codes = {}
+        self._material_cards = {}
 
     def get_neutron_settings(self, file_lines):
         """Get neutron settings (no. of neutrons per cycle, no. of active and
@@ -166,6 +207,22 @@ class SerpentDepcode(Depcode):
         mat_cards = \
             [line.split() for line in file_lines if line.startswith("mat ")]
 
+        # Nuclide lines of each material, reused by the binary coupling
+        self._template_composition_lines = {}
+        mat_lines = None
+        for line in file_lines:
+            if line.startswith("mat "):
+                mat_lines = []
+                self._template_composition_lines[line.split()[1]] = mat_lines
+            elif mat_lines is None or not line.strip() \
+                    or line.lstrip().startswith('%'):
+                continue
+            elif _COMPOSITION_LINE.match(line):
+                mat_lines.append(line if line.endswith('\n') else line + '\n')
+            else:
+                # Any other card ends the composition
+                mat_lines = None
+
         for card in mat_cards:
             if 'fix' not in card:
                 raise IOError(f'"mat" card for burnable material "{card[1]}"'
@@ -195,69 +252,27 @@ class SerpentDepcode(Depcode):
             Symbolic nuclide name (`Am242_m1`).
 
         """
+        return self._zaid_table.codes_to_names([nuc_code])[0]
 
-        if '.' in str(nuc_code):
-            nuc_code = int(nuc_code.split('.')[0])
-            if self.zaid_convention == 'nndc' and nuc_code in (95242, 95642):
-               if nuc_code == 95242:
-                  nuc_code = 95642
-               else:
-                  nuc_code = 95242
-            Z, a, m = self._nuclide_code_to_zam(nuc_code)
-        else:
-            Z, a, m = self._decay_code_to_zam(nuc_code)
-
-        nucname = openmc.data.gnds_name(Z, a, m=m)
-        if m != 0:
-            nucname = nucname[:-3] + f'_m{m}'
-        return nucname
+    @property
+    def _zaid_table(self):
+        return get_zaid_table(self.zaid_convention)
 
     def _decay_code_to_zam(self, nuc_code):
-        m = int(str(nuc_code)[-1])
-        nuc_code = int(str(nuc_code)[:-1])
-        Z = floor(nuc_code * 1e-3)
-        a = nuc_code % 1000
-        return Z, a, m
+        Z, a, m = self._zaid_table.decay_code_to_zam(int(nuc_code))
+        return int(Z), int(a), int(m)
 
     def _nuclide_code_to_zam(self, nuc_code):
         if '.' in str(nuc_code):
-            nuc_code = int(nuc_code.split('.')[0])
-
-        Z = floor(nuc_code * 1e-3)
-        a = nuc_code % 1000
-        m = 0
-        if self.zaid_convention == 'serpent':
-            if a > 300:
-                m = 1
-                if Z > 76:
-                    a = a - 100
-                else:
-                    a = a - 200
-        else:
-            # Assumes only m=1 metastable states
-            if a > 400:
-                a -= 400
-                m = 1
-        return Z, a, m
+            nuc_code = nuc_code.split('.')[0]
+        Z, a, m = self._zaid_table.zaid_to_zam(int(nuc_code))
+        return int(Z), int(a), int(m)
 
     def name_to_nuclide_code(self, nucname):
-        Z, a, m = openmc.data.zam(nucname)
-        nuc_code = self._zam_to_nuclide_code(Z, a, m)
-        return nuc_code
+        return int(self._zaid_table.names_to_codes([nucname])[0])
 
     def _zam_to_nuclide_code(self, Z, a, m):
-        nuc_code = Z * 1000
-        if m != 0:
-            if self.zaid_convention == 'serpent':
-                nuc_code += int(((a / 100) - 3) * 100)
-            else:
-                nuc_code += 300 + 100 * m
-                if self.zaid_convention == 'nndc' and nuc_code in (95242, 95642):
-                   if nuc_code == 95242:
-                      nuc_code = 95642
-                   else:
-                      nuc_code = 95242
-        return nuc_code
+        return int(self._zaid_table.zam_to_zaid(Z, a, m))
 
 
     def map_nuclide_name_to_serpent_name(self):
@@ -278,24 +293,94 @@ class SerpentDepcode(Depcode):
                 nuclide with cross section data or 982510 for a decay-only nuclide.
 
         """
-        nuc_code_map = {}
-        # Construct path to the *.out File
-        out_file = os.path.join('%s.out' % self.runtime_inputfile)
-        with open(out_file, 'r') as f:
-            file_lines = f.read().split('\n')
-            # Stop-line
-            end = ' --- Table  2: Reaction and decay data: '
-            for line in file_lines:
-                if not line:
-                    continue
-                if end in line:
-                    break
-                if 'c  TRA' in line or 'c  DEC' in line:
-                    line = line.split()
-                    nuc_code = line[2]
-                    nuc_name = self.nuclide_code_to_name(nuc_code)
-                    nuc_code_map.update({nuc_name: nuc_code})
-        return nuc_code_map
+        step_output = self._get_step_output()
+        if self.zaid_convention not in step_output.nuclide_code_maps:
+            nuc_codes = step_output.nuclide_codes
+            step_output.nuclide_code_maps[self.zaid_convention] = dict(
+                zip(self._zaid_table.codes_to_names(nuc_codes), nuc_codes))
+        return step_output.nuclide_code_maps[self.zaid_convention]
+
+    def get_nuclide_codes(self, mat_name, nuclides):
+        """Get the Serpent2 nuclide codes of nuclides in a burnable material.
+
+        If the cross section directory files set with ``set acelib`` are
+        found, the codes are looked up in an :class:`XsdataIndex` for the
+        library given by the ``fix`` option of the material card, so
+        nuclides that Serpent2 did not list in the last run (e.g. from a
+        feed) are mapped too. Otherwise the codes are taken from
+        :meth:`map_nuclide_name_to_serpent_name`.
+
+        Parameters
+        ----------
+        mat_name : str
+            Name of burnable material.
+        nuclides : iterable of str
+            Nuclide names (e.g. ``'Am242_m1'``).
+
+        Returns
+        -------
+        nuc_codes : list of str
+            Nuclide codes in Serpent2 format.
+
+        """
+        nuclides = list(nuclides)
+        xsdata_index = self._get_xsdata_index()
+        if xsdata_index is None:
+            nuc_code_map = self.map_nuclide_name_to_serpent_name()
+            return [nuc_code_map[nuc] for nuc in nuclides]
+
+        mat_card, _ = self._burnable_material_card_data[mat_name]
+        suffix = mat_card[mat_card.index('fix') + 1].lstrip('.')
+        nuc_codes = self._nuclide_codes.setdefault(suffix, {})
+        new_nuclides = [nuc for nuc in nuclides if nuc not in nuc_codes]
+        if new_nuclides:
+            nuc_codes.update(zip(new_nuclides, xsdata_index.get_nuclide_codes(
+                names_to_zams(new_nuclides).tolist(), suffix)))
+        return [nuc_codes[nuc] for nuc in nuclides]
+
+    def _get_xsdata_index(self):
+        """Get the index of the cross section directory files in the
+        runtime input file, or `None` if they cannot be found."""
+        if self._xsdata_index is None:
+            xsdata_paths = self._get_acelib_paths()
+            if xsdata_paths:
+                cache_path = Path(self.output_path) / 'xsdata_index.json'
+                self._xsdata_index = XsdataIndex(xsdata_paths,
+                                                 str(cache_path))
+            else:
+                self._xsdata_index = False
+        return self._xsdata_index or None
+
+    def _get_acelib_paths(self):
+        """Resolve the paths of the ``set acelib`` directory files.
+
+        Relative paths are searched in the runtime directory and in
+        ``$SERPENT_DATA``, like Serpent2 does. Returns an empty list if any
+        file is missing.
+
+        """
+        if not os.path.isfile(self.runtime_inputfile):
+            return []
+        acelib = []
+        for line in self.read_plaintext_file(self.runtime_inputfile):
+            fields = line.split('%')[0].split()
+            if fields[:2] == ['set', 'acelib']:
+                acelib += [field.strip('"') for field in fields[2:]]
+        if not acelib and 'SERPENT_ACELIB' in os.environ:
+            acelib = [os.environ['SERPENT_ACELIB']]
+
+        search_dirs = [Path(self.output_path)]
+        if 'SERPENT_DATA' in os.environ:
+            search_dirs.append(Path(os.environ['SERPENT_DATA']))
+        xsdata_paths = []
+        for path in map(Path, acelib):
+            if not path.is_absolute():
+                path = next((directory / path for directory in search_dirs
+                             if (directory / path).is_file()), path)
+            if not path.is_file():
+                return []
+            xsdata_paths.append(path)
+        return xsdata_paths
 
     def resolve_include_paths(self, lines):
         """Resolves relative paths in runtime input file into
@@ -372,32 +457,116 @@ class SerpentDepcode(Depcode):
             moment = 0
 
         openmc.reset_auto_ids()
-        results_file = os.path.join('%s_dep.m' % self.runtime_inputfile)
-        results = serpentTools.read(results_file)
+        if self.coupling == 'binary':
+            return self._read_restart_materials(moment)
+        results, nuclide_names = self._read_depletion_output()
         self.days = results.days[moment]
 
-        # Get material names
-        mat_names = []
         depleted_materials = {}
         for material_name, material in results.materials.items():
-            if material_name != 'total':
-                nuclide_names = list(map(self.nuclide_code_to_name, material.zai[:-2]))
-                comp = dict(zip(nuclide_names, material.mdens[:-2, moment]))
-                volume = material.volume[moment]
-                density = material.mdens[-1, moment]
-                depleted_materials[material_name] = Materialflow(comp=comp,
-                                                                 comp_is_density=True,
-                                                                 density=density,
-                                                                 volume=volume,
-                                                                 burnup=results.burnup[moment])
+            comp = dict(zip(nuclide_names, material['mdens'][:, moment]))
+            depleted_materials[material_name] = Materialflow(
+                comp=comp,
+                comp_is_density=True,
+                density=material['density'][moment],
+                volume=material['volume'][moment],
+                burnup=results.burnup[moment])
         return depleted_materials
 
+    def _read_restart_materials(self, moment):
+        """Read depleted materials from the binary restart file written by
+        Serpent2 (``set rfw``).
+
+        Parameters
+        ----------
+        moment : int
+            ``0`` for the beginning and ``1`` for the end of the depletion
+            step.
+
+        Returns
+        -------
+        depleted_materials : dict of str to Materialflow
+
+        """
+        # Restarted simulations have not read the material cards yet
+        if not hasattr(self, '_burnable_material_card_data'):
+            self._get_burnable_material_card_data(
+                self.read_plaintext_file(self.runtime_matfile))
+        restart = SerpentRestartFile(self.runtime_inputfile + '.wrk')
+        depleted_materials = {}
+        for material_name in restart.material_names:
+            if material_name not in self._burnable_material_card_data:
+                continue
+            record = restart.get_material(material_name, -moment)
+            nuclides = record['nuclides']
+            # Drop lost (666) and total (0) entries
+            nuclides = nuclides[nuclides['zai'] > 9999]
+            # 1/b-cm to g/cm^3
+            mdens = nuclides['adens'] * atomic_masses(nuclides['zai']) \
+                * 1e24 / openmc.data.AVOGADRO
+            mat_card, card_volume_idx = \
+                self._burnable_material_card_data[material_name]
+            volume = float(mat_card[card_volume_idx])
+            self.days = record['days']
+            depleted_materials[material_name] = Materialflow(
+                comp=dict(zip(zams_to_names(nuclides['zai']), mdens)),
+                comp_is_density=True,
+                density=record['mdens'],
+                volume=volume,
+                burnup=record['bu'])
+        return depleted_materials
+
+    def _read_depletion_output(self):
+        """Get the burnable material data of the current depletion step.
+
+        Returns
+        -------
+        results : SerpentDepletionOutput
+            Burnable material data.
+        nuclide_names : list of str
+            Nuclide names matching ``results.zai``.
+
+        """
+        step_output = self._get_step_output()
+        results = step_output.depletion
+        if step_output.nuclide_names is None:
+            step_output.nuclide_names = \
+                self._zaid_table.codes_to_names(results.zai)
+        return results, step_output.nuclide_names
+
+    def _get_step_output(self):
+        """Get the parsed output files of the current depletion step.
+
+        The files are parsed once per depletion step and shared by
+        :meth:`read_depleted_materials`, :meth:`read_depcode_metadata`,
+        :meth:`read_step_metadata`, :meth:`read_neutronics_parameters` and
+        :meth:`map_nuclide_name_to_serpent_name`. They are parsed again if
+        they changed on disk.
+
+        Returns
+        -------
+        step_output : SerpentStepOutput
+
+        """
+        key = SerpentStepOutput.get_key(self.runtime_inputfile)
+        if self._step_output is None or self._step_output.key != key:
+            material_names = None
+            if hasattr(self, '_burnable_material_card_data'):
+                material_names = self._burnable_material_card_data.keys()
+            self._step_output = SerpentStepOutput(self.runtime_inputfile,
+                                                  material_names)
+        return self._step_output
+
+    def close_step_output(self):
+        """Release the parsed output files of the current depletion step."""
+        self._step_output = None
+
     def read_depcode_metadata(self):
         """Reads Serpent2 metadata and stores it in the
         :class:`SerpentDepcode` object's :attr:`depcode_metadata` attribute.
         """
 
-        res = serpentTools.read(self.runtime_inputfile + "_res.m")
+        res = self._get_step_output().res
         depcode_name, depcode_ver = res.metadata['version'].split()
         self.depcode_metadata['depcode_name'] = depcode_name
         self.depcode_metadata['depcode_version'] = depcode_ver
@@ -414,7 +583,7 @@ class SerpentDepcode(Depcode):
         """Reads Serpent2 depletion step metadata and stores it in the
         :class:`SerpentDepcode` object's :attr:`step_metadata` attribute.
         """
-        res = serpentTools.read(self.runtime_inputfile + "_res.m")
+        res = self._get_step_output().res
         self.step_metadata['OMP_threads'] = res.metadata['ompThreads']
         self.step_metadata['MPI_tasks'] = res.metadata['mpiTasks']
         self.step_metadata['memory_optimization_mode'] = res.metadata['optimizationMode']
@@ -428,7 +597,7 @@ class SerpentDepcode(Depcode):
         in :class:`SerpentDepcode` object's :attr:`neutronics_parameters`
         attribute.
         """
-        res = serpentTools.read(self.runtime_inputfile + "_res.m")
+        res = self._get_step_output().res
         self.neutronics_parameters['keff_bds'] = res.resdata['impKeff'][0]
         self.neutronics_parameters['keff_eds'] = res.resdata['impKeff'][1]
         self.neutronics_parameters['breeding_ratio_bds'] = \
@@ -520,6 +689,8 @@ i       Parameters
         args = args + [self.runtime_inputfile]
 
         super().run_depletion_step(mpi_args, args)
+        # Start parsing the output files in the background
+        self._get_step_output()
 
     def switch_to_next_geometry(self):
         """Inserts line with path to next Serpent geometry file at the
@@ -570,10 +741,47 @@ i       Parameters
 
         self.get_neutron_settings(lines)
         lines = self.set_power_load(lines, reactor, dep_step)
+        if self.coupling == 'binary':
+            lines = self.set_restart_cards(lines, dep_step)
 
         with open(self.runtime_inputfile, 'w') as out_file:
             out_file.writelines(lines)
 
+    def set_restart_cards(self, lines, dep_step):
+        """Set the restart file cards used by the binary coupling.
+
+        Serpent2 writes the depleted compositions to a restart file
+        (``set rfw``) and, after the first depletion step, reads the
+        reprocessed compositions SaltProc wrote back (``set rfr``) at the
+        time stored in that file.
+
+        Parameters
+        ----------
+        lines : list of str
+            Serpent2 runtime input file.
+        dep_step : int
+            Current depletion step.
+
+        Returns
+        -------
+        lines : list of str
+            Serpent2 runtime input file with updated restart cards.
+
+        """
+        lines = [line for line in lines
+                 if not line.startswith(('set rfw', 'set rfr'))]
+        lines.append('set rfw 1\n')
+        if dep_step > 0 and os.path.exists(self.runtime_restartfile):
+            days = SerpentRestartFile(self.runtime_restartfile).records[0]['days']
+            lines.append('set rfr %s "%s"\n'
+                         % (repr(-float(days)), self.runtime_restartfile))
+        return lines
+
+    def remove_runtime_exchange_files(self):
+        """Remove the restart file of a previous run."""
+        if os.path.exists(self.runtime_restartfile):
+            os.remove(self.runtime_restartfile)
+
     def update_depletable_materials(self, mats, dep_end_time):
         """Update material file with reprocessed material compositions.
 
@@ -591,22 +799,100 @@ i       Parameters
 
         """
 
-        with open(self.runtime_matfile, 'w') as f:
-            f.write('%% Material compositions (after %f days)\n\n'
-                    % dep_end_time)
-            nuc_code_map = self.map_nuclide_name_to_serpent_name()
-            if not(hasattr(self, '_burnable_material_card_data')):
-                lines = self.read_plaintext_file(self.template_input_file_path)
-                _, abs_src_matfile = self._get_burnable_materials_file(lines)
-                file_lines = self.read_plaintext_file(abs_src_matfile)
-                self._get_burnable_material_card_data(file_lines)
+        if not(hasattr(self, '_burnable_material_card_data')):
+            lines = self.read_plaintext_file(self.template_input_file_path)
+            _, abs_src_matfile = self._get_burnable_materials_file(lines)
+            file_lines = self.read_plaintext_file(abs_src_matfile)
+            self._get_burnable_material_card_data(file_lines)
+
+        blocks = ['%% Material compositions (after %f days)\n\n'
+                  % dep_end_time]
+        if self.coupling == 'binary':
+            self._write_restart_file(mats, dep_end_time)
             for name, mat in mats.items():
-                mat_card, card_volume_idx = self._burnable_material_card_data[name]
+                mat_card, card_volume_idx = \
+                    self._burnable_material_card_data[name]
                 mat_card[2] = str(-mat.density)
                 mat_card[card_volume_idx] = "%7.5E" % mat.volume
-                f.write(" ".join(mat_card))
-                f.write("\n")
-                for nuc, mass_fraction in mat.comp.items():
-                    f.write('           %9s  %7.14E\n' %
-                            (nuc_code_map[nuc],
-                             -mass_fraction))
+                blocks.append(" ".join(mat_card) + "\n" + ''.join(
+                    self._template_composition_lines[name]))
+        else:
+            for name, mat in mats.items():
+                blocks.append(self._get_material_card(name, mat))
+
+        # Serpent2 never sees a partially written file
+        tmp_matfile = self.runtime_matfile + '.tmp'
+        with open(tmp_matfile, 'w') as f:
+            f.write(''.join(blocks))
+        os.replace(tmp_matfile, self.runtime_matfile)
+
+    def _write_restart_file(self, mats, dep_end_time):
+        """Write reprocessed material compositions to the binary restart
+        file read by Serpent2 (``set rfr``).
+
+        Parameters
+        ----------
+        mats : dict of str to Materialflow
+            Reprocessed materials.
+        dep_end_time : float
+            Current time at the end of the depletion step (d).
+
+        """
+        records = []
+        for name, mat in mats.items():
+            zai = names_to_zams(mat.comp.keys())
+            mass_fractions = np.fromiter(mat.comp.values(), dtype=np.float64,
+                                         count=len(zai))
+            # g/cm^3 to 1/b-cm
+            adens = mass_fractions * mat.density * openmc.data.AVOGADRO \
+                / atomic_masses(zai) / 1e24
+            records.append({'name': name,
+                            'bu': mat.burnup,
+                            'days': dep_end_time,
+                            'adens': adens.sum(),
+                            'mdens': mat.density,
+                            'burnup': mat.burnup,
+                            'nuclides': (zai, adens)})
+        SerpentRestartFile.write(self.runtime_restartfile, records)
+
+    def _get_material_card(self, name, mat):
+        """Format the material card and composition of a burnable material.
+
+        Parameters
+        ----------
+        name : str
+            Name of burnable material.
+        mat : Materialflow
+            Reprocessed material.
+
+        Returns
+        -------
+        card : str
+            Material card followed by one line per nuclide.
+
+        """
+        nuclides = list(mat.comp.keys())
+        mass_fractions = np.fromiter(mat.comp.values(), dtype=np.float64,
+                                     count=len(nuclides))
+        state = (nuclides, mass_fractions, mat.density, mat.volume)
+        if self.write_changed_materials_only and name in self._material_cards:
+            old_state, card = self._material_cards[name]
+            if old_state[0] == nuclides \
+                    and np.array_equal(old_state[1], mass_fractions) \
+                    and old_state[2:] == state[2:]:
+                return card
+
+        mat_card, card_volume_idx = self._burnable_material_card_data[name]
+        mat_card[2] = str(-mat.density)
+        mat_card[card_volume_idx] = "%7.5E" % mat.volume
+
+        keep = mass_fractions >= self.mass_fraction_cutoff
+        nuc_codes = np.array(self.get_nuclide_codes(name, nuclides),
+                             dtype=str)[keep]
+        lines = np.char.add(
+            np.char.add('           ', np.char.rjust(nuc_codes, 9)),
+            np.char.mod('  %7.14E\n', -mass_fractions[keep]))
+        card = " ".join(mat_card) + "\n" + ''.join(lines.tolist())
+        if self.write_changed_materials_only:
+            self._material_cards[name] = (state, card)
+        return card
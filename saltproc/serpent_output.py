@@ -0,0 +1,503 @@
+"""Readers for Serpent2 data and output files"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+
+import numpy as np
+import serpentTools
+
+
+# Material variables kept from the depletion output
+_DEP_MATERIAL_VARIABLES = ('MDENS', 'VOLUME', 'BURNUP')
+_DEP_ASSIGNMENT = re.compile(r'^(\w+)\s*=\s*\[(.*)$')
+# End of the nuclide inventory table in the *.out file
+_OUT_TABLE_END = ' --- Table  2: Reaction and decay data: '
+# Per-nuclide record of a binary restart file
+RESTART_NUCLIDE_DTYPE = np.dtype([('zai', '<i8'), ('adens', '<f8')])
+# Material header of a binary restart file, after the name
+_RESTART_HEADER_DTYPE = np.dtype([('bu', '<f8'),
+                                  ('days', '<f8'),
+                                  ('n_nucs', '<i8'),
+                                  ('adens', '<f8'),
+                                  ('mdens', '<f8'),
+                                  ('burnup', '<f8')])
+
+
+class SerpentDepletionOutput():
+    """Burnable material data read from a Serpent2 ``*_dep.m`` file.
+
+    The file is streamed once and only the nuclide ZAI codes, the time and
+    burnup points, and the mass densities, volumes and burnups of the
+    requested materials are parsed. All other variables are skipped without
+    being converted to numbers.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``*_dep.m`` file.
+    material_names : iterable of str, optional
+        Names of the burnable materials to read. All materials if `None`.
+
+    Attributes
+    ----------
+    zai : numpy.ndarray
+        Nuclide ZAI codes, without the ``lost data`` (666) and ``total`` (0)
+        entries.
+    days : numpy.ndarray
+        Cumulative time [d] at each moment.
+    burnup : numpy.ndarray
+        Total burnup [MWd/kg] at each moment.
+    materials : dict of str to dict
+        Dictionary mapping material names to dictionaries with the keys
+
+        ``'mdens'``
+            2D array of nuclide mass densities [g/cm^3] (one row per entry
+            of :attr:`zai`, one column per moment).
+        ``'density'``
+            Total mass density [g/cm^3] at each moment.
+        ``'volume'``
+            Volume [cm^3] at each moment.
+        ``'burnup'``
+            Material burnup [MWd/kg] at each moment.
+
+    """
+
+    def __init__(self, path, material_names=None):
+        """Initializes the SerpentDepletionOutput object.
+
+        """
+        self.path = path
+        if material_names is not None:
+            material_names = set(material_names)
+        zai = None
+        self.days = None
+        self.burnup = None
+        materials = {}
+
+        with open(path, 'r') as f:
+            for line in f:
+                match = _DEP_ASSIGNMENT.match(line)
+                if match is None:
+                    continue
+                name, rest = match.groups()
+                wanted = self._is_wanted(name, material_names)
+                if ']' in rest:
+                    block = [rest.split(']')[0]]
+                else:
+                    block = self._read_block(f, wanted)
+                if not wanted:
+                    continue
+
+                values = _parse_block(block)
+                if name == 'ZAI':
+                    zai = values.ravel().astype(np.int64)
+                elif name == 'DAYS':
+                    self.days = values
+                elif name == 'BU':
+                    self.burnup = values
+                else:
+                    mat_name, variable = name[4:].rsplit('_', 1)
+                    materials.setdefault(mat_name, {})[variable.lower()] = \
+                        values
+
+        if zai is None:
+            raise ValueError(f'{path} does not contain nuclide ZAI codes')
+        # The last two entries are lost data and the total
+        self.zai = zai[:-2]
+        self.materials = {}
+        for mat_name, data in materials.items():
+            mdens = data['mdens']
+            self.materials[mat_name] = {
+                'mdens': mdens[:-2],
+                'density': mdens[-1],
+                'volume': data['volume'],
+                'burnup': data['burnup']}
+
+    @staticmethod
+    def _is_wanted(name, material_names):
+        if name in ('ZAI', 'DAYS', 'BU'):
+            return True
+        if not name.startswith('MAT_'):
+            return False
+        mat_name, _, variable = name[4:].rpartition('_')
+        if variable not in _DEP_MATERIAL_VARIABLES:
+            return False
+        return material_names is None or mat_name in material_names
+
+    @staticmethod
+    def _read_block(f, keep):
+        block = []
+        for line in f:
+            if line.startswith(']'):
+                break
+            if keep:
+                block.append(line)
+        return block
+
+
+def _parse_block(lines):
+    """Convert the lines of a Serpent2 array to a NumPy array with one row
+    per line. Trailing ``% comments`` are dropped."""
+    rows = [line.partition('%')[0] for line in lines]
+    rows = [row for row in rows if row.strip()]
+    values = np.fromstring(' '.join(rows), sep=' ')
+    if len(rows) > 1:
+        values = values.reshape(len(rows), -1)
+    return values
+
+
+def read_out_nuclide_codes(path):
+    """Read the codes of all nuclides with transport or decay data from the
+    nuclide inventory table of a Serpent2 ``*.out`` file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the ``*.out`` file.
+
+    Returns
+    -------
+    nuclide_codes : list of str
+        Nuclide codes in Serpent2 format (e.g. ``92235.09c`` for a nuclide
+        with cross section data or ``982510`` for a decay-only nuclide).
+
+    """
+    nuclide_codes = []
+    with open(path, 'r') as f:
+        for line in f:
+            if _OUT_TABLE_END in line:
+                break
+            if 'c  TRA' in line or 'c  DEC' in line:
+                nuclide_codes.append(line.split()[2])
+    return nuclide_codes
+
+
+class SerpentStepOutput():
+    """Output files of one Serpent2 depletion step, each parsed once.
+
+    The ``*_res.m``, ``*_dep.m`` and ``*.out`` files are parsed concurrently
+    in a thread pool as soon as the object is created. Accessing an
+    attribute waits for the corresponding file only, and any error raised
+    while parsing a file is raised on access.
+
+    Parameters
+    ----------
+    runtime_inputfile : str
+        Path to the Serpent2 input file of the depletion step.
+    material_names : iterable of str, optional
+        Burnable materials to read from the ``*_dep.m`` file. All materials
+        if `None`.
+
+    Attributes
+    ----------
+    key : tuple
+        Input file path, and modification time and size of each output file
+        when parsing started, used to detect a new depletion step.
+    nuclide_names : list of str or None
+        Nuclide names matching ``depletion.zai``, cached by the caller.
+    nuclide_code_maps : dict of str to dict
+        Dictionary mapping ZAID conventions to dictionaries mapping nuclide
+        names to Serpent2 nuclide codes, cached by the caller.
+
+    """
+
+    def __init__(self, runtime_inputfile, material_names=None):
+        """Initializes the SerpentStepOutput object.
+
+        """
+        self.res_file = runtime_inputfile + '_res.m'
+        self.dep_file = runtime_inputfile + '_dep.m'
+        self.out_file = runtime_inputfile + '.out'
+        self.key = self.get_key(runtime_inputfile)
+        self.nuclide_names = None
+        self.nuclide_code_maps = {}
+        if material_names is not None:
+            material_names = list(material_names)
+
+        executor = ThreadPoolExecutor(max_workers=3)
+        self._res = executor.submit(serpentTools.read, self.res_file)
+        self._depletion = executor.submit(SerpentDepletionOutput,
+                                          self.dep_file,
+                                          material_names)
+        self._nuclide_codes = executor.submit(read_out_nuclide_codes,
+                                              self.out_file)
+        # Running tasks still finish; no new threads are kept around
+        executor.shutdown(wait=False)
+
+    @staticmethod
+    def get_key(runtime_inputfile):
+        """Modification time and size of the output files of
+        `runtime_inputfile`.
+
+        Parameters
+        ----------
+        runtime_inputfile : str
+            Path to the Serpent2 input file of the depletion step.
+
+        Returns
+        -------
+        key : tuple
+
+        """
+        key = [runtime_inputfile]
+        for suffix in ('_res.m', '_dep.m', '.out'):
+            try:
+                stat = os.stat(runtime_inputfile + suffix)
+                key.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    @property
+    def res(self):
+        """serpentTools.ResultsReader : Parsed ``*_res.m`` file."""
+        return self._res.result()
+
+    @property
+    def depletion(self):
+        """SerpentDepletionOutput : Burnable material data from the
+        ``*_dep.m`` file."""
+        return self._depletion.result()
+
+    @property
+    def nuclide_codes(self):
+        """list of str : Nuclide codes from the ``*.out`` file."""
+        return self._nuclide_codes.result()
+
+
+class XsdataIndex():
+    """Index of the transport cross section libraries listed in Serpent2
+    ``*.xsdata`` directory files.
+
+    Nuclides are keyed by library suffix (e.g. ``'09c'``, which also
+    identifies the temperature) and ZAM code (``Z * 10000 + A * 10 + m``),
+    taken from the ZA and isomeric state columns of the directory file, so
+    lookups do not depend on the ZAID convention of the library. The index
+    is saved to `cache_path` and reused until a directory file changes.
+
+    Parameters
+    ----------
+    xsdata_paths : list of str
+        Paths to the ``*.xsdata`` directory files, in the order Serpent2
+        searches them.
+    cache_path : str, optional
+        Path to the on-disk cache of the index.
+
+    Attributes
+    ----------
+    libraries : dict of str to dict of int to str
+        Dictionary mapping library suffixes to dictionaries mapping ZAM codes
+        to Serpent2 nuclide codes (e.g. ``'92235.09c'``).
+    temperatures : dict of str to float
+        Dictionary mapping library suffixes to temperatures [K].
+
+    """
+
+    def __init__(self, xsdata_paths, cache_path=None):
+        """Initializes the XsdataIndex object.
+
+        """
+        self.xsdata_paths = [str(path) for path in xsdata_paths]
+        self.cache_path = cache_path
+        key = self._get_key()
+        if not self._load_cache(key):
+            self.libraries = {}
+            self.temperatures = {}
+            for path in self.xsdata_paths:
+                self._read_xsdata(path)
+            self._save_cache(key)
+
+    def _get_key(self):
+        key = []
+        for path in self.xsdata_paths:
+            stat = os.stat(path)
+            key.append([path, stat.st_mtime_ns, stat.st_size])
+        return key
+
+    def _read_xsdata(self, path):
+        with open(path, 'r') as f:
+            for line in f:
+                # alias, name, type, ZA, isomeric state, AW, T, binary, path
+                fields = line.split()
+                if len(fields) < 7 or fields[2] != '1':
+                    continue
+                name = fields[1]
+                suffix = name.partition('.')[2]
+                zam = int(fields[3]) * 10 + int(fields[4])
+                nuclides = self.libraries.setdefault(suffix, {})
+                # Earlier entries take precedence, as in Serpent2
+                nuclides.setdefault(zam, name)
+                self.temperatures.setdefault(suffix, float(fields[6]))
+
+    def _load_cache(self, key):
+        if self.cache_path is None or not os.path.isfile(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cache.get('key') != key:
+            return False
+        self.libraries = {
+            suffix: {int(zam): name for zam, name in nuclides.items()}
+            for suffix, nuclides in cache['libraries'].items()}
+        self.temperatures = cache['temperatures']
+        return True
+
+    def _save_cache(self, key):
+        if self.cache_path is None:
+            return
+        cache = {'key': key,
+                 'libraries': self.libraries,
+                 'temperatures': self.temperatures}
+        tmp_path = f'{self.cache_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def get_nuclide_codes(self, zams, suffix):
+        """Serpent2 nuclide codes of nuclides in library `suffix`.
+
+        Nuclides without cross section data in the library get their
+        decay-only code (the ZAM code as a string, e.g. ``'340831'``).
+
+        Parameters
+        ----------
+        zams : iterable of int
+            ZAM codes (``Z * 10000 + A * 10 + m``).
+        suffix : str
+            Library suffix (e.g. ``'09c'``).
+
+        Returns
+        -------
+        nuc_codes : list of str
+
+        """
+        nuclides = self.libraries.get(suffix, {})
+        return [nuclides.get(zam) or str(zam) for zam in zams]
+
+
+class SerpentRestartFile():
+    """Memory-mapped reader for Serpent2 binary restart files
+    (``set rfw``/``set rfr``).
+
+    A restart file is a sequence of material records. Each record holds the
+    length and characters of the material name, the total burnup, the time,
+    the number of nuclides, the total atomic and mass densities and the
+    material burnup, followed by one (ZAI, atomic density) pair per
+    nuclide. Only the record headers are read when the file is opened; the
+    nuclide data are NumPy views into the memory-mapped file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the restart file.
+
+    Attributes
+    ----------
+    records : list of dict
+        Material records in file order. Each record has the keys ``'name'``,
+        ``'bu'`` (total burnup [MWd/kg]), ``'days'``, ``'adens'`` (total atomic
+        density [1/b-cm]), ``'mdens'`` (total mass density [g/cm^3]),
+        ``'burnup'`` (material burnup [MWd/kg]) and ``'nuclides'`` (structured
+        array with fields ``'zai'`` and ``'adens'``).
+
+    """
+
+    def __init__(self, path):
+        """Initializes the SerpentRestartFile object.
+
+        """
+        self.path = path
+        self.records = []
+        if os.path.getsize(path) == 0:
+            return
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        offset = 0
+        while offset < len(data):
+            name_len = int(data[offset:offset + 8].view('<i8')[0])
+            offset += 8
+            name = data[offset:offset + name_len].tobytes().decode()
+            offset += name_len
+            header = data[offset:offset + _RESTART_HEADER_DTYPE.itemsize]
+            header = header.view(_RESTART_HEADER_DTYPE)[0]
+            offset += _RESTART_HEADER_DTYPE.itemsize
+            n_bytes = int(header['n_nucs']) * RESTART_NUCLIDE_DTYPE.itemsize
+            nuclides = data[offset:offset + n_bytes].view(RESTART_NUCLIDE_DTYPE)
+            offset += n_bytes
+            self.records.append({'name': name,
+                                 'bu': float(header['bu']),
+                                 'days': float(header['days']),
+                                 'adens': float(header['adens']),
+                                 'mdens': float(header['mdens']),
+                                 'burnup': float(header['burnup']),
+                                 'nuclides': nuclides})
+
+    @property
+    def material_names(self):
+        """list of str : Names of the materials in the file."""
+        return list(dict.fromkeys(record['name'] for record in self.records))
+
+    def get_material(self, name, moment=-1):
+        """Get a material record.
+
+        Parameters
+        ----------
+        name : str
+            Material name.
+        moment : int
+            Index among the records of material `name`, in file order
+            (``0`` for the first, ``-1`` for the last).
+
+        Returns
+        -------
+        record : dict
+
+        """
+        records = [record for record in self.records
+                   if record['name'] == name]
+        if not records:
+            raise KeyError(f'Material {name} is not in {self.path}')
+        return records[moment]
+
+    @staticmethod
+    def write(path, records):
+        """Write material records to a restart file.
+
+        The file is written to a temporary file that then replaces `path`.
+
+        Parameters
+        ----------
+        path : str
+            Path to the restart file.
+        records : iterable of dict
+            Material records with the keys listed in :attr:`records`. The
+            ``'nuclides'`` entry may also be a tuple of ZAI and atomic
+            density arrays.
+
+        """
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            for record in records:
+                nuclides = record['nuclides']
+                if isinstance(nuclides, tuple):
+                    zai, adens = nuclides
+                    nuclides = np.empty(len(zai), dtype=RESTART_NUCLIDE_DTYPE)
+                    nuclides['zai'] = zai
+                    nuclides['adens'] = adens
+                name = record['name'].encode()
+                header = np.array((record['bu'],
+                                   record['days'],
+                                   len(nuclides),
+                                   record['adens'],
+                                   record['mdens'],
+                                   record['burnup']),
+                                  dtype=_RESTART_HEADER_DTYPE)
+                f.write(np.int64(len(name)).astype('<i8').tobytes())
+                f.write(name)
+                f.write(header.tobytes())
+                f.write(np.ascontiguousarray(
+                    nuclides, dtype=RESTART_NUCLIDE_DTYPE).tobytes())
+        os.replace(tmp_path, path)
@@ -1,7 +1,50 @@
 import numpy as np
 import tables as tb
 import os
-from collections import OrderedDict
+
+from saltproc import names_to_zams, zams_to_names
+
+
+# Column dtype of the nuclide map shared by all stored compositions
+NUCLIDE_MAP_DTYPE = np.dtype([('zam', np.int64), ('index', np.int64)])
+
+
+def nuclide_name_to_zam(nucname):
+    """Convert a nuclide name (``'Am242_m1'``) to its ZAM code
+    (``Z * 10000 + A * 10 + m``)."""
+    return int(names_to_zams([nucname])[0])
+
+
+def zam_to_nuclide_name(zam):
+    """Convert a ZAM code (``Z * 10000 + A * 10 + m``) to a nuclide
+    name."""
+    return zams_to_names([zam])[0]
+
+
+def read_nuclide_map(node):
+    """Read the nuclide map of a group holding a ``comp`` array.
+
+    Supports the current layout, where the map stores ZAM codes, and the
+    older layout with per-node nuclide name strings.
+
+    Parameters
+    ----------
+    node : tables.Group
+        Group with a ``nuclide_map`` table.
+
+    Returns
+    -------
+    nuclide_map : dict of str to int
+        Dictionary mapping nuclide names to column indices.
+
+    """
+    table = node.nuclide_map
+    indices = table.col('index').tolist()
+    if 'zam' in table.colnames:
+        nuclides = zams_to_names(table.col('zam'))
+    else:
+        nuclides = list(map(bytes.decode, table.col('nuclide')))
+    return dict(zip(nuclides, indices))
 
 
 class Simulation():
@@ -35,6 +78,10 @@ class Simulation():
         drops below 1.0
     compression_params : Pytables filter object
         Compression parameters for HDF5 database.
+    nuclide_capacity : int, optional
+        Number of nuclide columns reserved in the composition arrays of a
+        new database. Defaults to the number of nuclides in the first stored
+        materials. Storing more nuclides widens every array.
 
     """
 
@@ -48,6 +95,7 @@ class Simulation():
             compression_params=tb.Filters(complevel=9,
                                           complib='blosc',
                                           fletcher32=True),
+            nuclide_capacity=None
     ):
         """Initializes the Simulation object.
 
@@ -59,8 +107,96 @@ class Simulation():
         self.restart_flag = restart_flag
         self.adjust_geo = adjust_geo
         self.compression_params = compression_params
-        self.nuclide_indices_dtype = np.dtype([('nuclide', 'S9'),
-                                          ('index', int)])
+        self.nuclide_capacity = nuclide_capacity
+        self._db = None
+        self._k_eds_history = None
+        self._nuclide_axis = None
+
+    def start_session(self):
+        """Open the database once for the rest of the run.
+
+        Until :meth:`end_session` is called, the ``store_*`` methods write
+        through the same file handle, and appended rows are written to disk
+        by :meth:`flush` instead of after each call.
+
+        """
+        if self._db is None or not self._db.isopen:
+            self._db = tb.open_file(
+                self.db_path,
+                mode='a',
+                filters=self.compression_params)
+
+    def flush(self):
+        """Write the rows buffered during the current depletion step to
+        the database."""
+        if self._db is not None and self._db.isopen:
+            self._db.flush()
+
+    def _session_database(self):
+        """Return the session database handle if it is open on
+        :attr:`db_path`, else `None`."""
+        if self._db is not None and self._db.isopen \
+                and self._db.filename == str(self.db_path):
+            return self._db
+        return None
+
+    def end_session(self):
+        """Flush and close the database opened by :meth:`start_session`."""
+        if self._db is not None:
+            if self._db.isopen:
+                self._db.close()
+            self._db = None
+
+    def _open_database(self):
+        """Return the session database handle, or open the database for a
+        single write."""
+        db = self._session_database()
+        if db is not None:
+            return db
+        return tb.open_file(
+            self.db_path,
+            mode='a',
+            filters=self.compression_params)
+
+    def _close_database(self, db):
+        """Close `db` unless it is the session database handle."""
+        if db is not self._db:
+            db.close()
+
+    def _get_k_eds_history(self, db=None):
+        """Multiplication factor at the end of each stored depletion step.
+
+        The history is read from the database once per database path and
+        then kept up to date by :meth:`store_step_neutronics_parameters`.
+
+        Parameters
+        ----------
+        db : tables.File, optional
+            Open database to read the history from.
+
+        Returns
+        -------
+        k_eds : list of numpy.float32
+
+        """
+        if self._k_eds_history is None \
+                or self._k_eds_history[0] != self.db_path:
+            if db is None:
+                db = self._session_database()
+            if db is None:
+                with tb.open_file(self.db_path, mode='r') as read_db:
+                    k_eds = self._read_k_eds(read_db)
+            else:
+                k_eds = self._read_k_eds(db)
+            self._k_eds_history = (self.db_path, k_eds)
+        return self._k_eds_history[1]
+
+    @staticmethod
+    def _read_k_eds(db):
+        """Read the stored `keff` values at the end of each step."""
+        if not hasattr(db.root, 'simulation_parameters'):
+            return []
+        return list(db.root.simulation_parameters.col('keff_eds')[:, 0])
 
     def check_restart(self):
         """If the user set `restart_flag`
@@ -76,6 +212,14 @@ class Simulation():
         failed_step : int
             The depletion step that the simulation failed on.
 
+        Raises
+        ------
+        ValueError
+            If the simulation is restarted from a database written with
+            per-node nuclide maps by SaltProc 0.5 or earlier. Such databases
+            can still be read, but cannot be appended to; rerun the
+            simulation with `restart_flag` set to `False`.
+
         """
         if not self.restart_flag:
             failed_step = 0
@@ -90,12 +234,17 @@ class Simulation():
                 print("Previous run output files were deleted.")
             except OSError as e:
                 pass
+            self.sim_depcode.remove_runtime_exchange_files()
         else:
             db = tb.open_file(
                 self.db_path,
                 mode='r')
-            failed_step = len(db.root.simulation_parameters.col('keff_eds'))
-            db.close()
+            try:
+                self._check_database_layout(db)
+                failed_step = \
+                    len(db.root.simulation_parameters.col('keff_eds'))
+            finally:
+                db.close()
         return failed_step
 
 
@@ -123,10 +272,7 @@ class Simulation():
         """
         if waste_dict is not None:
             streams_description = 'in_out_streams'
-            db = tb.open_file(
-                self.db_path,
-                mode='a',
-                filters=self.compression_params)
+            db = self._open_database()
             for material_name in waste_dict.keys():  # iterate over materials
                 mat_node = getattr(db.root.materials, material_name)
                 if not hasattr(mat_node, streams_description):
@@ -141,176 +287,176 @@ class Simulation():
                         proc_node = db.create_group(waste_group, proc)
                     else:
                         proc_node = getattr(waste_group, proc)
-                    nuclide_indices = []
-                    iso_wt_frac = []
-                    coun = 0
-                    if hasattr(waste_dict[material_name][proc], 'comp'):
-                        # Read isotopes from Materialflow
-                        for nuc, wt_frac in waste_dict[material_name][proc].comp.items():
-                            # Dictonary in format {isotope_name : index(int)}
-                            nuclide_indices.append((nuc, coun))
-                            # Convert wt% to absolute [user units]
-                            iso_wt_frac.append(wt_frac * waste_dict[material_name][proc].mass)
-                            coun += 1
-                        # Try to open EArray and table and if not exist - create
-                        nuclide_indices_array = np.array(nuclide_indices, dtype=self.nuclide_indices_dtype)
-                        if hasattr(proc_node, 'comp'):
-                            earr = db.get_node(proc_node, 'comp')
-                        else:
-                            earr = db.create_earray(
-                                proc_node,
-                                'comp',
-                                atom=tb.Float64Atom(),
-                                shape=(0, len(nuclide_indices_array)),
-                                title="Isotopic composition for %s" % proc)
-                            # Save isotope indexes map and units in EArray attributes
-                            earr.flavor = 'python'
-                        if not hasattr(proc_node, 'nuclide_map'):
-                            db.create_table(proc_node,
-                                           'nuclide_map',
-                                            description=nuclide_indices_array)
-
-                        earr, iso_wt_frac = self._fix_nuclide_discrepancy(db, earr, nuclide_indices, iso_wt_frac)
-
-                        earr.append(np.asarray([iso_wt_frac], dtype=np.float64))
-                        del iso_wt_frac, nuclide_indices
-            db.close()
+                    stream = waste_dict[material_name][proc]
+                    if hasattr(stream, 'comp'):
+                        self._append_composition(
+                            db,
+                            proc_node,
+                            stream.comp,
+                            stream.mass,
+                            "Isotopic composition for %s" % proc)
+            self._close_database(db)
         # Also save materials AFTER reprocessing and refill here
         self.store_mat_data(after_mats, dep_step, True)
 
-    def _fix_nuclide_discrepancy(self, db, earr, nuclide_indices, iso_wt_frac):
-        """Fix discrepancies between nuclide keys present in stored results and
-        nuclides keys stored in results for the current depletion step
+    def _get_nuclide_axis(self, db, n_nucs):
+        """Return the root nuclide map of `db`, creating it if needed, and
+        a dictionary mapping ZAM codes to column indices.
 
         Parameters
         ----------
         db : tables.File
             The SaltProc results database
-        earr : tables.EArray
-            Array storing nuclide material mass compositions from previously
-            completed depletion steps
-        nuclide_indices : OrderedDict
-            Map of nuclide name to array index
-        iso_wt_frac : list of float
-            List storing nuclide material mass compositions for current
-            depletion step.
+        n_nucs : int
+            Number of nuclides about to be stored. Used to size the
+            composition arrays if the nuclide map is created.
 
         Returns
         -------
-        earr : tables.EArray
-            Array storing nuclide material mass compositions from
-            previously completed depletion steps with additional
-            rows for nuclides introduces in iso_wt_frac
-        iso_wt_frac : list of float
-            List storing nuclide material mass compositions for current
-            depletion step with additional entries for nuclides not present
-            in the current depletion step that are stored in earr.
+        nuclide_map : tables.Table
+            Table of ``(zam, index)`` rows shared by every composition array.
+        positions : dict of int to int
+            Column index of each stored nuclide.
+
+        """
+        if not hasattr(db.root, 'nuclide_map'):
+            self._check_database_layout(db)
+            nuclide_map = db.create_table(
+                db.root,
+                'nuclide_map',
+                np.empty(0, dtype=NUCLIDE_MAP_DTYPE),
+                "ZAM code of the nuclide stored in each composition column")
+            nuclide_map.attrs.capacity = self._get_nuclide_capacity(n_nucs)
+        nuclide_map = db.root.nuclide_map
+        cache = self._nuclide_axis
+        if cache is None or cache[0] != self.db_path \
+                or len(cache[1]) != nuclide_map.nrows:
+            positions = dict(zip(nuclide_map.col('zam').tolist(),
+                                 nuclide_map.col('index').tolist()))
+            self._nuclide_axis = (self.db_path, positions)
+        return nuclide_map, self._nuclide_axis[1]
+
+    def _check_database_layout(self, db):
+        """Raise a ValueError if `db` stores compositions with per-node
+        nuclide maps, the layout written by SaltProc 0.5 and earlier."""
+        if not hasattr(db.root, 'nuclide_map') \
+                and hasattr(db.root, 'materials'):
+            raise ValueError(f'{self.db_path} was written with per-node '
+                             'nuclide maps by an older SaltProc version '
+                             'and cannot be appended to. Rerun the '
+                             'simulation with restart_flag set to false.')
+
+    def _get_nuclide_capacity(self, n_nucs):
+        """Number of composition columns to reserve in a new database.
+
+        Uses `nuclide_capacity` if it was given, otherwise `n_nucs`, the
+        number of nuclides in the first stored materials.
         """
+        if self.nuclide_capacity is not None:
+            return int(self.nuclide_capacity)
+        return max(int(n_nucs), 1)
 
-        parent_node = earr._v_parent
-        base_nucs = set(map(bytes.decode, parent_node.nuclide_map.col('nuclide')))
-        iso_idx = dict(nuclide_indices)
-        step_nucs = set(iso_idx.keys())
-        forward_difference = base_nucs.difference(step_nucs)
-        backward_difference = step_nucs.difference(base_nucs)
+    def _get_composition_row(self, db, comp, mass):
+        """Convert a composition to a row over the global nuclide axis,
+        registering nuclides that are not stored yet.
 
-        if len(backward_difference) > 0 or len(forward_difference) > 0:
-            combined_nucs, combined_map, combined_earr, combined_step_arr = \
-                self._add_missing_nuclides(base_nucs, step_nucs, earr, iso_idx, iso_wt_frac)
+        Parameters
+        ----------
+        db : tables.File
+            The SaltProc results database
+        comp : dict of str to float
+            Dictionary mapping nuclide names to their weight fraction.
+        mass : float
+            Total mass [g].
 
-            node_name = earr.name
-            node_title = earr.title
-            parent_node = earr._v_parent
-            # We have to rewrite all the data because EArrays are only extensible in one dimension
-            db.remove_node(earr)
-            earr = db.create_earray(
-                        parent_node,
-                        node_name,
-                        atom=tb.Float64Atom(),
-                        shape=(0, len(combined_nucs)),
-                        title=node_title)
-            # Save isotope indexes map and units in EArray attributes
-            earr.flavor = 'python'
-            #earr.attrs.iso_map = combined_map
-            earr_len = len(combined_earr)
-            for i in range(earr_len):
-                earr.append(np.array([combined_earr[i]]))
-
-            # Reform nuclide_map
-            nuclide_indices = list(zip(combined_map.keys(), combined_map.values()))
-            nuclide_indices_array = np.array(nuclide_indices, dtype=self.nuclide_indices_dtype)
-            db.remove_node(parent_node.nuclide_map)
-            db.create_table(parent_node,
-                            'nuclide_map',
-                            description=nuclide_indices_array)
-        else:
-            combined_step_arr = iso_wt_frac
+        Returns
+        -------
+        row : numpy.ndarray
+            Nuclide masses [g] indexed by the global nuclide axis.
 
-        return earr, combined_step_arr
+        """
+        zams = names_to_zams(comp.keys()).tolist()
+        nuclide_map, positions = self._get_nuclide_axis(db, len(zams))
+        new_zams = sorted(set(zams).difference(positions))
+        if new_zams:
+            start = len(positions)
+            new_rows = np.array(
+                list(zip(new_zams, range(start, start + len(new_zams)))),
+                dtype=NUCLIDE_MAP_DTYPE)
+            nuclide_map.append(new_rows)
+            nuclide_map.flush()
+            positions.update(zip(new_zams,
+                                 range(start, start + len(new_zams))))
+            if len(positions) > nuclide_map.attrs.capacity:
+                self._grow_nuclide_capacity(db, len(positions))
+
+        row = np.zeros(nuclide_map.attrs.capacity)
+        columns = np.array([positions[zam] for zam in zams], dtype=int)
+        values = np.fromiter(comp.values(), dtype=np.float64, count=len(comp))
+        np.add.at(row, columns, values * mass)
+        return row
+
+    def _grow_nuclide_capacity(self, db, n_nucs):
+        """Widen every composition array so it holds at least `n_nucs`
+        columns.
+
+        Only needed if more nuclides appear than the capacity reserved when
+        the database was created. Each array is copied once with zero
+        padding.
 
-    def _add_missing_nuclides(self, base_nucs, step_nucs, earr, iso_idx, iso_wt_frac):
-        """Add missing nuclides to stored results and the results for the
-        current depletion step
+        """
+        nuclide_map = db.root.nuclide_map
+        capacity = max(2 * nuclide_map.attrs.capacity, n_nucs)
+        comp_arrays = [node for node in db.walk_nodes('/', classname='EArray')
+                       if node.name == 'comp']
+        for earr in comp_arrays:
+            parent_node = earr._v_parent
+            data = earr.read()
+            padded = np.zeros((len(data), capacity))
+            padded[:, :np.shape(data)[1] if len(data) else 0] = data
+            new_earr = db.create_earray(
+                parent_node,
+                'comp_resized',
+                atom=tb.Float64Atom(),
+                shape=(0, capacity),
+                title=earr.title)
+            if len(padded):
+                new_earr.append(padded)
+            earr.remove()
+            new_earr.rename('comp')
+        nuclide_map.attrs.capacity = capacity
+
+    def _append_composition(self, db, node, comp, mass, title):
+        """Append a composition row to the ``comp`` array of `node`,
+        creating the array if needed.
 
         Parameters
         ----------
-        base_nucs : set
-            Nuclides present in previous depletion steps
-        step_nucs : set
-            Nuclides present in current depletion step
-        earr : tables.EArray
-            Array storing nuclide material mass compositions from previously
-            completed depletion steps
-        iso_idx : OrderedDict
-            Map of nuclide name to array index
-        iso_wt_frac : list of float
-            List storing nuclide material mass compositions for current
-            depletion step.
+        db : tables.File
+            The SaltProc results database
+        node : tables.Group
+            Group holding the composition array.
+        comp : dict of str to float
+            Dictionary mapping nuclide names to their weight fraction.
+        mass : float
+            Total mass [g].
+        title : str
+            Title of the composition array if it is created.
 
-        Returns
-        -------
-        combined_nucs : numpy.ndarray
-            Nuclide-code sorted union of base_nucs and step_nucs
-        combined_map : OrderedDict
-            Map of nuclide names to array index
-        combined_earr : numpy.ndarray
-            Array storing nuclide material mass compositions from
-            previously completed depletion steps with additional
-            rows for nuclides introduces in iso_wt_frac
-        combined_step_arr : numpy.ndarray
-            Array storing nuclide material mass compositions for current
-            depletion step with additional entries for nuclides not present
-            in the current depletion step that are stored in earr.
         """
-        parent_node = earr._v_parent
-        _nuclides = list(map(bytes.decode, parent_node.nuclide_map.col('nuclide')))
-        _indices = parent_node.nuclide_map.col('index')
-        base_nuclide_map = dict(zip(_nuclides, _indices))
-        combined_nucs = list(base_nucs.union(step_nucs))
-        # Sort the nucnames by ZAM
-        nuclide_codes = list(map(self.sim_depcode.name_to_nuclide_code, combined_nucs))
-        combined_nucs = [nucname for nuclide_code, nucname in sorted(zip(nuclide_codes,combined_nucs))]
-
-        combined_values = np.arange(0, len(combined_nucs), 1).tolist()
-        combined_map = OrderedDict(zip(combined_nucs,combined_values))
-        combined_earr = np.zeros((len(earr), len(combined_map)))
-        combined_step_arr = np.zeros(len(combined_map))
-        earr_len = len(earr)
-        # not efficient, but can't come up with a better way right now
-        for nuc, idx in combined_map.items():
-            if nuc in base_nucs:
-                for i in range(earr_len):
-                    combined_earr[i,idx] = earr[i][base_nuclide_map[nuc]]
-                if nuc in step_nucs:
-                    combined_step_arr[idx] = iso_wt_frac[iso_idx[nuc]]
-                else:
-                    combined_step_arr[idx] = 0.0
-
-            elif nuc in step_nucs:
-                for i in range(earr_len):
-                    combined_earr[i,idx] = 0.0
-                combined_step_arr[idx] = iso_wt_frac[iso_idx[nuc]]
-        return combined_nucs, combined_map, combined_earr, combined_step_arr
+        row = self._get_composition_row(db, comp, mass)
+        if hasattr(node, 'comp'):
+            earr = node.comp
+        else:
+            earr = db.create_earray(
+                node,
+                'comp',
+                atom=tb.Float64Atom(),
+                shape=(0, len(row)),
+                title=title)
+            # Point to the global nuclide map
+            db.create_hard_link(node, 'nuclide_map', db.root.nuclide_map)
+        earr.append(row[np.newaxis, :])
 
     def store_mat_data(self, mats, dep_step, store_at_end=False):
         """Initialize the HDF5/Pytables database (if it doesn't exist) or
@@ -318,6 +464,10 @@ class Simulation():
         database: burnable material composition, mass, density, volume,
         burnup,  mass_flowrate, void_fraction.
 
+        Compositions are stored as masses [g] over a nuclide axis shared by
+        all materials and waste streams (``/nuclide_map``), which maps each
+        column to the nuclide ZAM code (``Z * 10000 + A * 10 + m``).
+
         Parameters
         ----------
         mats : dict of str to Materialflow
@@ -356,101 +506,69 @@ class Simulation():
         print(
             '\nStoring material data for depletion step #%i.' %
             (dep_step + 1))
-        db = tb.open_file(
-            self.db_path,
-            mode='a',
-            filters=self.compression_params)
+        db = self._open_database()
+        # Create the nuclide axis before any material is stored, wide enough
+        # for the nuclides of all of them
+        if not hasattr(db.root, 'nuclide_map'):
+            self._get_nuclide_axis(
+                db, len(set().union(*(mat.comp for mat in mats.values()))))
         if not hasattr(db.root, 'materials'):
-            comp_group = db.create_group('/',
-                                         'materials',
-                                         'Material data')
+            db.create_group('/',
+                            'materials',
+                            'Material data')
+        comp_group = db.root.materials
         # Iterate over all materials
         for key, value in mats.items():
-            nuclide_indices = []
-            iso_wt_frac = []
-            coun = 0
             # Create group for each material
-            if not hasattr(db.root.materials, key):
+            if not hasattr(comp_group, key):
                 db.create_group(comp_group,
                                 key)
             # Create group for composition and parameters before reprocessing
-            mat_node = getattr(db.root.materials, key)
+            mat_node = getattr(comp_group, key)
             if not hasattr(mat_node, dep_step_str[0]):
                 db.create_group(mat_node,
                                 dep_step_str[0],
                                 'Material data {dep_step_str[1]} reprocessing')
-            comp_pfx = '/materials/' + str(key) + '/' + dep_step_str[0]
-            # Order the nucnames by ZAM
-            nuclide_codes = list(map(self.sim_depcode.name_to_nuclide_code, mats[key].comp.keys()))
-            ordered_nucs = [nucname for nuclide_code, nucname in sorted(zip(nuclide_codes,mats[key].comp.keys()))]
-            # Read isotopes from Materialflow for material
-            for nuc in ordered_nucs:
-                wt_frac = mats[key].comp[nuc]
-                # Dictonary in format {isotope_name : index(int)}
-                nuclide_indices.append((nuc, coun))
-                # Convert wt% to total mass [g]
-                iso_wt_frac.append(wt_frac * mats[key].mass)
-                coun += 1
-            nuclide_indices_array = np.array(nuclide_indices,
-                                             dtype=self.nuclide_indices_dtype)
+            step_node = getattr(mat_node, dep_step_str[0])
             # Store information about material properties in new array row
             mpar_row = (
-                mats[key].mass,
-                mats[key].get_density(),
-                mats[key].volume,
-                mats[key].mass_flowrate,
-                mats[key].void_frac,
-                mats[key].burnup
+                value.mass,
+                value.get_density(),
+                value.volume,
+                value.mass_flowrate,
+                value.void_frac,
+                value.burnup
             )
             mpar_array = np.array([mpar_row], dtype=mpar_dtype)
-            # Try to open EArray and table and if not exist - create new one
-            try:
-                earr = db.get_node(comp_pfx, 'comp')
-                print(str(earr.title) + ' array exist, appending data.')
-                mpar_table = db.get_node(comp_pfx, 'parameters')
-            except Exception:
-                print(
-                    'Material ' +
-                    key +
-                    ' array is not exist, making new one.')
-                earr = db.create_earray(
-                    comp_pfx,
-                    'comp',
-                    atom=tb.Float64Atom(),
-                    shape=(0, len(nuclide_indices_array)),
-                    title="Isotopic composition for %s" % key)
-                # Save isotope indexes map and units in EArray attributes
-                earr.flavor = 'python'
-                # Create table for material Parameters
-                print('Creating ' + key + ' lookup table.')
-                db.create_table(comp_pfx,
-                                'nuclide_map',
-                                description=nuclide_indices_array)
+            if hasattr(step_node, 'parameters'):
+                mpar_table = step_node.parameters
+            else:
                 print('Creating ' + key + ' parameters table.')
                 mpar_table = db.create_table(
-                    comp_pfx,
+                    step_node,
                     'parameters',
                     np.empty(0, dtype=mpar_dtype),
                     title="Material parameters data")
             print('Dumping Material %s data %s to %s.' %
                   (key, dep_step_str[0], os.path.abspath(self.db_path)))
 
-            earr, iso_wt_frac = self._fix_nuclide_discrepancy(db, earr, nuclide_indices, iso_wt_frac)
-
             # Add row for the timestep to EArray and Material Parameters table
-            earr.append(np.array([iso_wt_frac], dtype=np.float64))
+            self._append_composition(db,
+                                     step_node,
+                                     value.comp,
+                                     value.mass,
+                                     "Isotopic composition for %s" % key)
             mpar_table.append(mpar_array)
-            del (iso_wt_frac)
             del (mpar_array)
-            mpar_table.flush()
-        db.close()
+        self._close_database(db)
 
     def store_step_neutronics_parameters(self):
         """Adds the following depletion code and SaltProc simulation
         data at the current depletion step to the database:
         execution time, memory usage, multiplication factor, breeding ratio,
         delayed neutron precursor data, fission mass, cumulative depletion
-        time, power level.
+        time, power level. Quantities that were not tallied in the current
+        depletion step are stored as NaN.
         """
 
         # Read info from depcode _res.m File
@@ -473,10 +591,7 @@ class Simulation():
             fission_mass_bds = tb.Float32Col()
             fission_mass_eds = tb.Float32Col()
         # Open or restore db and append data to it
-        db = tb.open_file(
-            self.db_path,
-            mode='a',
-            filters=self.compression_params)
+        db = self._open_database()
         try:
             step_info_table = db.get_node(
                 db.root,
@@ -492,6 +607,7 @@ class Simulation():
             # Intializing burn_time array at the first depletion step
             self.burn_time = 0.0
         self.burn_time += self.sim_depcode.neutronics_parameters['burn_days']
+        k_eds_history = self._get_k_eds_history(db)
         # Define row of table as step_info
         step_info = step_info_table.row
         # Define all values in the row
@@ -519,8 +635,9 @@ class Simulation():
 
         # Inject the Record value into the table
         step_info.append()
-        step_info_table.flush()
-        db.close()
+        k_eds_history.append(np.float32(
+            self.sim_depcode.neutronics_parameters['keff_eds'][0]))
+        self._close_database(db)
 
     def store_depcode_metadata(self):
         """Adds the following depletion code and SaltProc simulation parameters
@@ -556,10 +673,7 @@ class Simulation():
         depcode_metadata_array = np.array([depcode_metadata_row], dtype=depcode_metadata_dtype)
 
         # Open or restore db and append datat to it
-        db = tb.open_file(
-            self.db_path,
-            mode='a',
-            filters=self.compression_params)
+        db = self._open_database()
         try:
             depcode_metadata_table = db.get_node(db.root, 'depcode_metadata')
         except Exception:
@@ -568,8 +682,7 @@ class Simulation():
                 'depcode_metadata',
                 depcode_metadata_array,
                 "Depletion code metadata")
-        depcode_metadata_table.flush()
-        db.close()
+        self._close_database(db)
 
     def store_step_metadata(self):
         """Adds the following depletion code and SaltProc simulation parameters
@@ -610,10 +723,7 @@ class Simulation():
         step_metadata_array = np.array([step_metadata_row], dtype=step_metadata_dtype)
 
         # Open or restore db and append datat to it
-        db = tb.open_file(
-            self.db_path,
-            mode='a',
-            filters=self.compression_params)
+        db = self._open_database()
         try:
             step_metadata_table = db.get_node(db.root, 'depletion_step_metadata')
         except Exception:
@@ -624,8 +734,7 @@ class Simulation():
                 "Depletion step metadata")
 
         step_metadata_table.append(step_metadata_array)
-        step_metadata_table.flush()
-        db.close()
+        self._close_database(db)
 
     def read_k_eds_delta(self, current_timestep):
         """Reads from database delta between previous and current `keff` at the
@@ -645,11 +754,12 @@ class Simulation():
         """
 
         if current_timestep > 3 or self.restart_flag:
-            # Open or restore db and read data
-            db = tb.open_file(self.db_path, mode='r')
-            sim_param = db.root.simulation_parameters
-            k_eds = np.array([x['keff_eds'][0] for x in sim_param.iterrows()])
-            db.close()
+            k_eds = np.array(self._get_k_eds_history())
+            # Steps depleted without transport have no keff
+            k_eds = k_eds[~np.isnan(k_eds)]
+            # Too few transport solves to average the last three keff drops
+            if len(k_eds) < 5:
+                return False
             delta_keff = np.diff(k_eds)
             avrg_keff_drop = abs(np.mean(delta_keff[-4:-1]))
             print("Average keff drop per step ", avrg_keff_drop)
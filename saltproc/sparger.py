@@ -1,6 +1,6 @@
 """Sparger module"""
 import numpy as np
-from saltproc import Process
+from saltproc import Process, compile_expression
 
 
 class Sparger(Process):
@@ -119,6 +119,7 @@ class Sparger(Process):
         """ Initializes the Sparger object.
 
         """
+        self._eff_cache = {}
         super().__init__(*initial_data, **kwargs)
         self.q_salt = q_salt
         self.q_he = q_he
@@ -181,21 +182,31 @@ class Sparger(Process):
 
         return plt_dict
 
-    def eps(self, h_const, kl_const):
+    def eps(self, h_const, kl_const, q_salt=None, q_he=None, length=None,
+            db=None, temp_salt=None, area=None):
         """Evaluates gas removal efficiency using Eq. 4
         from Peebles report (ORNL-TM-2245).
 
+        Parameters left as `None` take the value of the matching attribute.
+
         Returns
         -------
-        efficiency : float
+        efficiency : float or numpy.ndarray
             removal efficiency of a specific chemical element.
 
         """
-        a = (6 / self.db) * (self.q_he / (self.q_he + self.q_salt))
-        alpha = (self.gas_const * self.temp_salt / h_const) *\
-                (self.q_salt / self.q_he)
-        beta = (kl_const * a * self.area *
-                self.length * (1 + alpha)) / self.q_salt
+        q_salt = self.q_salt if q_salt is None else q_salt
+        q_he = self.q_he if q_he is None else q_he
+        length = self.length if length is None else length
+        db = self.db if db is None else db
+        temp_salt = self.temp_salt if temp_salt is None else temp_salt
+        area = self.area if area is None else area
+
+        a = (6 / db) * (q_he / (q_he + q_salt))
+        alpha = (self.gas_const * temp_salt / h_const) *\
+                (q_salt / q_he)
+        beta = (kl_const * a * area *
+                length * (1 + alpha)) / q_salt
 
         return (1 - np.exp(-beta)) / (1 + alpha)
 
@@ -212,7 +223,8 @@ class Sparger(Process):
 
         return sh_corr
 
-    def eff(self):
+    def eff(self, q_salt=None, q_he=None, length=None, dp=None, db=None,
+            temp_salt=None):
         """Evaluates gas removal efficiencies for target isotopes.
         In this function, vl, mu, rho, number_sh, number_sc, number_re and kl
         are average liquid velocity (m/s), kinematic viscosity (Pa.s),
@@ -220,9 +232,30 @@ class Sparger(Process):
         schmidt number, reynold number and liquid phase mass transfer
         coefficient (m/s), respectively.
 
+        Parameters left as `None` take the value of the matching attribute.
+        Any parameter may be an array, in which case the efficiencies are
+        evaluated over the broadcast parameter grid. Results for scalar
+        parameters are cached.
+
+        Parameters
+        ----------
+        q_salt : float or array_like, optional
+            volumetric salt flow rate (m^3/s)
+        q_he : float or array_like, optional
+            volumetric helium flow rate (m^3/s)
+        length : float or array_like, optional
+            sparger/contractor length (m)
+        dp : float or array_like, optional
+            sparger/contractor (pipe) diameter (m). The cross-section is
+            recomputed when given.
+        db : float or array_like, optional
+            bubble diameter (m)
+        temp_salt : float or array_like, optional
+            salt temperature (K)
+
         Returns
         -------
-        rem_eff : dict of str to float
+        rem_eff : dict of str to float or numpy.ndarray
             Dictionary containing removal efficiency of each target isotope.
 
             ``key``
@@ -230,23 +263,52 @@ class Sparger(Process):
             ``value``
                 removal efficiency.
         """
+        q_salt = self.q_salt if q_salt is None else q_salt
+        q_he = self.q_he if q_he is None else q_he
+        length = self.length if length is None else length
+        db = self.db if db is None else db
+        temp_salt = self.temp_salt if temp_salt is None else temp_salt
+        if dp is None:
+            dp = self.dp
+            area = self.area
+        else:
+            area = np.pi * (np.asarray(dp) / 2) ** 2
+
+        params = (q_salt, q_he, length, dp, db, temp_salt, area)
+        key = None
+        if all(np.ndim(p) == 0 for p in params):
+            key = tuple(float(p) for p in params) + (
+                self.corr, self.diffusivity, self.gas_const, self.temp_room,
+                tuple(sorted(self.h_const.items())),
+                tuple(sorted(self.exp_const.items())))
+            if key in self._eff_cache:
+                return dict(self._eff_cache[key])
+        else:
+            params = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64)
+                                           for p in params))
+            q_salt, q_he, length, dp, db, temp_salt, area = params
+
         hh = {}
-        for key in self.h_const:
-            hh[key] = 1 / (self.h_const[key] *
-                           np.exp(self.exp_const[key] * (1 / self.temp_salt -
+        for nuc in self.h_const:
+            hh[nuc] = 1 / (self.h_const[nuc] *
+                           np.exp(self.exp_const[nuc] * (1 / temp_salt -
                                                          1 / self.temp_room)))
 
-        mu = 1.076111581e-2 * (self.temp_salt / 1000)**(-4.833549134)
-        rho = (6.105 - 0.001272 * self.temp_salt) * 1000
+        mu = 1.076111581e-2 * (temp_salt / 1000)**(-4.833549134)
+        rho = (6.105 - 0.001272 * temp_salt) * 1000
         nu = mu / rho
-        vl = self.q_salt / self.area
-        number_re = self.dp * vl / nu
+        vl = q_salt / area
+        number_re = dp * vl / nu
         number_sc = nu / self.diffusivity
-        number_sh = eval(self.sherwood()[self.corr],
-                         {'number_sc': number_sc, 'number_re': number_re})
-        kl = number_sh * self.diffusivity / self.dp
-        rem_eff = {key: self.eps(hh[key], kl) for key in self.h_const}
-
+        number_sh = compile_expression(self.sherwood()[self.corr])(
+            number_sc=number_sc, number_re=number_re)
+        kl = number_sh * self.diffusivity / dp
+        rem_eff = {nuc: self.eps(hh[nuc], kl, q_salt, q_he, length, db,
+                                 temp_salt, area)
+                   for nuc in self.h_const}
+
+        if key is not None:
+            self._eff_cache[key] = dict(rem_eff)
         return rem_eff
 
 
@@ -0,0 +1,335 @@
+"""ZAID module"""
+from functools import lru_cache
+
+import numpy as np
+import openmc.data
+
+
+ZAID_CONVENTIONS = ('serpent', 'mcnp', 'nndc')
+# Bounds of the nuclide name table
+_MAX_A = 300
+_MAX_M = 4
+
+
+@lru_cache(maxsize=None)
+def _name_table():
+    """Nuclide names indexed by ``[Z, A, m]``, built on first use."""
+    max_z = max(openmc.data.ATOMIC_SYMBOL)
+    table = np.empty((max_z + 1, _MAX_A, _MAX_M), dtype=object)
+    for Z in range(1, max_z + 1):
+        symbol = openmc.data.ATOMIC_SYMBOL[Z]
+        for A in range(_MAX_A):
+            table[Z, A, 0] = f'{symbol}{A}'
+            for m in range(1, _MAX_M):
+                table[Z, A, m] = f'{symbol}{A}_m{m}'
+    return table
+
+
+@lru_cache(maxsize=None)
+def _zam_table():
+    """Dictionary mapping nuclide names to ZAM codes
+    (``Z * 10000 + A * 10 + m``), built on first use."""
+    table = _name_table()
+    Z, A, m = np.nonzero(table != None)
+    return dict(zip(table[Z, A, m], (Z * 10000 + A * 10 + m).tolist()))
+
+
+def names_to_zams(names):
+    """Convert nuclide names (``'Am242_m1'``) to ZAM codes
+    (``Z * 10000 + A * 10 + m``).
+
+    Parameters
+    ----------
+    names : iterable of str
+        Nuclide names.
+
+    Returns
+    -------
+    zams : numpy.ndarray
+
+    """
+    table = _zam_table()
+    zams = []
+    for name in names:
+        zam = table.get(name)
+        if zam is None:
+            Z, A, m = openmc.data.zam(name)
+            zam = Z * 10000 + A * 10 + m
+        zams.append(zam)
+    return np.array(zams, dtype=np.int64)
+
+
+def zams_to_names(zams):
+    """Convert ZAM codes (``Z * 10000 + A * 10 + m``) to nuclide names.
+
+    Parameters
+    ----------
+    zams : array_like of int
+        ZAM codes. Decay-only nuclide codes in Serpent2 output use the same
+        format.
+
+    Returns
+    -------
+    names : list of str
+
+    """
+    zams = np.asarray(zams, dtype=np.int64)
+    return zam_to_names(zams // 10000, (zams // 10) % 1000, zams % 10)
+
+
+def zam_to_names(Z, A, m):
+    """Convert arrays of atomic numbers, mass numbers and isomeric states to
+    nuclide names.
+
+    Parameters
+    ----------
+    Z, A, m : array_like of int
+        Atomic numbers, mass numbers and isomeric states.
+
+    Returns
+    -------
+    names : list of str
+
+    """
+    Z, A, m = np.broadcast_arrays(*(np.asarray(x, dtype=np.int64)
+                                    for x in (Z, A, m)))
+    table = _name_table()
+    in_table = (Z > 0) & (Z < table.shape[0]) & (A >= 0) & (A < _MAX_A) \
+        & (m >= 0) & (m < _MAX_M)
+    names = np.empty(Z.shape, dtype=object)
+    names[in_table] = table[Z[in_table], A[in_table], m[in_table]]
+    for idx in zip(*np.nonzero(~in_table)):
+        name = openmc.data.gnds_name(int(Z[idx]), int(A[idx]), m=int(m[idx]))
+        if m[idx] != 0:
+            name = name[:-3] + f'_m{m[idx]}'
+        names[idx] = name
+    return names.tolist()
+
+
+@lru_cache(maxsize=None)
+def _atomic_mass(zam):
+    """Atomic mass [amu] of the nuclide with ZAM code `zam`, or its mass
+    number if OpenMC has no mass data for it."""
+    name = zams_to_names([zam])[0]
+    try:
+        return openmc.data.atomic_mass(name)
+    except KeyError:
+        return float((zam // 10) % 1000)
+
+
+def atomic_masses(zams):
+    """Atomic masses of nuclides given by ZAM codes.
+
+    Parameters
+    ----------
+    zams : array_like of int
+        ZAM codes (``Z * 10000 + A * 10 + m``).
+
+    Returns
+    -------
+    masses : numpy.ndarray
+        Atomic masses [amu].
+
+    """
+    return np.array([_atomic_mass(int(zam)) for zam in np.ravel(zams)],
+                    dtype=np.float64).reshape(np.shape(zams))
+
+
+class ZaidTable():
+    """Translation between nuclide names and ZAID codes for one ZAID
+    convention.
+
+    All conversions accept scalars or arrays and are evaluated with NumPy
+    array operations. Nuclide names are looked up in a table that is built
+    once and shared by all conventions.
+
+    Parameters
+    ----------
+    zaid_convention : str
+        ZAID naming convention for nuclide codes.
+
+        'serpent' - The third digit in ZA for nuclides in isomeric states
+        is 3 (e.g. 47310 for for Ag-110m).
+
+        'mcnp' - ZA = Z*1000 + A + (300 + 100*m). where m is the mth
+        isomeric state (e.g. 47510 for Ag-110m)
+
+        'nndc' - Identical to 'mcnp', except Am242m1 is 95242 and Am242
+        is 95642
+
+    """
+
+    def __init__(self, zaid_convention):
+        """Initializes the ZaidTable object.
+
+        """
+        if zaid_convention not in ZAID_CONVENTIONS:
+            raise ValueError(f'Unknown ZAID convention: {zaid_convention}')
+        self.zaid_convention = zaid_convention
+
+    def _swap_am242(self, za):
+        if self.zaid_convention != 'nndc':
+            return za
+        return np.where(za == 95242, 95642, np.where(za == 95642, 95242, za))
+
+    def zaid_to_zam(self, za):
+        """Split ZA codes of nuclides with cross section data
+        (the part of ``92235.09c`` before the dot) into ``(Z, A, m)``.
+
+        Parameters
+        ----------
+        za : int or array_like of int
+            ZA codes.
+
+        Returns
+        -------
+        Z, A, m : numpy.ndarray
+            Atomic numbers, mass numbers and isomeric states.
+
+        """
+        za = self._swap_am242(np.asarray(za, dtype=np.int64))
+        Z = za // 1000
+        A = za % 1000
+        if self.zaid_convention == 'serpent':
+            m = (A > 300).astype(np.int64)
+            A = A - m * np.where(Z > 76, 100, 200)
+        else:
+            # Assumes only m=1 metastable states
+            m = (A > 400).astype(np.int64)
+            A = A - 400 * m
+        return Z, A, m
+
+    def zam_to_zaid(self, Z, A, m):
+        """Combine ``(Z, A, m)`` into ZA codes.
+
+        Parameters
+        ----------
+        Z, A, m : int or array_like of int
+            Atomic numbers, mass numbers and isomeric states.
+
+        Returns
+        -------
+        za : numpy.ndarray
+            ZA codes.
+
+        """
+        Z, A, m = (np.asarray(x, dtype=np.int64) for x in (Z, A, m))
+        za = Z * 1000 + A
+        if self.zaid_convention == 'serpent':
+            za = za + (m != 0) * np.where(Z > 76, 100, 200)
+        else:
+            za = za + (m != 0) * (300 + 100 * m)
+        return self._swap_am242(za)
+
+    @staticmethod
+    def decay_code_to_zam(zai):
+        """Split decay-only nuclide codes (``Z * 10000 + A * 10 + m``, e.g.
+        ``471101``) into ``(Z, A, m)``.
+
+        Parameters
+        ----------
+        zai : int or array_like of int
+            Decay-only nuclide codes.
+
+        Returns
+        -------
+        Z, A, m : numpy.ndarray
+            Atomic numbers, mass numbers and isomeric states.
+
+        """
+        zai = np.asarray(zai, dtype=np.int64)
+        return zai // 10000, (zai // 10) % 1000, zai % 10
+
+    def codes_to_zam(self, nuc_codes):
+        """Convert Serpent2 nuclide codes to ``(Z, A, m)``.
+
+        Parameters
+        ----------
+        nuc_codes : str or int or array_like
+            Nuclide codes in Serpent2 format. Codes with a dot
+            (``'47310.09c'``) have cross section data and follow the ZAID
+            convention; other codes (``'471101'``) are decay-only codes.
+
+        Returns
+        -------
+        Z, A, m : numpy.ndarray
+            Atomic numbers, mass numbers and isomeric states.
+
+        """
+        codes = np.asarray(nuc_codes)
+        if codes.size == 0 or codes.dtype.kind in 'iu':
+            return self.decay_code_to_zam(codes)
+        codes = np.char.partition(codes.astype(str), '.')
+        number = codes[..., 0].astype(np.int64)
+        has_xs = codes[..., 1] == '.'
+        Z, A, m = self.decay_code_to_zam(number)
+        Z_xs, A_xs, m_xs = self.zaid_to_zam(number)
+        return (np.where(has_xs, Z_xs, Z),
+                np.where(has_xs, A_xs, A),
+                np.where(has_xs, m_xs, m))
+
+    def codes_to_names(self, nuc_codes):
+        """Convert Serpent2 nuclide codes to nuclide names (``'Am242_m1'``).
+
+        Parameters
+        ----------
+        nuc_codes : array_like
+            Nuclide codes in Serpent2 format.
+
+        Returns
+        -------
+        names : list of str
+
+        """
+        return zam_to_names(*self.codes_to_zam(nuc_codes))
+
+    def codes_to_sort_keys(self, nuc_codes):
+        """ZAM codes (``Z * 10000 + A * 10 + m``) of Serpent2 nuclide codes,
+        which sort nuclides by Z, then A, then m.
+
+        Parameters
+        ----------
+        nuc_codes : array_like
+            Nuclide codes in Serpent2 format.
+
+        Returns
+        -------
+        keys : numpy.ndarray
+
+        """
+        Z, A, m = self.codes_to_zam(nuc_codes)
+        return Z * 10000 + A * 10 + m
+
+    def names_to_codes(self, names):
+        """Convert nuclide names to ZA codes.
+
+        Parameters
+        ----------
+        names : iterable of str
+            Nuclide names.
+
+        Returns
+        -------
+        za : numpy.ndarray
+            ZA codes.
+
+        """
+        zams = names_to_zams(names)
+        return self.zam_to_zaid(*self.decay_code_to_zam(zams))
+
+
+@lru_cache(maxsize=None)
+def get_zaid_table(zaid_convention):
+    """Return the shared :class:`ZaidTable` for `zaid_convention`.
+
+    Parameters
+    ----------
+    zaid_convention : str
+        ZAID naming convention for nuclide codes.
+
+    Returns
+    -------
+    ZaidTable
+
+    """
+    return ZaidTable(zaid_convention)
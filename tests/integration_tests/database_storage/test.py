@@ -5,6 +5,7 @@ import pytest
 import numpy as np
 import tables as tb
 
+from saltproc import read_nuclide_map
 from saltproc.app import reprocess_materials, refill_materials
 
 
@@ -15,9 +16,7 @@ def db_file(simulation):
     return str(db_file.resolve())
 
 def _create_nuclide_map(node):
-    nuclides = list(map(bytes.decode, node.nuclide_map.col('nuclide')))
-    indices = node.nuclide_map.col('index')
-    return dict(zip(nuclides, indices))
+    return read_nuclide_map(node)
 
 def test_store_after_reprocessing(
         simulation,
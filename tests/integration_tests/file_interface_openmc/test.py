@@ -51,6 +51,27 @@ def test_write_runtime_input(setup, openmc_depcode, openmc_reactor):
     openmc_depcode.geo_file_paths[0] = initial_geometry_file
 
 
+def test_write_runtime_input_unchanged_files(setup, openmc_depcode, openmc_reactor):
+    initial_geometry_file = openmc_depcode.geo_file_paths[0]
+    openmc_depcode.write_runtime_input(openmc_reactor,
+                                        0,
+                                        False)
+    runtime_files = (openmc_depcode.runtime_matfile,
+                     openmc_depcode.runtime_inputfile['geometry'],
+                     openmc_depcode.runtime_inputfile['settings'],
+                     openmc_depcode.runtime_inputfile['tallies'])
+    mtimes = [os.stat(path).st_mtime_ns for path in runtime_files]
+
+    # The in-memory model did not change, so no file is written again
+    openmc_depcode.write_runtime_input(openmc_reactor,
+                                        1,
+                                        False)
+    assert [os.stat(path).st_mtime_ns for path in runtime_files] == mtimes
+
+    openmc_depcode.geo_file_paths *= 2
+    openmc_depcode.geo_file_paths[0] = initial_geometry_file
+
+
 def test_update_depletable_materials(setup, openmc_depcode, openmc_reactor):
     initial_geometry_file = openmc_depcode.geo_file_paths[0]
     # write_runtime_input
@@ -0,0 +1,78 @@
+"""Deplete with the reaction rates of a transport solve"""
+from pathlib import Path
+
+import numpy as np
+import pytest
+import openmc
+import openmc.deplete as od
+
+from saltproc import OpenMCDepletionArrays, independent_operator
+
+
+@pytest.fixture
+def setup(scope='module'):
+    path = Path(__file__).parents[1] / 'run_no_reprocessing_openmc'
+    chain_file = str(Path(__file__).parents[2] / 'openmc_data' /
+                     'chain_simple.xml')
+    return path, chain_file
+
+
+def _load_materials(path):
+    return openmc.Materials.from_xml(path / 'materials.xml')
+
+
+def _deplete(operator, directory, monkeypatch):
+    monkeypatch.chdir(directory)
+    integrator = od.PredictorIntegrator(operator,
+                                        [3],
+                                        power=174,
+                                        timestep_units='d')
+    integrator.integrate(final_step=False)
+    return OpenMCDepletionArrays(directory / 'depletion_results.h5')
+
+
+def test_independent_step_matches_transport_step(setup, tmp_path,
+                                                 monkeypatch):
+    path, chain_file = setup
+    coupled_path = tmp_path / 'coupled'
+    independent_path = tmp_path / 'independent'
+    coupled_path.mkdir()
+    independent_path.mkdir()
+
+    materials = _load_materials(path)
+    geometry = openmc.Geometry.from_xml(path / 'pincell_geometry.xml',
+                                        materials=materials)
+    settings = openmc.Settings.from_xml(path / 'pincell_settings.xml')
+    model = openmc.model.Model(materials=materials,
+                               geometry=geometry,
+                               settings=settings)
+    operator = od.CoupledOperator(model,
+                                  chain_file=chain_file,
+                                  normalization_mode='fission-q')
+    coupled = _deplete(operator, coupled_path, monkeypatch)
+    microxs_path = tmp_path / 'microxs.npz'
+    coupled.write_reaction_rates(microxs_path, 0)
+
+    # Same compositions, depleted with the reaction rates at the beginning
+    # of the transport step
+    materials = {material.id: material
+                 for material in _load_materials(path) if material.depletable}
+    operator = independent_operator(materials,
+                                    microxs_path,
+                                    {'chain_file': chain_file})
+    independent = _deplete(operator, independent_path, monkeypatch)
+
+    assert independent.material_ids == coupled.material_ids
+    nuclides = [nuc for nuc in coupled.nuclides
+                if nuc in independent.nuclides]
+    coupled_idx = [coupled.nuclides.index(nuc) for nuc in nuclides]
+    independent_idx = [independent.nuclides.index(nuc) for nuc in nuclides]
+    coupled_atoms = coupled.get_atoms(1)[:, coupled_idx]
+    independent_atoms = independent.get_atoms(1)[:, independent_idx]
+    # Nuclides with a meaningful inventory
+    significant = coupled_atoms > 1e-10 * coupled_atoms.max()
+    np.testing.assert_allclose(independent_atoms[significant],
+                               coupled_atoms[significant],
+                               rtol=1e-3)
+    np.testing.assert_allclose(independent.source_rate[0],
+                               coupled.source_rate[0])
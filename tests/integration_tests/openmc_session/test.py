@@ -0,0 +1,46 @@
+"""Run several depletion steps in one in-process OpenMC session"""
+from pathlib import Path
+
+import pytest
+import openmc
+import openmc.lib
+
+from saltproc import OpenMCDepletionSession
+
+
+@pytest.fixture
+def setup(scope='module'):
+    path = Path(__file__).parents[1] / 'run_no_reprocessing_openmc'
+    chain_file = str(Path(__file__).parents[2] / 'openmc_data' /
+                     'chain_simple.xml')
+    return path, chain_file
+
+
+def test_run_step_reuses_tallies(setup, tmp_path):
+    path, chain_file = setup
+    tallies_path = tmp_path / 'tallies.xml'
+    openmc.Tallies().export_to_xml(tallies_path)
+    session = OpenMCDepletionSession(path / 'materials.xml',
+                                     path / 'pincell_geometry.xml',
+                                     path / 'pincell_settings.xml',
+                                     tallies_path,
+                                     tmp_path,
+                                     {'chain_file': chain_file,
+                                      'normalization_mode': 'fission-q'})
+    try:
+        # The model is written to the session directory before openmc.lib
+        # is initialized from it
+        for name in ('materials.xml', 'geometry.xml', 'settings.xml'):
+            assert (tmp_path / name).exists()
+        n_tallies = []
+        for _ in range(2):
+            session.run_step([1],
+                             final_step=False,
+                             output=False,
+                             power=174,
+                             timestep_units='d')
+            n_tallies.append(len(openmc.lib.tallies))
+        assert n_tallies[0] > 0
+        assert n_tallies[1] == n_tallies[0]
+    finally:
+        session.close()
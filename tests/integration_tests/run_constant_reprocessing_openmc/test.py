@@ -12,10 +12,10 @@ import pytest
 import tables as tb
 import subprocess
 
+from saltproc import read_nuclide_map
+
 def _create_nuclide_map(node):
-    nuclides = list(map(bytes.decode, node.nuclide_map.col('nuclide')))
-    indices = node.nuclide_map.col('index')
-    return dict(zip(nuclides, indices))
+    return read_nuclide_map(node)
 
 
 @pytest.fixture
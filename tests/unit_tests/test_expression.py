@@ -0,0 +1,30 @@
+"""Test EfficiencyExpression functions"""
+import numpy as np
+import pytest
+
+from saltproc import EfficiencyExpression, compile_expression
+
+
+def test_efficiency_expression():
+    expression = EfficiencyExpression('0.9*(1-exp(-t/tau)) + 0*volume')
+    assert expression.variables == {'t', 'tau', 'volume'}
+    np.testing.assert_allclose(expression(t=1.0, tau=1.0, volume=2.0),
+                               0.9 * (1 - np.exp(-1.0)))
+    t = np.array([0.0, 1.0, 2.0])
+    np.testing.assert_allclose(expression(t=t, tau=1.0, volume=2.0),
+                               0.9 * (1 - np.exp(-t)))
+    with pytest.raises(NameError):
+        expression(t=1.0)
+
+    assert compile_expression('2*x') is compile_expression('2*x')
+
+
+@pytest.mark.parametrize('expression', [
+    '__import__("os").system("ls")',
+    'x.__class__',
+    '[x for x in y]',
+    'open("file")',
+    '1 +'])
+def test_efficiency_expression_rejects(expression):
+    with pytest.raises(ValueError):
+        EfficiencyExpression(expression)
@@ -0,0 +1,89 @@
+"""Test Flowsheet and FlowsheetOperator functions"""
+import os
+import json
+
+import numpy as np
+import pytest
+
+from saltproc import CompactMaterialflow, FlowsheetOperator, NuclideIndex
+from saltproc import Process, Flowsheet, read_dot_paths
+from saltproc.app import get_extraction_process_paths
+
+
+@pytest.fixture
+def flowsheet():
+    processes = {
+        'core_outlet': Process(mass_flowrate=10.0, efficiency={}),
+        'sparger': Process(mass_flowrate=10.0, efficiency={'Xe': 0.5}),
+        'bypass': Process(mass_flowrate=4.0, efficiency={}),
+        'filter': Process(mass_flowrate=6.0, efficiency={'I': '0.1 * t'}),
+        'core_inlet': Process(mass_flowrate=10.0, efficiency={})}
+    paths = [['core_outlet', 'sparger', 'bypass', 'core_inlet'],
+             ['core_outlet', 'sparger', 'filter', 'core_inlet']]
+    return processes, paths
+
+
+def test_flowsheet_operator(flowsheet):
+    processes, paths = flowsheet
+    nuclide_index = NuclideIndex()
+    inflow = CompactMaterialflow.from_comp({'Xe135': 0.5, 'I135': 0.5},
+                                           nuclide_index=nuclide_index,
+                                           density=2.0,
+                                           volume=10.0,
+                                           mass_flowrate=10.0)
+    operator = FlowsheetOperator(processes, paths, nuclide_index)
+    assert operator.time_dependent
+
+    thru, waste = operator.apply(inflow, t=1.0)
+    np.testing.assert_allclose(waste['waste_sparger'].get_mass('Xe135'), 5.0)
+    np.testing.assert_allclose(waste['waste_filter'].get_mass('I135'), 0.6)
+    np.testing.assert_allclose(thru.get_mass('Xe135'), 5.0)
+    np.testing.assert_allclose(thru.get_mass('I135'), 9.4)
+    np.testing.assert_allclose(thru.mass + waste['waste_sparger'].mass
+                               + waste['waste_filter'].mass, inflow.mass)
+    np.testing.assert_allclose(thru.volume, thru.mass / 2.0)
+    np.testing.assert_allclose(thru.mass_flowrate, 10.0)
+
+    # Time-dependent efficiencies recompile the operator
+    thru, waste = operator.apply(inflow, t=2.0)
+    np.testing.assert_allclose(waste['waste_filter'].get_mass('I135'), 1.2)
+
+    # New nuclides extend the operator
+    nuclide_index.add(['Xe136'])
+    inflow = CompactMaterialflow.from_comp({'Xe136': 1.0},
+                                           nuclide_index=nuclide_index,
+                                           density=2.0,
+                                           volume=1.0)
+    thru, waste = operator.apply(inflow, t=2.0)
+    np.testing.assert_allclose(waste['waste_sparger'].get_mass('Xe136'), 1.0)
+
+
+def test_read_dot_paths(path_test_file):
+    assert read_dot_paths(path_test_file) == \
+        get_extraction_process_paths(path_test_file)
+
+
+def test_flowsheet_refresh(proc_test_file, path_test_file, tmp_path):
+    process_file = tmp_path / 'processes.json'
+    dot_file = tmp_path / 'paths.dot'
+    process_file.write_text(proc_test_file.read_text())
+    dot_file.write_text(path_test_file.read_text())
+    flowsheet = Flowsheet(process_file, dot_file)
+    assert flowsheet.material_for_extraction == 'fuel'
+    processes = flowsheet.extraction_processes
+    feeds = flowsheet.feeds
+
+    # Unchanged content is not parsed again
+    os.utime(process_file, ns=(0, 0))
+    flowsheet.refresh()
+    assert flowsheet.extraction_processes is processes
+    assert flowsheet.feeds is feeds
+
+    with open(process_file) as f:
+        process_input = json.load(f)
+    process_input['fuel']['extraction_processes']['sparger']['efficiency']['Xe'] = 0.5
+    with open(process_file, 'w') as f:
+        json.dump(process_input, f)
+    flowsheet.refresh()
+    assert flowsheet.extraction_processes is not processes
+    assert flowsheet.extraction_processes['fuel']['sparger'].efficiency['Xe'] == 0.5
@@ -1,4 +1,8 @@
 """Test Materialflow functions"""
+import numpy as np
+import pytest
+
+from saltproc import CompactMaterialflow, NuclideIndex
 
 
 def test_get_mass(serpent_depcode):
@@ -16,3 +20,66 @@ def test_scale_matflow(serpent_depcode):
     assert scaled_matflow['F19'] == scale_factor * mats['fuel'].get_mass('F19')
     assert scaled_matflow['Li7'] == scale_factor * mats['fuel'].get_mass('Li7')
 
+
+def test_compact_materialflow_from_materialflow(serpent_depcode):
+    mats = serpent_depcode.read_depleted_materials(True)
+    nuclide_index = NuclideIndex()
+    fuel = CompactMaterialflow.from_materialflow(mats['fuel'], nuclide_index)
+    ctrl = CompactMaterialflow.from_materialflow(mats['ctrlPois'],
+                                                 nuclide_index)
+    np.testing.assert_allclose(fuel.mass, mats['fuel'].mass, rtol=1e-6)
+    np.testing.assert_allclose(fuel.get_mass('U235'),
+                               mats['fuel'].get_mass('U235'))
+    np.testing.assert_allclose(ctrl.get_mass('Gd155'),
+                               mats['ctrlPois'].get_mass('Gd155'))
+    assert fuel.volume == mats['fuel'].volume
+    assert fuel.burnup == mats['fuel'].burnup
+
+    matflow = fuel.to_materialflow()
+    np.testing.assert_allclose(matflow.get_mass('U238'),
+                               fuel.get_mass('U238'))
+
+
+def test_compact_materialflow_arithmetic():
+    nuclide_index = NuclideIndex(['U235', 'U238'])
+    x = CompactMaterialflow(masses=[1.0, 3.0],
+                            nuclide_index=nuclide_index,
+                            density=2.0,
+                            volume=2.0,
+                            mass_flowrate=1.0,
+                            burnup=1.0)
+    y = CompactMaterialflow.from_comp({'Xe135': 0.5, 'U235': 0.5},
+                                      nuclide_index,
+                                      density=1.0,
+                                      volume=2.0,
+                                      mass_flowrate=2.0)
+    assert nuclide_index.nuclides == ['U235', 'U238', 'Xe135']
+
+    z = x + y
+    np.testing.assert_equal(z.masses, [2.0, 3.0, 1.0])
+    assert z.mass == 6.0
+    assert z.density == 2.0
+    assert z.volume == 3.0
+    assert z.mass_flowrate == 3.0
+    assert z.burnup == 4.0 / 6.0
+    # operands are untouched
+    np.testing.assert_equal(x.masses, [1.0, 3.0])
+
+    w = 0.5 * z
+    assert w.mass == 3.0
+    assert w.volume == 1.5
+    assert w.mass_flowrate == 1.5
+    assert z.mass == 6.0
+
+    z *= 2
+    assert z.mass == 12.0
+    assert z.comp == {'U235': 4.0 / 12.0, 'U238': 6.0 / 12.0,
+                      'Xe135': 2.0 / 12.0}
+
+    z.normalize(3.0)
+    assert z.mass == 3.0
+    assert z.volume == 1.5
+    np.testing.assert_allclose(z.mass_fractions, [1 / 3, 1 / 2, 1 / 6])
+
+    with pytest.raises(ValueError):
+        x + CompactMaterialflow(masses=[1.0], nuclide_index=NuclideIndex(['U235']))
@@ -1,10 +1,19 @@
 """Test OpenMCDepcode functions"""
+import os
 import pytest
 
 import numpy as np
 from pathlib import Path
 
 import openmc
+from uncertainties import ufloat
+from openmc.data import atomic_mass, AVOGADRO
+import openmc.deplete as od
+from openmc.deplete import AtomNumber
+
+from saltproc import Materialflow, OpenMCDepletionSession, get_chain
+from saltproc import OpenMCDepletionArrays
+from saltproc.openmc_session import _SessionOperator
 
 
 def test_read_depcode_metadata(openmc_depcode):
@@ -31,6 +40,77 @@ def test_read_step_metadata(openmc_depcode):
     np.testing.assert_almost_equal(openmc_depcode.step_metadata['step_execution_time'], 423.90163846)
 
 
+def test_step_output(openmc_depcode, monkeypatch):
+    monkeypatch.setattr(openmc_depcode, 'output_path',
+                        Path(__file__).parents[1] /
+                        'openmc_data/saltproc_runtime_ref')
+    step_output = openmc_depcode._get_step_output()
+    assert openmc_depcode._get_step_output() is step_output
+    sp0 = step_output.get_statepoint(0)
+    assert step_output.get_statepoint(0) is sp0
+    assert step_output.get_tally(1, 'heating') is \
+        step_output.get_tally(1, 'heating')
+    assert step_output.depletion is step_output.depletion
+    openmc_depcode.close_step_output()
+    assert openmc_depcode._step_output is None
+
+
+def test_calculate_breeding_ratio(openmc_depcode):
+    sp_file = Path(__file__).parents[1] / \
+        'openmc_data/saltproc_runtime_ref/openmc_simulation_n0.h5'
+    openmc_depcode._fissile_nucs = {'U233', 'U235'}
+    openmc_depcode._fertile_nucs = {'Th232', 'U238'}
+    with openmc.StatePoint(sp_file) as sp:
+        tally = sp.get_tally(name='breeding_ratio_tally')
+
+        def tally_value(score, nuc):
+            return ufloat(
+                tally.get_values([score], nuclides=[nuc])[0, 0, 0],
+                tally.get_values([score], nuclides=[nuc],
+                                 value='std_dev')[0, 0, 0])
+
+        ref = sum(tally_value('(n,gamma)', nuc) for nuc in ['Th232', 'U238']) \
+            / sum(tally_value('absorption', nuc) for nuc in ['U233', 'U235'])
+        breeding_ratio = openmc_depcode._calculate_breeding_ratio(tally)
+    np.testing.assert_allclose(breeding_ratio, [ref.n, ref.s])
+
+
+def test_depletion_arrays():
+    results_file = Path(__file__).parents[1] / \
+        'openmc_data/saltproc_runtime_ref/depletion_results.h5'
+    depletion = OpenMCDepletionArrays(results_file)
+    assert depletion.material_ids == ['1']
+    assert len(depletion.nuclides) == 3819
+    assert depletion.nuclides[3399] == 'Ac206'
+    np.testing.assert_array_equal(depletion.volumes, [48710000.0])
+    assert depletion.time[1, 1] == 259200.0
+    assert depletion.source_rate[1] == 2.25e9
+    np.testing.assert_allclose(depletion.eigenvalues[1],
+                               [1.05103269, 0.00466057], rtol=1e-6)
+    np.testing.assert_allclose(depletion.proc_time, [0.75944138] * 2,
+                               rtol=1e-6)
+
+    atoms = depletion.get_atoms(1)
+    assert atoms.shape == (1, 3819)
+    assert depletion.get_atoms(1) is atoms
+    masses = depletion.get_masses(1)
+    np.testing.assert_allclose(masses,
+                               atoms * depletion.atomic_masses / AVOGADRO)
+    fissionable = depletion.zams >= 900000
+    np.testing.assert_allclose(depletion.get_fissionable_masses(1),
+                               masses[:, fissionable].sum(axis=1))
+
+    assert len(depletion.reaction_nuclides) == 421
+    assert depletion.reactions == ['(n,gamma)', '(n,2n)', '(n,p)', '(n,a)',
+                                   '(n,3n)', '(n,4n)', 'fission']
+    rates = depletion.get_reaction_rates(1)
+    assert rates.shape == (1, 421, 7)
+    u235 = depletion.reaction_nuclides.index('U235')
+    np.testing.assert_allclose(rates[0, u235, 6], 1.50846639e-08)
+    np.testing.assert_allclose(depletion.eigenvalues[1],
+                               [1.05103269, 0.00466057], rtol=1e-6)
+
+
 def test_check_for_material_names(cwd, openmc_depcode):
    matfile = openmc_depcode.template_input_file_path['materials']
    nameless_matfile = str(cwd / 'openmc_data' / 'msbr_materials_nameless.xml')
@@ -66,9 +146,200 @@ def test_create_mass_percents_dictionary(cwd, openmc_depcode):
             np.testing.assert_almost_equal(wo_ref_dictionary[key], wo_test_dictionary_2[key], decimal=5)
 
 
+def test_get_chain(cwd):
+    chain_file = cwd / 'openmc_data' / 'chain_simple.xml'
+    chain = get_chain(chain_file)
+    assert get_chain(str(chain_file)) is chain
+
+
+def test_write_compositions(openmc_depcode, tmp_path, monkeypatch):
+    for attr, value in (
+            ('runtime_matfile', str(tmp_path / 'materials.xml')),
+            ('runtime_compositionfile', str(tmp_path / 'compositions.npz')),
+            ('_materials', None),
+            ('_material_names', None)):
+        monkeypatch.setattr(openmc_depcode, attr, value)
+    with open(openmc_depcode.runtime_matfile, 'w') as f:
+        f.write('<materials>\n'
+                '  <material id="3" name="fuel" depletable="true"/>\n'
+                '  <material id="4" name="blanket" depletable="true"/>\n'
+                '</materials>\n')
+
+    mats = {'blanket': Materialflow({'Th232': 1.0}, density=5.0, volume=3.0),
+            'fuel': Materialflow({'U235': 0.2, 'U238': 0.8, 'Xe135': 0.0},
+                                 density=4.0, volume=2.0)}
+    openmc_depcode._write_compositions(mats)
+    assert list(tmp_path.glob('*.tmp*')) == []
+    with np.load(openmc_depcode.runtime_compositionfile) as data:
+        np.testing.assert_array_equal(data['material_ids'], [4, 3])
+        assert data['nuclides'].tolist() == ['Th232', 'U235', 'U238']
+        np.testing.assert_array_equal(data['volumes'], [3.0, 2.0])
+        atom_densities = data['atom_densities']
+    assert atom_densities[0, 1] == 0.0
+    np.testing.assert_allclose(
+        atom_densities[1, 1],
+        0.2 * 4.0 * AVOGADRO / atomic_mass('U235') * 1e-24)
+
+    openmc_depcode.remove_runtime_exchange_files()
+    assert not os.path.exists(openmc_depcode.runtime_compositionfile)
+
+
+def test_session_geometry_switch_npz(openmc_depcode, tmp_path, monkeypatch):
+    sessions = []
+
+    class Session():
+        def __init__(self, *args, threads=None, compositions_path=None):
+            self.compositions_path = compositions_path
+            sessions.append(self)
+
+        def set_active_tallies(self, tally_ids, active_ids):
+            pass
+
+        def run_step(self, timesteps, **kwargs):
+            pass
+
+        def update_materials(self, mats):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr('saltproc.openmc_depcode.OpenMCDepletionSession',
+                        Session)
+    monkeypatch.setattr(openmc.Geometry, 'from_xml',
+                        lambda path, materials: path)
+    runtime_matfile = tmp_path / 'materials.xml'
+    runtime_matfile.write_text(
+        '<materials>\n'
+        '  <material id="3" name="fuel" depletable="true"/>\n'
+        '</materials>\n')
+    for attr, value in (
+            ('persistent', True),
+            ('composition_exchange', 'npz'),
+            ('composition_change_threshold', None),
+            ('transport_step', True),
+            ('runtime_matfile', str(runtime_matfile)),
+            ('runtime_compositionfile', str(tmp_path / 'compositions.npz')),
+            ('depletion_settings', {'timesteps': [1],
+                                    'operator_kwargs': {},
+                                    'integrator_kwargs': {}}),
+            ('runtime_inputfile', dict(openmc_depcode.runtime_inputfile,
+                                       tallies='tallies.xml')),
+            ('geo_file_paths', ['next_geometry.xml']),
+            ('_session', None),
+            ('_materials', None),
+            ('_material_names', None),
+            ('_geometry', 'geometry.xml'),
+            ('_stale_files', set()),
+            ('_stale_tallies', False),
+            ('_last_transport_step', None),
+            ('_export_model', lambda: None)):
+        monkeypatch.setattr(openmc_depcode, attr, value)
+
+    openmc_depcode._run_session_step()
+    fuel = Materialflow({'U235': 0.2, 'U238': 0.8}, density=4.0, volume=2.0)
+    openmc_depcode.update_depletable_materials({'fuel': fuel}, 1.0)
+    openmc_depcode.switch_to_next_geometry()
+    assert openmc_depcode._session is None
+
+    # The new session starts from the reprocessed compositions
+    openmc_depcode._run_session_step()
+    assert [session.compositions_path for session in sessions] == \
+        [None, openmc_depcode.runtime_compositionfile]
+    openmc_depcode.close()
+
+
+def test_get_tallied_quantities(openmc_depcode, monkeypatch):
+    monkeypatch.setattr(openmc_depcode, 'tally_cadence',
+                        {'breeding_ratio': 1,
+                         'delayed_neutrons': 'boc_eoc',
+                         'power': 2})
+    assert openmc_depcode._get_tallied_quantities(0, 5) == \
+        {'breeding_ratio', 'delayed_neutrons', 'power'}
+    assert openmc_depcode._get_tallied_quantities(1, 5) == {'breeding_ratio'}
+    assert openmc_depcode._get_tallied_quantities(2, 5) == \
+        {'breeding_ratio', 'power'}
+    assert openmc_depcode._get_tallied_quantities(4, 5) == \
+        {'breeding_ratio', 'delayed_neutrons', 'power'}
+
+
+def test_needs_transport(openmc_depcode, tmp_path, monkeypatch):
+    for attr, value in (
+            ('runtime_microxsfile', str(tmp_path / 'microxs.npz')),
+            ('runtime_compositionfile', str(tmp_path / 'compositions.npz')),
+            ('transport_interval', None),
+            ('composition_change_threshold', None),
+            ('_last_transport_step', 0)):
+        monkeypatch.setattr(openmc_depcode, attr, value)
+    assert openmc_depcode._needs_transport(1)
+
+    # No cross sections cached yet
+    monkeypatch.setattr(openmc_depcode, 'transport_interval', 3)
+    assert openmc_depcode._needs_transport(1)
+    open(openmc_depcode.runtime_microxsfile, 'w').close()
+    assert not openmc_depcode._needs_transport(2)
+    assert openmc_depcode._needs_transport(3)
+    openmc_depcode.remove_runtime_exchange_files()
+    assert openmc_depcode._needs_transport(2)
+    open(openmc_depcode.runtime_microxsfile, 'w').close()
+
+    monkeypatch.setattr(openmc_depcode, 'transport_interval', None)
+    monkeypatch.setattr(openmc_depcode, 'composition_change_threshold', 0.05)
+    monkeypatch.setattr(openmc_depcode, '_reference_densities', (
+        {'U235': 0, 'U238': 1}, {'fuel': np.array([1.0, 3.0])}))
+    mats = {'fuel': Materialflow({'U235': 0.25, 'U238': 0.75}, density=4.1)}
+    monkeypatch.setattr(openmc_depcode, '_composition_change',
+                        openmc_depcode._get_composition_change(mats))
+    np.testing.assert_allclose(openmc_depcode._composition_change, 0.025)
+    assert not openmc_depcode._needs_transport(5)
+    mats = {'fuel': Materialflow({'U235': 0.2, 'U238': 0.7, 'Xe135': 0.1},
+                                 density=4.0)}
+    monkeypatch.setattr(openmc_depcode, '_composition_change',
+                        openmc_depcode._get_composition_change(mats))
+    np.testing.assert_allclose(openmc_depcode._composition_change, 0.2)
+    assert openmc_depcode._needs_transport(5)
+
+
 def test_name_to_nuclide_code(openmc_depcode):
     assert openmc_depcode.name_to_nuclide_code('H1') == 1001
     assert openmc_depcode.name_to_nuclide_code('U238') == 92238
     assert openmc_depcode.name_to_nuclide_code('Ag110_m1') == 47510
     assert openmc_depcode.name_to_nuclide_code('Am242') == 95242
     assert openmc_depcode.name_to_nuclide_code('Am242_m1') == 95642
+
+
+def test_session_update_materials():
+    session = OpenMCDepletionSession.__new__(OpenMCDepletionSession)
+    number = AtomNumber(['1'], ['U235', 'U238'], {'1': 1.0}, 2)
+    number.number[0, :] = 1.0
+    session.operator = type('Operator', (), {'number': number})
+    session._material_index = {'fuel': 0}
+
+    fuel = Materialflow({'U235': 0.2, 'U238': 0.79, 'Xe135': 0.01},
+                        density=4.0, volume=2.0)
+    session.update_materials({'fuel': fuel})
+    assert number.volume[0] == 2.0
+    for nuc in ('U235', 'U238'):
+        np.testing.assert_allclose(
+            number.get_atom_density(0, nuc),
+            fuel.comp[nuc] * 4.0 * AVOGADRO / atomic_mass(nuc))
+
+
+def test_session_operator_initial_condition(monkeypatch):
+    calls = []
+
+    def initial_condition(operator):
+        calls.append(operator)
+        return list(operator.number.get_mat_slice(np.s_[:]))
+
+    monkeypatch.setattr(od.CoupledOperator, 'initial_condition',
+                        initial_condition)
+    operator = _SessionOperator.__new__(_SessionOperator)
+    operator.number = AtomNumber(['1'], ['U235', 'U238'], {'1': 1.0}, 2)
+    operator.number.number[0, :] = [1.0, 2.0]
+
+    # Tallies are only created for the first depletion step
+    for _ in range(2):
+        x = operator.initial_condition()
+        np.testing.assert_array_equal(x[0], [1.0, 2.0])
+    assert calls == [operator]
@@ -2,7 +2,7 @@
 import numpy as np
 import pytest
 
-from saltproc import Process
+from saltproc import Process, CompactMaterialflow
 
 
 @pytest.fixture(scope='module')
@@ -28,6 +28,27 @@ def test_process_material(serpent_depcode, process):
     assert waste.mass == 531.0635651230967
 
 
+def test_process_compact_material(serpent_depcode, process):
+    mats = serpent_depcode.read_depleted_materials(True)
+    inflow = CompactMaterialflow.from_materialflow(mats['fuel'])
+    thru, waste = process.process_material(inflow)
+    assert isinstance(thru, CompactMaterialflow)
+    np.testing.assert_almost_equal(waste.get_mass('Xe135'), 19.7977787475)
+    np.testing.assert_almost_equal(waste.get_mass('Kr86'), 26.84732568375)
+    np.testing.assert_almost_equal(waste.get_mass('U235'), 0.0)
+    np.testing.assert_allclose(waste.mass, 531.0635651230967, rtol=1e-6)
+    np.testing.assert_allclose(thru.mass + waste.mass, inflow.mass)
+    np.testing.assert_allclose(thru.volume + waste.volume, inflow.volume,
+                               rtol=1e-6)
+
+    efficiency = process.get_efficiency_vector(inflow.nuclide_index)
+    assert process.get_efficiency_vector(inflow.nuclide_index) is efficiency
+    inflow.nuclide_index.add(['Xe999'])
+    extended = process.get_efficiency_vector(inflow.nuclide_index)
+    assert len(extended) == len(efficiency) + 1
+    assert extended[-1] == 1.0
+
+
 def test_calculate_removal_efficiency(process):
     for component, efficiency in process.efficiency.items():
         calculated_efficiency = process.calculate_removal_efficiency(component)
@@ -35,3 +56,22 @@ def test_calculate_removal_efficiency(process):
             assert calculated_efficiency == efficiency
         elif isinstance(efficiency, str):
             assert calculated_efficiency == 9.5 / process.mass_flowrate
+
+
+def test_calculate_removal_efficiencies():
+    process = Process(mass_flowrate=10,
+                      tau=2.0,
+                      efficiency={'Xe': 0.5,
+                                  'Kr': '1-exp(-t/tau)',
+                                  'H': '1-exp(-t/tau)'})
+    assert process.time_dependent
+    t = np.array([0.0, 1.0, 2.0])
+    efficiencies = process.calculate_removal_efficiencies(
+        ['Xe', 'Kr', 'U', 'H'], t)
+    assert efficiencies.shape == (3, 4)
+    np.testing.assert_allclose(efficiencies[:, 0], 0.5)
+    np.testing.assert_allclose(efficiencies[:, 1], 1 - np.exp(-t / 2.0))
+    np.testing.assert_allclose(efficiencies[:, 2], 0.0)
+    np.testing.assert_allclose(efficiencies[:, 3], efficiencies[:, 1])
+    np.testing.assert_allclose(process.calculate_removal_efficiency('Kr', 1.0),
+                               efficiencies[1, 1])
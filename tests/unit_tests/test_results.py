@@ -0,0 +1,64 @@
+"""Test Results functions"""
+import numpy as np
+import pytest
+
+from saltproc import Results
+
+
+@pytest.fixture(scope='module')
+def results_file(cwd):
+    return str(cwd / 'integration_tests' / 'run_no_reprocessing_openmc' /
+               'ref_saltproc_results.h5')
+
+
+def test_lazy_results(results_file):
+    eager = Results(results_file, load_in_out_streams=False)
+    with Results(results_file, lazy=True) as lazy:
+        assert lazy.material_composition is None
+        assert lazy.nuclide_idx == eager.nuclide_idx
+        for name, values in eager.material_parameters['fuel'].items():
+            np.testing.assert_array_equal(
+                lazy.material_parameters['fuel'][name], values)
+        np.testing.assert_array_equal(lazy.time_total, eager.time_total)
+
+        nucs = list(eager.nuclide_idx['fuel'].keys())
+        comp, times = lazy.get_material_composition('fuel')
+        np.testing.assert_array_equal(comp, eager.material_composition['fuel'])
+        np.testing.assert_array_equal(times, eager.time_total)
+
+        subset = [nucs[5], nucs[1]]
+        comp, times = lazy.get_material_composition('fuel',
+                                                    subset,
+                                                    (1.0, 6.0))
+        np.testing.assert_array_equal(times, eager.time_total[1:])
+        for row, nuc in zip(comp, subset):
+            np.testing.assert_array_equal(
+                row, eager.get_nuclide_mass('fuel', nuc)[1:])
+        eager_comp, _ = eager.get_material_composition('fuel',
+                                                       subset,
+                                                       (1.0, 6.0))
+        np.testing.assert_array_equal(comp, eager_comp)
+
+        for nuc in nucs:
+            np.testing.assert_array_equal(lazy.get_nuclide_mass('fuel', nuc),
+                                          eager.get_nuclide_mass('fuel', nuc))
+            assert lazy.get_nuclide_mass('fuel', nuc, -1) == \
+                eager.get_nuclide_mass('fuel', nuc, -1)
+
+    with pytest.raises(ValueError):
+        lazy.get_nuclide_mass('fuel', nucs[0])
+
+
+def test_interpolate_nuclide_mass(results_file):
+    results = Results(results_file, load_in_out_streams=False)
+    nuc = list(results.nuclide_idx['fuel'].keys())[3]
+    mass = results.get_nuclide_mass('fuel', nuc)
+    # time_total = [0, 3, 3, 6, 6]
+    np.testing.assert_allclose(
+        results.interpolate_nuclide_mass('fuel', nuc, [0.0, 1.5, 3.0, 4.5]),
+        [mass[0], 0.5 * (mass[0] + mass[1]), mass[2],
+         0.5 * (mass[2] + mass[3])])
+    np.testing.assert_allclose(
+        results.interpolate_nuclide_mass('fuel', [nuc], 6.0), [mass[4]])
+    with pytest.raises(ValueError):
+        results.interpolate_nuclide_mass('fuel', nuc, 7.0)
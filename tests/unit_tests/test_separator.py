@@ -26,3 +26,12 @@ def test_rem_elements(serpent_depcode, separator):
     np.testing.assert_allclose(waste.get_mass('Kr92'), 0.0002829805665329617, rtol=1e-6)
     np.testing.assert_allclose(waste.get_mass('Kr86'), 27.88095952489617, rtol=1e-6)
     np.testing.assert_allclose(waste.mass, 527.0884551454453, rtol=1e-6)
+
+
+def test_eff_grid(separator):
+    db = np.array([0.0005, 0.001, 0.002])
+    grid = separator.eff(db=db)
+    assert grid['Xe'].shape == (3,)
+    for i, d in enumerate(db):
+        np.testing.assert_allclose(grid['Xe'][i], separator.eff(db=d)['Xe'])
+    np.testing.assert_allclose(grid['Xe'][1], separator.efficiency['Xe'])
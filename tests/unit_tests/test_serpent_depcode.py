@@ -1,10 +1,14 @@
 """Test SerpentDepcode functions"""
 import pytest
 import numpy as np
+import os
 import tempfile
+import shutil
 from pathlib import Path
 
-from saltproc import SerpentDepcode
+from saltproc import Materialflow, SerpentDepcode, SerpentDepletionOutput
+from saltproc import read_out_nuclide_codes, XsdataIndex
+from saltproc import SerpentRestartFile
 
 
 def test_create_nuclide_name_map_zam_to_serpent(serpent_depcode, cwd):
@@ -251,3 +255,197 @@ def test_read_depleted_materials(serpent_depcode):
     np.testing.assert_allclose(mats['fuel'].get_mass('Pu239'), 1231.3628804629795, rtol=1e-6)
     np.testing.assert_allclose(mats['ctrlPois'].get_mass('Gd155'), 5812.83289505528, rtol=1e-6)
     np.testing.assert_allclose(mats['ctrlPois'].get_mass('O16'), 15350.701473655872, rtol=1e-6)
+
+
+def test_serpent_depletion_output(serpent_depcode):
+    dep_file = serpent_depcode.runtime_inputfile + '_dep.m'
+    results = SerpentDepletionOutput(dep_file, ['fuel'])
+    assert list(results.materials.keys()) == ['fuel']
+    assert results.zai[0] == 10010
+    assert len(results.zai) == len(results.materials['fuel']['mdens'])
+    np.testing.assert_array_equal(results.days, [0.0, 3.0])
+    np.testing.assert_array_equal(results.burnup, [0.0, 5.35036e-02])
+    np.testing.assert_array_equal(results.materials['fuel']['volume'],
+                                  [2.27175e+07, 2.27175e+07])
+    np.testing.assert_array_equal(results.materials['fuel']['burnup'],
+                                  [0.0, 5.44327e-02])
+    np.testing.assert_array_equal(results.materials['fuel']['density'],
+                                  [4.96020, 4.96020])
+
+    mats_before = serpent_depcode.read_depleted_materials(False)
+    mats_after = serpent_depcode.read_depleted_materials(True)
+    # Both moments come from one parse of the file
+    step_output = serpent_depcode._get_step_output()
+    assert serpent_depcode._get_step_output() is step_output
+    assert serpent_depcode._read_depletion_output()[0] is \
+        step_output.depletion
+    assert serpent_depcode.days == 3.0
+    assert mats_before['fuel'].density == mats_after['fuel'].density
+    serpent_depcode.close_step_output()
+    assert serpent_depcode._get_step_output() is not step_output
+
+
+def test_read_out_nuclide_codes(tmp_path):
+    out_file = tmp_path / 'input.out'
+    out_file.write_text(
+        '  1  U235   92235.09c  c  TRA\n'
+        '  2  Se83m  340831     c  DEC\n'
+        ' --- Table  2: Reaction and decay data: \n'
+        '  3  Pu239  94239.09c  c  TRA\n')
+    assert read_out_nuclide_codes(str(out_file)) == ['92235.09c', '340831']
+
+
+def test_xsdata_index(serpent_depcode, tmp_path, monkeypatch):
+    xsdata = tmp_path / 'lib.xsdata'
+    xsdata.write_text(
+        '92235.09c 92235.09c 1 92235 0 235.043930 900.0 0 /xs/U235.ace\n'
+        'U-235.09c 92235.09c 1 92235 0 235.043930 900.0 0 /xs/U235.ace\n'
+        '95342.09c 95342.09c 1 95242 1 242.059549 900.0 0 /xs/Am242m.ace\n'
+        '92235.12c 92235.12c 1 92235 0 235.043930 1200.0 0 /xs/U235.ace\n'
+        'lwtr.10t lwtr.10t 3 0 0 0.0 600.0 0 /xs/lwtr.ace\n')
+    cache = tmp_path / 'xsdata_index.json'
+    index = XsdataIndex([xsdata], str(cache))
+    assert index.libraries['09c'] == {922350: '92235.09c',
+                                      952421: '95342.09c'}
+    assert index.temperatures == {'09c': 900.0, '12c': 1200.0}
+    assert index.get_nuclide_codes([952421, 922350, 340831], '09c') == \
+        ['95342.09c', '92235.09c', '340831']
+    assert cache.is_file()
+    assert XsdataIndex([xsdata], str(cache)).libraries == index.libraries
+
+    monkeypatch.setattr(serpent_depcode, '_xsdata_index', index)
+    monkeypatch.setattr(serpent_depcode, '_nuclide_codes', {})
+    monkeypatch.setattr(
+        serpent_depcode, '_burnable_material_card_data',
+        {'fuel': ('mat fuel -4.96 burn 1 fix 09c 900 vol 1.0'.split(), 9)},
+        raising=False)
+    assert serpent_depcode.get_nuclide_codes('fuel', ['Am242_m1', 'U235',
+                                                      'Se83_m1']) == \
+        ['95342.09c', '92235.09c', '340831']
+
+
+def test_update_depletable_materials(serpent_depcode, tmp_path, monkeypatch):
+    xsdata = tmp_path / 'lib.xsdata'
+    xsdata.write_text(
+        '92235.09c 92235.09c 1 92235 0 235.043930 900.0 0 /xs/U235.ace\n'
+        '92238.09c 92238.09c 1 92238 0 238.050788 900.0 0 /xs/U238.ace\n')
+    for attr, value in (
+            ('runtime_matfile', str(tmp_path / 'runtime_mat.ini')),
+            ('mass_fraction_cutoff', 1e-10),
+            ('write_changed_materials_only', True),
+            ('_xsdata_index', XsdataIndex([xsdata])),
+            ('_nuclide_codes', {}),
+            ('_material_cards', {})):
+        monkeypatch.setattr(serpent_depcode, attr, value)
+    monkeypatch.setattr(
+        serpent_depcode, '_burnable_material_card_data',
+        {'fuel': ('mat fuel -4.96 burn 1 fix 09c 900 vol 1.0'.split(), 9)},
+        raising=False)
+
+    fuel = Materialflow({'U235': 0.2, 'U238': 0.8, 'Xe135': 1e-12},
+                        density=4.0, volume=2.0)
+    serpent_depcode.update_depletable_materials({'fuel': fuel}, 12.0)
+    file_data = serpent_depcode.read_plaintext_file(
+        serpent_depcode.runtime_matfile)
+    assert file_data == [
+        '% Material compositions (after 12.000000 days)\n',
+        '\n',
+        'mat fuel -4.0 burn 1 fix 09c 900 vol 2.00000E+00\n',
+        '           %9s  %7.14E\n' % ('92235.09c', -0.2),
+        '           %9s  %7.14E\n' % ('92238.09c', -0.8)]
+    assert list(tmp_path.glob('*.tmp')) == []
+
+    # Unchanged materials reuse the formatted card
+    card = serpent_depcode._material_cards['fuel'][1]
+    serpent_depcode.update_depletable_materials({'fuel': fuel}, 15.0)
+    assert serpent_depcode._material_cards['fuel'][1] is card
+    fuel.volume = 3.0
+    serpent_depcode.update_depletable_materials({'fuel': fuel}, 18.0)
+    assert serpent_depcode._material_cards['fuel'][1] is not card
+
+
+def test_serpent_restart_file(tmp_path):
+    path = tmp_path / 'restart.wrk'
+    nuclides = (np.array([922350, 922380]), np.array([1e-3, 2e-2]))
+    SerpentRestartFile.write(path, [
+        {'name': 'fuel', 'bu': 0.0, 'days': 0.0, 'adens': 2.1e-2,
+         'mdens': 4.0, 'burnup': 0.0, 'nuclides': nuclides},
+        {'name': 'fuel', 'bu': 1.5, 'days': 10.0, 'adens': 2.0e-2,
+         'mdens': 3.9, 'burnup': 1.6, 'nuclides': nuclides}])
+    assert list(tmp_path.glob('*.tmp')) == []
+
+    restart = SerpentRestartFile(path)
+    assert restart.material_names == ['fuel']
+    assert len(restart.records) == 2
+    record = restart.get_material('fuel')
+    assert record['days'] == 10.0
+    assert record['bu'] == 1.5
+    assert record['burnup'] == 1.6
+    assert record['mdens'] == 3.9
+    np.testing.assert_array_equal(record['nuclides']['zai'], nuclides[0])
+    np.testing.assert_array_equal(record['nuclides']['adens'], nuclides[1])
+    assert restart.get_material('fuel', 0)['days'] == 0.0
+    with pytest.raises(KeyError):
+        restart.get_material('blanket')
+
+
+def test_binary_coupling(serpent_depcode, tmp_path, monkeypatch):
+    for attr, value in (
+            ('runtime_inputfile', str(tmp_path / 'runtime_input.serpent')),
+            ('runtime_matfile', str(tmp_path / 'runtime_mat.ini')),
+            ('runtime_restartfile', str(tmp_path / 'runtime_restart.wrk')),
+            ('coupling', 'binary'),
+            ('_material_cards', {})):
+        monkeypatch.setattr(serpent_depcode, attr, value)
+    monkeypatch.setattr(serpent_depcode, '_burnable_material_card_data', {},
+                        raising=False)
+    serpent_depcode._get_burnable_material_card_data([
+        'mat fuel -4.96 burn 1 fix 09c 900 vol 1.0\n',
+        '% comment\n',
+        '92235.09c -0.2\n',
+        '92238.09c -0.8\n',
+        'therm lwtr lwj3.11t\n',
+        '1001.06c 1.0\n'])
+
+    lines = serpent_depcode.set_restart_cards(['set pop 10 20 5\n',
+                                               'set rfw 1\n'], 1)
+    assert lines == ['set pop 10 20 5\n', 'set rfw 1\n']
+
+    fuel = Materialflow({'U235': 0.2, 'U238': 0.8}, density=4.0, volume=2.0,
+                        burnup=3.0)
+    serpent_depcode.update_depletable_materials({'fuel': fuel}, 12.0)
+    file_data = serpent_depcode.read_plaintext_file(
+        serpent_depcode.runtime_matfile)
+    assert file_data == [
+        '% Material compositions (after 12.000000 days)\n',
+        '\n',
+        'mat fuel -4.0 burn 1 fix 09c 900 vol 2.00000E+00\n',
+        '92235.09c -0.2\n',
+        '92238.09c -0.8\n']
+    lines = serpent_depcode.set_restart_cards(['set pop 10 20 5\n'], 1)
+    assert lines == ['set pop 10 20 5\n',
+                     'set rfw 1\n',
+                     f'set rfr -12.0 "{serpent_depcode.runtime_restartfile}"\n']
+    # The first step starts from the template compositions
+    lines = serpent_depcode.set_restart_cards(['set pop 10 20 5\n'], 0)
+    assert lines == ['set pop 10 20 5\n', 'set rfw 1\n']
+
+    # Serpent2 output has the same format as the file SaltProc writes
+    shutil.copy(serpent_depcode.runtime_restartfile,
+                serpent_depcode.runtime_inputfile + '.wrk')
+    depleted = serpent_depcode.read_depleted_materials(True)['fuel']
+    assert serpent_depcode.days == 12.0
+    assert depleted.density == pytest.approx(4.0)
+    assert depleted.volume == 2.0
+    assert depleted.burnup == 3.0
+    assert depleted.comp['U235'] == pytest.approx(0.2)
+    assert depleted.comp['U238'] == pytest.approx(0.8)
+
+    # A restarted simulation reads the material cards of the runtime file
+    del serpent_depcode._burnable_material_card_data
+    depleted = serpent_depcode.read_depleted_materials(True)['fuel']
+    assert depleted.volume == 2.0
+    assert depleted.density == pytest.approx(4.0)
+
+    serpent_depcode.remove_runtime_exchange_files()
+    assert not os.path.exists(serpent_depcode.runtime_restartfile)
@@ -1,6 +1,13 @@
 """Test Simulation functions"""
 from pathlib import Path
 
+import numpy as np
+import pytest
+import tables as tb
+
+from saltproc import (CompactMaterialflow, read_nuclide_map,
+                      nuclide_name_to_zam, zam_to_nuclide_name)
+
 
 def test_check_switch_geo_trigger(simulation):
     """
@@ -26,3 +33,107 @@ def test_read_k_eds_delta(simulation):
     simulation.db_path = str(Path(simulation.db_path).parents[1] / 'tap_reference_db.h5')
     assert simulation.read_k_eds_delta(7) is False
     simulation.db_path = old_db_path
+
+
+def test_read_k_eds_delta_without_transport(simulation, monkeypatch):
+    k_eds = [1.05, np.nan, 1.04, np.nan, np.nan, 1.03, np.nan]
+    monkeypatch.setattr(simulation, '_get_k_eds_history', lambda: k_eds)
+    assert simulation.read_k_eds_delta(6) is False
+    k_eds[:] = [np.nan] * 7
+    assert simulation.read_k_eds_delta(6) is False
+    k_eds[:] = [1.04, np.nan, 1.03, 1.02, np.nan, 1.01, 1.005]
+    assert simulation.read_k_eds_delta(6) is True
+
+
+def test_session(simulation, tmp_path):
+    old_db_path = simulation.db_path
+    simulation.db_path = str(tmp_path / 'session_db.h5')
+    mats = simulation.sim_depcode.read_depleted_materials(True)
+
+    simulation.start_session()
+    session_db = simulation._db
+    simulation.store_mat_data(mats, 0, False)
+    simulation.store_mat_data(mats, 0, True)
+    assert simulation._db is session_db and session_db.isopen
+    simulation.flush()
+    simulation.end_session()
+    assert not session_db.isopen
+
+    with tb.open_file(simulation.db_path, mode='r') as db:
+        assert len(db.root.materials.fuel.before_reproc.comp) == 1
+        assert len(db.root.materials.fuel.after_reproc.parameters) == 1
+    simulation.db_path = old_db_path
+
+
+def test_nuclide_axis(simulation, tmp_path):
+    old_db_path = simulation.db_path
+    old_capacity = simulation.nuclide_capacity
+    simulation.db_path = str(tmp_path / 'nuclide_axis_db.h5')
+    simulation.nuclide_capacity = 8
+    mats = simulation.sim_depcode.read_depleted_materials(True)
+    fuel = mats['fuel']
+
+    # Few nuclides fit in the reserved columns
+    small = CompactMaterialflow.from_comp({'U235': 0.25, 'U238': 0.75},
+                                          density=2.0,
+                                          volume=3.0)
+    simulation.store_mat_data({'fuel': small}, 0, False)
+    with tb.open_file(simulation.db_path, mode='r') as db:
+        assert db.root.nuclide_map.attrs.capacity == 8
+        assert db.root.materials.fuel.before_reproc.comp.shape == (1, 8)
+
+    # More nuclides widen the stored arrays once
+    simulation.store_mat_data(mats, 1, False)
+    simulation.store_mat_data(mats, 1, True)
+
+    with tb.open_file(simulation.db_path, mode='r') as db:
+        capacity = db.root.nuclide_map.attrs.capacity
+        assert capacity >= len(fuel.comp)
+        assert db.root.nuclide_map.col('zam').dtype == np.int64
+        before = db.root.materials.fuel.before_reproc
+        assert before.comp.shape == (2, capacity)
+        nucmap = read_nuclide_map(before)
+        np.testing.assert_allclose(before.comp[0][nucmap['U238']], 4.5)
+        for node, row in ((before, 1),
+                          (db.root.materials.fuel.after_reproc, 0)):
+            comp = node.comp[row]
+            for nuc in ('U235', 'Xe135', 'Am242_m1'):
+                if nuc in fuel.comp:
+                    np.testing.assert_allclose(comp[nucmap[nuc]],
+                                               fuel.get_mass(nuc))
+    assert nuclide_name_to_zam('Am242_m1') == 952421
+    assert zam_to_nuclide_name(952421) == 'Am242_m1'
+    simulation.db_path = old_db_path
+    simulation.nuclide_capacity = old_capacity
+
+
+def test_nuclide_capacity_from_first_materials(simulation, tmp_path):
+    old_db_path = simulation.db_path
+    simulation.db_path = str(tmp_path / 'nuclide_capacity_db.h5')
+    mats = simulation.sim_depcode.read_depleted_materials(True)
+    fuel = mats['fuel']
+
+    simulation.store_mat_data(mats, 0, False)
+    with tb.open_file(simulation.db_path, mode='r') as db:
+        n_nucs = len(set().union(*(mat.comp for mat in mats.values())))
+        assert db.root.nuclide_map.attrs.capacity == n_nucs
+
+    # A new nuclide widens the stored arrays
+    fuel.comp = dict(fuel.comp, Og294=0.0)
+    simulation.store_mat_data({'fuel': fuel}, 0, True)
+    with tb.open_file(simulation.db_path, mode='r') as db:
+        capacity = db.root.nuclide_map.attrs.capacity
+        assert capacity > n_nucs
+        assert db.root.materials.fuel.before_reproc.comp.shape == \
+            (1, capacity)
+    simulation.db_path = old_db_path
+
+
+def test_check_restart_old_database(simulation, tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'old_db.h5')
+    with tb.open_file(db_path, mode='w') as db:
+        db.create_group(db.root, 'materials')
+    monkeypatch.setattr(simulation, 'db_path', db_path)
+    monkeypatch.setattr(simulation, 'restart_flag', True)
+    with pytest.raises(ValueError, match='restart_flag'):
+        simulation.check_restart()
@@ -26,3 +26,28 @@ def test_rem_elements(serpent_depcode, sparger):
     np.testing.assert_allclose(waste.get_mass('Kr92'), 0.00011634701042301513, rtol=1e-6)
     np.testing.assert_allclose(waste.get_mass('Kr86'), 11.463212220507412, rtol=1e-6)
     np.testing.assert_allclose(waste.mass, 217.43479356542446, rtol=1e-6)
+
+
+def test_eff_grid(sparger):
+    q_salt = np.array([0.05, 0.1, 0.2])[:, np.newaxis]
+    temp_salt = np.array([850.0, 900.0])
+    grid = sparger.eff(q_salt=q_salt, temp_salt=temp_salt)
+    assert grid['Xe'].shape == (3, 2)
+    for i, q in enumerate(q_salt[:, 0]):
+        for j, temp in enumerate(temp_salt):
+            point = sparger.eff(q_salt=q, temp_salt=temp)
+            for nuc in sparger.h_const:
+                np.testing.assert_allclose(grid[nuc][i, j], point[nuc])
+
+    # dp overrides recompute the cross-section
+    np.testing.assert_allclose(sparger.eff(dp=sparger.dp)['Xe'],
+                               sparger.eff()['Xe'])
+    assert sparger.eff() == sparger.efficiency
+
+
+def test_eff_cache_attributes(sparger, monkeypatch):
+    eff = sparger.eff()
+    monkeypatch.setattr(sparger, 'diffusivity', 2 * sparger.diffusivity)
+    assert sparger.eff()['Xe'] != eff['Xe']
+    monkeypatch.setattr(sparger, 'h_const', dict(sparger.h_const, Xe=1e-4))
+    assert sparger.eff()['Xe'] != eff['Xe']
@@ -0,0 +1,50 @@
+"""Test ZaidTable functions"""
+import numpy as np
+import pytest
+
+from saltproc import ZaidTable, get_zaid_table, names_to_zams, zams_to_names
+
+
+def test_codes_to_names():
+    codes = ['92235.09c', '47310.09c', '95342.09c', '95242.09c', '340831',
+             '290702']
+    assert get_zaid_table('serpent').codes_to_names(codes) == \
+        ['U235', 'Ag110_m1', 'Am242_m1', 'Am242', 'Se83_m1', 'Cu70_m2']
+    assert get_zaid_table('mcnp').codes_to_names(
+        ['47510.82c', '95642.82c', '95242.82c']) == \
+        ['Ag110_m1', 'Am242_m1', 'Am242']
+    assert get_zaid_table('nndc').codes_to_names(
+        ['47510.82c', '95642.82c', '95242.82c']) == \
+        ['Ag110_m1', 'Am242', 'Am242_m1']
+    zai = np.array([10010, 922350, 471101])
+    assert get_zaid_table('serpent').codes_to_names(zai) == \
+        ['H1', 'U235', 'Ag110_m1']
+    assert get_zaid_table('serpent').codes_to_names([]) == []
+
+
+def test_codes_to_sort_keys():
+    table = get_zaid_table('nndc')
+    keys = table.codes_to_sort_keys(['95242.82c', '95642.82c', '922350'])
+    np.testing.assert_array_equal(keys, [952421, 952420, 922350])
+
+
+def test_names_to_codes():
+    names = ['H1', 'Ag110_m1', 'Am242', 'Am242_m1']
+    np.testing.assert_array_equal(
+        get_zaid_table('serpent').names_to_codes(names),
+        [1001, 47310, 95242, 95342])
+    np.testing.assert_array_equal(
+        get_zaid_table('mcnp').names_to_codes(names),
+        [1001, 47510, 95242, 95642])
+    np.testing.assert_array_equal(
+        get_zaid_table('nndc').names_to_codes(names),
+        [1001, 47510, 95642, 95242])
+
+
+def test_zams():
+    zams = names_to_zams(['U235', 'Am242_m1'])
+    np.testing.assert_array_equal(zams, [922350, 952421])
+    assert zams_to_names(zams) == ['U235', 'Am242_m1']
+    assert get_zaid_table('mcnp') is get_zaid_table('mcnp')
+    with pytest.raises(ValueError):
+        ZaidTable('endf')